@@ -46,6 +46,22 @@ class GameState:
         self.expected_choices = []
         self.last_output = ""
 
+# GameState for each state named in the game's --machine frames
+FRAME_STATES = {
+    "title": GameState.TITLE_SCREEN,
+    "character_management": GameState.CHARACTER_MANAGEMENT,
+    "character_creation": GameState.CHARACTER_MANAGEMENT,
+    "leaderboards": GameState.CHARACTER_MANAGEMENT,
+    "main_menu": GameState.MAIN_MENU,
+    "status": GameState.MAIN_MENU,
+    "game_over": GameState.MAIN_MENU,
+    "hunting": GameState.HUNTING,
+    "combat": GameState.COMBAT,
+    "boss": GameState.BOSS_FIGHT,
+    "inventory": GameState.INVENTORY,
+    "shop": GameState.SHOP,
+}
+
 class RPGGameGUI:
     def __init__(self, root):
         self.root = root
@@ -459,7 +475,7 @@ class RPGGameGUI:
             # Use sys.executable to ensure we use the same Python interpreter
             # Start the game in a new process with UTF-8 encoding
             self.game_process = subprocess.Popen(
-                [sys.executable, "rpg_game.py"],
+                [sys.executable, "rpg_game.py", "--machine"],
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -509,6 +525,16 @@ class RPGGameGUI:
                 # Try to clean the line of any problematic characters
                 clean_line = line.encode('utf-8', errors='replace').decode('utf-8')
                 
+                # Games with --machine send one JSON frame per line, shown by the UI thread
+                if tag == "normal":
+                    try:
+                        frame = json.loads(clean_line)
+                    except ValueError:
+                        frame = None  # Plain text from an older game, parsed below
+                    if isinstance(frame, dict):
+                        self.msg_queue.put(("frame", frame))
+                        continue
+                
                 # Process game output for UI updates
                 self.process_game_output(clean_line, tag)
                 
@@ -657,6 +683,41 @@ class RPGGameGUI:
             # Highlight rewards
             tag = "reward"
     
+    def process_game_frame(self, frame):
+        """Update the UI from one frame of the game's --machine output"""
+        state = FRAME_STATES.get(frame.get('state'), self.game_state.current_state)
+        enemy = frame.get('enemy') or {}
+        if state == GameState.COMBAT and enemy.get('boss'):
+            state = GameState.BOSS_FIGHT
+        self.game_state.current_state = state
+        self.game_state.player_stats = frame.get('player') or {}
+        self.game_state.enemy_stats = enemy
+        self.game_state.current_prompt = (frame.get('prompt') or "").strip()
+        self.game_state.expected_choices = frame.get('choices')
+        
+        # Show the game's text line by line so each line gets its own highlighting
+        for line in frame.get('log', '').splitlines(True):
+            self.append_text(line)
+        if frame.get('prompt'):
+            self.append_text(frame['prompt'])
+        
+        self.create_choice_buttons(self.game_state.expected_choices)
+        self.update_player_stats()
+        self.update_enemy_stats()
+    
+    def create_choice_buttons(self, choices):
+        """Create buttons for the answers listed in a frame, none for free text like names"""
+        if not choices:
+            self.clear_dynamic_buttons()
+        elif choices == [""]:
+            self.create_continue_button()
+        elif choices == ["y", "n"]:
+            self.create_yes_no_buttons()
+        elif all(choice.isdigit() for choice in choices):
+            self.create_number_buttons(choices[0], choices[-1])
+        else:
+            self.create_custom_buttons([(choice.upper(), choice) for choice in choices])
+    
     def update_action_buttons_for_state(self, state):
         """Update action buttons based on the current game state"""
         if state in self.common_actions:
@@ -859,7 +920,7 @@ class RPGGameGUI:
     
     def send_input(self, text):
         """Send input to the game process via the input queue"""
-        if text:
+        if text or self.game_state.expected_choices == [""]:  # Empty input answers "Press Enter" prompts
             # Add user input to the display
             self.append_text(f"> {text}\n", "input")
             
@@ -1150,7 +1211,10 @@ class RPGGameGUI:
         try:
             while True:
                 tag, text = self.msg_queue.get_nowait()
-                self.append_text(text, tag)
+                if tag == "frame":
+                    self.process_game_frame(text)
+                else:
+                    self.append_text(text, tag)
                 self.msg_queue.task_done()
         except queue.Empty:
             pass
@@ -1261,7 +1325,7 @@ class RPGGameGUI:
     def on_submit(self):
         """Process user input"""
         text = self.input_entry.get().strip()
-        if text:
+        if text or self.game_state.expected_choices == [""]:
             self.send_input(text)
     
     def update_status(self, message):
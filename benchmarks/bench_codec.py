@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Compare the binary save codec with JSON storage
+
+Reports encoded size and decode time for bags of several sizes, then
+load_character time for the same character stored as saved_items rows
+and as a save_blob, using a throwaway SQLite database.
+
+    python benchmarks/bench_codec.py [--repeat 200]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _best(func, repeat):
+    """Fastest of repeat runs, in microseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+def _character(items):
+    """A Mage carrying the given number of random items, with a full set of gear equipped"""
+    from characters import Mage
+    from items import generate_random_item
+    character = Mage("Bench")
+    character.inventory.max_size = items + 10
+    for i in range(items + 10):
+        character.inventory.add_item(generate_random_item(5, i % 7 == 0))
+    for item in list(character.inventory.items):
+        if getattr(item, 'slot', None) and item.slot not in character.equipment:
+            character.equipment[item.slot] = item
+            character.inventory.items.remove(item)
+    del character.inventory.items[items:]
+    return character
+
+def bench_codec(sizes, repeat):
+    """Size and decode time of one bag, JSON against binary"""
+    from db_utils import snapshot_character
+    from save_codec import encode_items, decode_items
+    
+    print(f"{'items':>6} {'json bytes':>11} {'blob bytes':>11} {'json decode':>12} {'blob decode':>12}")
+    for size in sizes:
+        snapshot = snapshot_character(_character(size))
+        bag_text = json.dumps(snapshot['bag'])
+        equipment_text = json.dumps(snapshot['equipment'])
+        blob = encode_items(snapshot['bag'], snapshot['equipment'])
+        json_us = _best(lambda: (json.loads(bag_text), json.loads(equipment_text)), repeat)
+        blob_us = _best(lambda: decode_items(blob), repeat)
+        print(f"{size:>6} {len(bag_text) + len(equipment_text):>11} {len(blob):>11} "
+              f"{json_us:>10.1f}us {blob_us:>10.1f}us")
+
+def bench_load(items, repeat):
+    """load_character time with items stored as rows and as a blob"""
+    import db_utils
+    
+    character = _character(items)
+    results = {}
+    for codec in ('rows', 'binary'):
+        db_utils.SAVE_CODEC = codec
+        character.save_id = None
+        character.save_version = None
+        character.name = f"Bench {codec}"
+        saved = db_utils.save_character(character, overwrite=True)
+        results[codec] = _best(lambda: db_utils.load_character(saved.id), repeat)
+    
+    print(f"\nload_character with {items} items in the bag")
+    for codec, micros in results.items():
+        print(f"  {codec:<7} {micros / 1000:.2f} ms")
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200, help="Runs per measurement, the best is reported")
+    args = parser.parse_args()
+    
+    random.seed(42)
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = "sqlite:///" + os.path.join(directory, "bench.db")
+        bench_codec([10, 100, 1000], args.repeat)
+        bench_load(10, args.repeat)
+
+if __name__ == "__main__":
+    main()
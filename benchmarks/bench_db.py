@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Measure save, load and list latency against a seeded database
+
+Seeds synthetic characters with bulk inserts (reusing an earlier seed in
+the same database), then reports p50/p99 latency for load_character,
+list_characters and two kinds of save_character: gold only, and gold
+plus one item swapped in a large bag. It does this alone and then again
+while background threads keep saving. Loads build the whole bag but, as
+in the game, only keep as many items as the inventory holds.
+
+    python benchmarks/bench_db.py --characters 10000 --items 100
+    python benchmarks/bench_db.py --url postgresql://localhost/rpg_bench --writers 8
+    python benchmarks/bench_db.py --codec binary --json binary.json --compare rows.json
+
+--json saves the report and --compare prints it side by side with an
+earlier one, so schema and codec changes can be judged on numbers.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _template(items):
+    """A Mage carrying the given number of random items, with a full set of gear equipped"""
+    from characters import Mage
+    from items import generate_random_item
+    character = Mage("Bench")
+    character.inventory.max_size = items + 10
+    for i in range(items + 10):
+        character.inventory.add_item(generate_random_item(5, i % 7 == 0))
+    for item in list(character.inventory.items):
+        if getattr(item, 'slot', None) and item.slot not in character.equipment:
+            character.equipment[item.slot] = item
+            character.inventory.items.remove(item)
+    del character.inventory.items[items:]
+    return character
+
+def seed(count, items, batch_size, codec):
+    """
+    Bulk insert bench characters until there are count of them
+    
+    Returns:
+        List of their saved_characters ids
+    """
+    from datetime import datetime
+    from sqlalchemy import insert, select
+    from db_models import get_engine, ensure_schema, SavedCharacter, SavedItem
+    from db_utils import snapshot_character, _item_row_values, _STAT_FIELDS
+    from save_codec import encode_items
+    from leaderboards import rebuild
+    
+    characters = SavedCharacter.__table__
+    item_table = SavedItem.__table__
+    ensure_schema()
+    engine = get_engine()
+    bench = (characters.c.is_active == True) & characters.c.name.like('Bench %')
+    with engine.connect() as conn:
+        ids = list(conn.execute(select(characters.c.id).where(bench).order_by(characters.c.id)).scalars())
+    if len(ids) >= count:
+        return ids[:count]
+    
+    snapshot = snapshot_character(_template(items))
+    base = {field: snapshot[field] for field in _STAT_FIELDS}
+    base.update(character_class='Mage', skills=json.dumps(snapshot['skills']), inventory_items='[]',
+                equipment='{}', is_active=True, journal_seq=0, version=1)
+    blob = encode_items(snapshot['bag'], snapshot['equipment']) if codec == 'binary' else None
+    item_rows = [_item_row_values(item_data, 'bag') for item_data in snapshot['bag']]
+    item_rows += [_item_row_values(item_data, 'slot', slot) for slot, item_data in snapshot['equipment'].items()]
+    
+    started = time.perf_counter()
+    for first in range(len(ids), count, batch_size):
+        now = datetime.utcnow()
+        rows = [dict(base, name=f"Bench {number:07d}", level=random.randint(1, 60),
+                     gold=random.randint(0, 100000), created_at=now, last_saved=now, save_blob=blob)
+                for number in range(first, min(first + batch_size, count))]
+        with engine.begin() as conn:
+            new_ids = conn.execute(
+                insert(characters).returning(characters.c.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            if blob is None and item_rows:
+                conn.execute(insert(item_table), [dict(values, character_id=character_id)
+                                                  for character_id in new_ids for values in item_rows])
+        ids.extend(new_ids)
+        print(f"\rSeeded {len(ids)}/{count} characters", end='', file=sys.stderr)
+    
+    rebuild()  # Rank the seeded saves so saves update leaderboard rows rather than insert them
+    print(f"\rSeeded {count} characters with {items} items in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+    return ids
+
+def _summary(latencies, wall=None):
+    """Latency percentiles in milliseconds, plus operations per second"""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        'n': count,
+        'p50_ms': ordered[count // 2] * 1000 if count else 0.0,
+        'p99_ms': ordered[min(count - 1, int(count * 0.99))] * 1000 if count else 0.0,
+        'mean_ms': sum(ordered) / count * 1000 if count else 0.0,
+        'ops_per_s': count / (wall if wall is not None else sum(ordered) or 1),
+    }
+
+def _timed(operation, latencies):
+    """Run operation once, appending its duration"""
+    start = time.perf_counter()
+    operation()
+    latencies.append(time.perf_counter() - start)
+
+class _Workload:
+    """The operations being measured, on a fixed set of seeded ids"""
+    
+    def __init__(self, ids, items):
+        import db_utils
+        self.db = db_utils
+        self.ids = ids
+        self.template = _template(items)
+        self.spare = _template(1).inventory.items[0]
+    
+    def load(self, rng):
+        """Load a random character"""
+        assert self.db.load_character(rng.choice(self.ids)) is not None
+    
+    def list(self, rng):
+        """List a random page of saves"""
+        self.db.list_characters(limit=50, offset=rng.randrange(max(1, len(self.ids) - 50)))
+    
+    def _character(self, character_id):
+        """A bench character pointing at its row, with nothing changed yet"""
+        character = self.template
+        clone = type(character).__new__(type(character))
+        clone.__dict__.update(character.__dict__)
+        clone.inventory = type(character.inventory).__new__(type(character.inventory))
+        clone.inventory.__dict__.update(character.inventory.__dict__)
+        clone.inventory.items = list(character.inventory.items)
+        clone.save_id = character_id
+        clone.save_version = None  # Bench saves overwrite, they do not check for conflicts
+        clone.mark_clean()
+        return clone
+    
+    def save_gold(self, rng):
+        """Save a random character with only its gold changed"""
+        character = self._character(rng.choice(self.ids))
+        character.inventory.gold = rng.randint(0, 100000)
+        assert self.db.save_character(character, overwrite=True)
+    
+    def save_inventory(self, rng, character_id=None):
+        """Save a random character with its gold changed and one bag item swapped"""
+        character = self._character(character_id or rng.choice(self.ids))
+        character.inventory.gold = rng.randint(0, 100000)
+        items = character.inventory.items
+        if items:
+            items[rng.randrange(len(items))] = self.spare
+            character.inventory.mark_items_changed()
+        assert self.db.save_character(character, overwrite=True)
+
+def measure(workload, operations, writers):
+    """Run every measurement, returns {name: summary}"""
+    rng = random.Random(1)
+    results = {}
+    for name, operation in (('load', workload.load), ('list', workload.list),
+                            ('save (gold)', workload.save_gold), ('save (inventory)', workload.save_inventory)):
+        latencies = []
+        for _ in range(operations):
+            _timed(lambda: operation(rng), latencies)
+        results[name] = _summary(latencies)
+    
+    if writers <= 0:
+        return results
+    
+    # Writers save disjoint slices of the ids so they never touch the same row
+    write_latencies = []
+    lock = threading.Lock()
+    def writer(index):
+        writer_rng = random.Random(100 + index)
+        mine = workload.ids[index::writers]
+        latencies = []
+        for _ in range(operations):
+            _timed(lambda: workload.save_inventory(writer_rng, writer_rng.choice(mine)), latencies)
+        with lock:
+            write_latencies.extend(latencies)
+    
+    threads = [threading.Thread(target=writer, args=(index,)) for index in range(writers)]
+    load_latencies = []
+    list_latencies = []
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        _timed(lambda: workload.load(rng), load_latencies)
+        _timed(lambda: workload.list(rng), list_latencies)
+    wall = time.perf_counter() - started
+    for thread in threads:
+        thread.join()
+    
+    results[f'save, {writers} writers'] = _summary(write_latencies, wall)
+    results[f'load, {writers} writers'] = _summary(load_latencies)
+    results[f'list, {writers} writers'] = _summary(list_latencies)
+    return results
+
+def print_report(report, baseline=None):
+    """Print a report, next to a baseline report when given"""
+    config = report['config']
+    print(f"\n{config['characters']} characters, {config['items']} items each, codec {config['codec']}, "
+          f"{config['dialect']}, {config['operations']} operations per measurement")
+    header = f"{'':<22} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'ops/s':>8}"
+    if baseline:
+        header += f" {'base p50':>9} {'base p99':>9} {'p50 change':>11}"
+    print(header)
+    for name, summary in report['results'].items():
+        line = (f"{name:<22} {summary['p50_ms']:>8.2f} {summary['p99_ms']:>8.2f} {summary['mean_ms']:>8.2f} "
+                f"{summary['ops_per_s']:>8.0f}")
+        old = baseline['results'].get(name) if baseline else None
+        if old:
+            change = (summary['p50_ms'] / old['p50_ms'] - 1) * 100 if old['p50_ms'] else 0.0
+            line += f" {old['p50_ms']:>9.2f} {old['p99_ms']:>9.2f} {change:>+10.1f}%"
+        print(line)
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help="Database to seed and measure (default: a throwaway SQLite file)")
+    parser.add_argument('--characters', type=int, default=10000, help="Characters to seed")
+    parser.add_argument('--items', type=int, default=100, help="Bag items per character")
+    parser.add_argument('--operations', type=int, default=200, help="Operations per measurement (and per writer)")
+    parser.add_argument('--writers', type=int, default=4, help="Background writer threads, 0 to skip")
+    parser.add_argument('--codec', choices=['rows', 'binary'], default='rows', help="How items are stored")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Characters per seeding transaction")
+    parser.add_argument('--cache', action='store_true', help="Leave the load cache on")
+    parser.add_argument('--json', help="Write the report to this file")
+    parser.add_argument('--compare', help="Report from an earlier --json run to compare against")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = args.url or "sqlite:///" + os.path.join(directory, "bench.db")
+        import db_utils
+        from db_models import get_engine
+        db_utils.SAVE_CODEC = args.codec
+        if not args.cache:
+            db_utils.clear_load_cache()
+            db_utils._load_cache.capacity = 0
+        
+        random.seed(42)
+        ids = seed(args.characters, args.items, args.batch_size, args.codec)
+        report = {
+            'config': {
+                'characters': len(ids),
+                'items': args.items,
+                'codec': args.codec,
+                'dialect': get_engine().dialect.name,
+                'operations': args.operations,
+                'writers': args.writers,
+                'cache': args.cache,
+            },
+            'results': measure(_Workload(ids, args.items), args.operations, args.writers),
+        }
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+if __name__ == "__main__":
+    main()
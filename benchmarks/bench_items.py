@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Time item serialization through the type registry in db_utils
+
+The baseline is the isinstance ladder and constructor calls the registry
+replaced, kept here so the two can be compared on the same items.
+
+    python benchmarks/bench_items.py [--items 1000] [--repeat 50]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from items import (Weapon, Armor, Accessory, HealthPotion, ManaPotion, StrengthElixir,
+                   generate_random_item)
+from db_utils import _serialize_item, _deserialize_item
+
+def ladder_serialize(item):
+    """Previous implementation: walk an isinstance chain per item"""
+    item_data = {'name': item.name, 'description': item.description, 'value': item.value}
+    if isinstance(item, Weapon):
+        item_data['type'] = 'weapon'
+        item_data['attack_boost'] = item.stat_boost.get('attack', 0)
+    elif isinstance(item, Armor):
+        item_data['type'] = 'armor'
+        item_data['defense_boost'] = item.stat_boost.get('defense', 0)
+    elif isinstance(item, Accessory):
+        item_data['type'] = 'accessory'
+        item_data['stat_boosts'] = item.stat_boost
+    elif isinstance(item, HealthPotion):
+        item_data['type'] = 'health_potion'
+        item_data['size'] = item.size
+    elif isinstance(item, ManaPotion):
+        item_data['type'] = 'mana_potion'
+        item_data['size'] = item.size
+    elif isinstance(item, StrengthElixir):
+        item_data['type'] = 'strength_elixir'
+    if isinstance(item, (Weapon, Armor, Accessory)):
+        item_data['quality'] = item.quality
+    return item_data
+
+def ladder_deserialize(item_data):
+    """Previous implementation: compare the type name down a chain, then run the constructor"""
+    quality = item_data.get('quality') or 'common'
+    if item_data.get('type') == 'weapon':
+        return Weapon(item_data['name'], item_data['description'], item_data['value'],
+                      item_data.get('attack_boost', 0), quality)
+    elif item_data.get('type') == 'armor':
+        return Armor(item_data['name'], item_data['description'], item_data['value'],
+                     item_data.get('defense_boost', 0), quality)
+    elif item_data.get('type') == 'accessory':
+        return Accessory(item_data['name'], item_data['description'], item_data['value'],
+                         item_data.get('stat_boosts', {}), quality)
+    elif item_data.get('type') == 'health_potion':
+        return HealthPotion(item_data.get('size', 'small'))
+    elif item_data.get('type') == 'mana_potion':
+        return ManaPotion(item_data.get('size', 'small'))
+    elif item_data.get('type') == 'strength_elixir':
+        return StrengthElixir()
+    return None
+
+def _best(func, repeat):
+    """Fastest of repeat runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000, help="Items per run")
+    parser.add_argument('--repeat', type=int, default=50, help="Runs per measurement, the best is reported")
+    args = parser.parse_args()
+    
+    random.seed(42)
+    items = [generate_random_item(random.randint(1, 10), i % 7 == 0) for i in range(args.items)]
+    # Consumables make up most of a real bag
+    items += [random.choice([HealthPotion, ManaPotion])(random.choice(['small', 'medium', 'large']))
+              for _ in range(args.items)]
+    data = [_serialize_item(item) for item in items]
+    
+    rows = [
+        ("serialize", lambda: [ladder_serialize(item) for item in items],
+         lambda: [_serialize_item(item) for item in items]),
+        ("deserialize", lambda: [ladder_deserialize(item_data) for item_data in data],
+         lambda: [_deserialize_item(item_data) for item_data in data]),
+    ]
+    print(f"{len(items)} items, best of {args.repeat}")
+    print(f"{'':<12} {'ladder':>10} {'registry':>10} {'speedup':>8}")
+    for label, baseline, registry in rows:
+        before = _best(baseline, args.repeat)
+        after = _best(registry, args.repeat)
+        print(f"{label:<12} {before:>8.2f}ms {after:>8.2f}ms {before / after:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,26 @@
+import time
 import random
+from game_output import say
 
 class Character:
     """Base class for all characters in the game"""
     
+    # Attributes written to saved_characters; changes to them are tracked
+    # so a save only writes what changed since the last save or load
+    PERSISTED_FIELDS = frozenset(['level', 'xp', 'xp_to_level', 'hp', 'max_hp', 'mana', 'max_mana',
+                                  'base_attack', 'defense', 'luck', 'class_tier', 'class_title', 'started_at'])
+    
     def __init__(self, name, hp=100, mana=50, attack=20, defense=10):
+        # Dirty tracking starts once the character is saved or loaded
+        self._dirty = None
+        self.save_id = None  # saved_characters id once saved or loaded
+        self.save_version = None  # saved_characters version this copy was saved or loaded at
+        self.save_conflict = None  # SaveConflictError from a background save, until resolved
+        self.saves_in_flight = 0  # Queued saves not yet written
+        self.journal_seq = 0  # Last save_journal entry written for this character
+        self.journal_base = None  # Snapshot the next journal entries are diffed against
         self.name = name
+        self.started_at = time.time()  # When the character was created, the tier leaderboards time from here
         self.max_hp = hp
         self.hp = hp
         self.max_mana = mana
@@ -22,6 +38,7 @@ class Character:
         self.class_tier = 0  # 0 is base class, 6 is max tier
         self.class_title = ""  # Title based on class tier
         self.skills = []  # List of unlocked skills
+        self.tier_times = []  # time.time() each class tier was reached, tier 1 first
         self.luck = 0  # Hidden luck stat for shop items
         # Status effects
         self.attack_boost = 0
@@ -31,11 +48,46 @@ class Character:
         from items import Inventory  # Import here to avoid circular import
         self.inventory = Inventory(max_size=10)
         
+    def __setattr__(self, name, value):
+        """Record changes to persisted attributes"""
+        if name in Character.PERSISTED_FIELDS:
+            dirty = self.__dict__.get('_dirty')
+            if dirty is not None and self.__dict__.get(name) != value:
+                dirty.add(name)
+        object.__setattr__(self, name, value)
+        
+    def mark_dirty(self, field):
+        """Flag a field as changed, for changes made in place (e.g. equipment)"""
+        if self._dirty is not None:
+            self._dirty.add(field)
+            
+    def mark_clean(self):
+        """Start tracking changes from the current state, called after a save or load"""
+        self._dirty = set()
+        if hasattr(self, 'inventory') and hasattr(self.inventory, 'mark_clean'):
+            self.inventory.mark_clean()
+            
+    def mark_all_dirty(self):
+        """Forget the baseline so the next save writes everything"""
+        self._dirty = None
+        
+    def dirty_fields(self):
+        """Fields changed since the last save or load, None if everything must be written"""
+        if self._dirty is None:
+            return None
+        dirty = set(self._dirty)
+        if hasattr(self, 'inventory') and hasattr(self.inventory, 'dirty_fields'):
+            inventory_dirty = self.inventory.dirty_fields()
+            if inventory_dirty is None:
+                return None
+            dirty |= inventory_dirty
+        return dirty
+        
     def attack(self, target):
         """Basic attack that deals damage based on attack value with some randomness"""
         # If blocking, cancel block status and return without attacking
         if self.is_blocking:
-            print(f"{self.emoji} {self.name} lowers their guard and prepares to attack.")
+            say(f"{self.emoji} {self.name} lowers their guard and prepares to attack.")
             self.is_blocking = False
             return 0
             
@@ -48,18 +100,18 @@ class Character:
         if target.is_dodging:
             # 40% chance to completely avoid attack
             if random.random() < 0.4:
-                print(f"{target.emoji} {target.name} dodged the attack completely! 🌪️")
+                say(f"{target.emoji} {target.name} dodged the attack completely! 🌪️")
                 target.is_dodging = False  # Reset dodge after attempt
                 return 0
             else:
-                print(f"{target.emoji} {target.name} attempted to dodge but failed! 🌪️")
+                say(f"{target.emoji} {target.name} attempted to dodge but failed! 🌪️")
                 target.is_dodging = False  # Reset dodge after attempt
             
         # Apply damage reduction from target's defense
         effective_defense = target.defense
         if target.is_blocking:
             effective_defense *= 2
-            print(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
+            say(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
             
         damage = max(0, attack_value - effective_defense)
         
@@ -72,14 +124,14 @@ class Character:
     def special_attack(self, target):
         """Special attack that consumes mana but deals more damage"""
         if self.is_blocking:
-            print(f"{self.emoji} {self.name} lowers their guard and prepares to attack.")
+            say(f"{self.emoji} {self.name} lowers their guard and prepares to attack.")
             self.is_blocking = False
             
         # Default special attack costs 15 mana
         mana_cost = 15
         
         if self.mana < mana_cost:
-            print(f"{self.emoji} {self.name} doesn't have enough mana! ❌")
+            say(f"{self.emoji} {self.name} doesn't have enough mana! ❌")
             return 0
             
         # Consume mana
@@ -93,18 +145,18 @@ class Character:
         # Check if target is dodging - harder to dodge special attacks (30% chance)
         if target.is_dodging:
             if random.random() < 0.3:
-                print(f"{target.emoji} {target.name} dodged the special attack! 🌪️")
+                say(f"{target.emoji} {target.name} dodged the special attack! 🌪️")
                 target.is_dodging = False  # Reset dodge after attempt
                 return 0
             else:
-                print(f"{target.emoji} {target.name} attempted to dodge the special attack but failed! 🌪️")
+                say(f"{target.emoji} {target.name} attempted to dodge the special attack but failed! 🌪️")
                 target.is_dodging = False  # Reset dodge after attempt
             
         # Apply damage reduction from target's defense
         effective_defense = target.defense
         if target.is_blocking:
             effective_defense *= 2
-            print(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
+            say(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
             
         damage = max(0, attack_value - effective_defense)
         
@@ -129,7 +181,7 @@ class Character:
     def gain_xp(self, amount):
         """Gain experience points and level up if enough XP is accumulated"""
         self.xp += amount
-        print(f"{self.emoji} {self.name} gained {amount} XP!")
+        say(f"{self.emoji} {self.name} gained {amount} XP!")
         
         # Check for level up
         if self.xp >= self.xp_to_level:
@@ -174,8 +226,8 @@ class Character:
         # Set new XP threshold (increasing with each level)
         self.xp_to_level = int(self.xp_to_level * 1.5)
         
-        print(f"🌟 {self.emoji} {self.name} leveled up to level {self.level}! 🌟")
-        print(f"HP +{hp_increase}, Mana +{mana_increase}, Attack +{attack_increase}, Defense +{defense_increase}")
+        say(f"🌟 {self.emoji} {self.name} leveled up to level {self.level}! 🌟")
+        say(f"HP +{hp_increase}, Mana +{mana_increase}, Attack +{attack_increase}, Defense +{defense_increase}")
         
         # Check for class evolution at certain level thresholds
         # Evolution tiers: 0=Base, 1=Apprentice, 2=Adept, 3=Master, 4=Grand, 5=Elder, 6=Celestial
@@ -188,6 +240,9 @@ class Character:
         """Evolve the character's class to a higher tier"""
         old_tier = self.class_tier
         self.class_tier = new_tier
+        while len(self.tier_times) < new_tier:
+            self.tier_times.append(time.time())
+        self.mark_dirty('tier_times')  # Appended in place too
         
         # Base stat boosts for evolution (all classes)
         hp_boost = int(self.max_hp * 0.2)  # 20% HP increase
@@ -266,19 +321,20 @@ class Character:
             # Fallback for any other classes
             titles = ["Novice", "Initiate", "Adept", "Expert", "Master", "Grandmaster", "Celestial"]
             self.class_title = titles[new_tier]
+        self.mark_dirty('skills')  # Appended in place, so __setattr__ does not see it
         
         # Get old title for display
         old_title = titles[old_tier] if old_tier < len(titles) else "Unknown"
         
         # Display evolution message with fancy formatting
-        print("\n" + "="*60)
-        print(f"✨✨✨  CLASS EVOLUTION  ✨✨✨")
-        print("="*60)
-        print(f"{self.emoji} {self.name} has evolved from {old_title} to {self.class_title}!")
-        print(f"This evolution has granted significant power boosts:")
-        print(f"❤️ HP +{hp_boost} | 🔮 Mana +{mana_boost} | ⚔️ Attack +{attack_boost} | 🛡️ Defense +{defense_boost}")
-        print(f"New Skill Unlocked: {self.skills[-1]}!")
-        print("="*60 + "\n")
+        say("\n" + "="*60)
+        say(f"✨✨✨  CLASS EVOLUTION  ✨✨✨")
+        say("="*60)
+        say(f"{self.emoji} {self.name} has evolved from {old_title} to {self.class_title}!")
+        say(f"This evolution has granted significant power boosts:")
+        say(f"❤️ HP +{hp_boost} | 🔮 Mana +{mana_boost} | ⚔️ Attack +{attack_boost} | 🛡️ Defense +{defense_boost}")
+        say(f"New Skill Unlocked: {self.skills[-1]}!")
+        say("="*60 + "\n")
             
     def status(self):
         """Display character status"""
@@ -313,16 +369,16 @@ class Barbarian(Character):
     def special_attack(self, target):
         """Barbarian's rage attack deals heavy damage but costs more mana"""
         if self.is_blocking:
-            print(f"{self.emoji} {self.name} lowers their guard and prepares to attack.")
+            say(f"{self.emoji} {self.name} lowers their guard and prepares to attack.")
             self.is_blocking = False
             
         mana_cost = 20
         
         if self.mana < mana_cost:
-            print(f"{self.emoji} {self.name} doesn't have enough mana for Rage Attack! ❌")
+            say(f"{self.emoji} {self.name} doesn't have enough mana for Rage Attack! ❌")
             return 0
             
-        print(f"{self.emoji} {self.name} unleashes a powerful Rage Attack! 🔥")
+        say(f"{self.emoji} {self.name} unleashes a powerful Rage Attack! 🔥")
         self.mana -= mana_cost
         
         # Stronger attack with wider random range
@@ -333,7 +389,7 @@ class Barbarian(Character):
         effective_defense = target.defense
         if target.is_blocking:
             effective_defense *= 2
-            print(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
+            say(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
             
         damage = max(0, attack_value - effective_defense)
         target.hp = max(0, target.hp - damage)
@@ -351,7 +407,7 @@ class Archer(Character):
     def attack(self, target):
         """Archer's attacks have less randomness"""
         if self.is_blocking:
-            print(f"{self.emoji} {self.name} lowers their guard and prepares to attack.")
+            say(f"{self.emoji} {self.name} lowers their guard and prepares to attack.")
             self.is_blocking = False
             return 0
             
@@ -363,7 +419,7 @@ class Archer(Character):
         effective_defense = target.defense
         if target.is_blocking:
             effective_defense *= 2
-            print(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
+            say(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
             
         damage = max(0, attack_value - effective_defense)
         target.hp = max(0, target.hp - damage)
@@ -373,16 +429,16 @@ class Archer(Character):
     def special_attack(self, target):
         """Archer's precision shot has a chance to ignore defense"""
         if self.is_blocking:
-            print(f"{self.emoji} {self.name} lowers their guard and prepares to attack.")
+            say(f"{self.emoji} {self.name} lowers their guard and prepares to attack.")
             self.is_blocking = False
             
         mana_cost = 15
         
         if self.mana < mana_cost:
-            print(f"{self.emoji} {self.name} doesn't have enough mana for Precision Shot! ❌")
+            say(f"{self.emoji} {self.name} doesn't have enough mana for Precision Shot! ❌")
             return 0
             
-        print(f"{self.emoji} {self.name} takes aim for a Precision Shot! 🎯")
+        say(f"{self.emoji} {self.name} takes aim for a Precision Shot! 🎯")
         self.mana -= mana_cost
         
         # 30% chance to ignore defense
@@ -395,10 +451,10 @@ class Archer(Character):
         effective_defense = 0 if ignore_defense else target.defense
         if target.is_blocking and not ignore_defense:
             effective_defense *= 2
-            print(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
+            say(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
             
         if ignore_defense:
-            print(f"Critical hit! {self.emoji} The arrow finds a gap in the armor! ⚡")
+            say(f"Critical hit! {self.emoji} The arrow finds a gap in the armor! ⚡")
             
         damage = max(0, attack_value - effective_defense)
         target.hp = max(0, target.hp - damage)
@@ -416,16 +472,16 @@ class Mage(Character):
     def special_attack(self, target):
         """Mage's fireball spell deals high damage"""
         if self.is_blocking:
-            print(f"{self.emoji} {self.name} lowers their guard and prepares to cast.")
+            say(f"{self.emoji} {self.name} lowers their guard and prepares to cast.")
             self.is_blocking = False
             
         mana_cost = 25
         
         if self.mana < mana_cost:
-            print(f"{self.emoji} {self.name} doesn't have enough mana for Fireball! ❌")
+            say(f"{self.emoji} {self.name} doesn't have enough mana for Fireball! ❌")
             return 0
             
-        print(f"{self.emoji} {self.name} casts a powerful Fireball! 🔥")
+        say(f"{self.emoji} {self.name} casts a powerful Fireball! 🔥")
         self.mana -= mana_cost
         
         # High damage with significant randomness
@@ -436,7 +492,7 @@ class Mage(Character):
         effective_defense = target.defense
         if target.is_blocking:
             effective_defense *= 1.5  # Magic partially bypasses blocking
-            print(f"{target.emoji} {target.name} blocked but the spell partially penetrated! 🛡️🔮")
+            say(f"{target.emoji} {target.name} blocked but the spell partially penetrated! 🛡️🔮")
             
         damage = max(0, attack_value - effective_defense)
         target.hp = max(0, target.hp - damage)
@@ -446,13 +502,13 @@ class Mage(Character):
     def heal(self):
         """Mages can heal themselves"""
         if self.is_blocking:
-            print(f"{self.emoji} {self.name} lowers their guard to cast a spell.")
+            say(f"{self.emoji} {self.name} lowers their guard to cast a spell.")
             self.is_blocking = False
             
         mana_cost = 30
         
         if self.mana < mana_cost:
-            print(f"{self.emoji} {self.name} doesn't have enough mana to Heal! ❌")
+            say(f"{self.emoji} {self.name} doesn't have enough mana to Heal! ❌")
             return 0
             
         heal_amount = 25 + random.randint(0, 15)
@@ -463,7 +519,7 @@ class Mage(Character):
         self.hp = min(self.max_hp, self.hp + heal_amount)
         actual_heal = self.hp - old_hp
         
-        print(f"{self.emoji} {self.name} casts Heal and recovers {actual_heal} HP! ✨")
+        say(f"{self.emoji} {self.name} casts Heal and recovers {actual_heal} HP! ✨")
         return actual_heal
 
 
@@ -492,7 +548,7 @@ class DarkKnight(Villain):
         if self.mana < mana_cost:
             return super().special_attack(target)
             
-        print(f"{self.emoji} {self.name} performs a Dark Slash! ⚔️🌑")
+        say(f"{self.emoji} {self.name} performs a Dark Slash! ⚔️🌑")
         self.mana -= mana_cost
         
         attack_value = int(self.base_attack * 1.7) + random.randint(-5, 15)
@@ -510,7 +566,7 @@ class DarkKnight(Villain):
         heal_amount = int(damage * 0.3)
         self.hp = min(self.max_hp, self.hp + heal_amount)
         if heal_amount > 0:
-            print(f"{self.emoji} {self.name} absorbs {heal_amount} HP from the attack! 💉")
+            say(f"{self.emoji} {self.name} absorbs {heal_amount} HP from the attack! 💉")
         
         return damage
 
@@ -533,7 +589,7 @@ class DarkArcher(Villain):
         if self.mana < mana_cost:
             return super().special_attack(target)
             
-        print(f"{self.emoji} {self.name} fires a Poison Arrow! 🏹☠️")
+        say(f"{self.emoji} {self.name} fires a Poison Arrow! 🏹☠️")
         self.mana -= mana_cost
         
         attack_value = int(self.base_attack * 1.2) + random.randint(-5, 10)
@@ -551,7 +607,7 @@ class DarkArcher(Villain):
         self.target_poisoned = True
         poison_damage = random.randint(5, 8)
         target.hp = max(0, target.hp - poison_damage)
-        print(f"☠️ The poison deals an additional {poison_damage} damage to {target.name}!")
+        say(f"☠️ The poison deals an additional {poison_damage} damage to {target.name}!")
         
         # Return as integer to avoid type mismatch issues
         return int(damage + poison_damage)
@@ -574,7 +630,7 @@ class DarkMage(Villain):
         if self.mana < mana_cost:
             return super().special_attack(target)
             
-        print(f"{self.emoji} {self.name} unleashes Dark Energy Blast! 🌑✨")
+        say(f"{self.emoji} {self.name} unleashes Dark Energy Blast! 🌑✨")
         self.mana -= mana_cost
         
         attack_value = int(self.base_attack * 3) + random.randint(-5, 25)
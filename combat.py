@@ -1,46 +1,67 @@
 import random
 import time
 from items import Consumable
+from game_output import say
+
+def play_blocking(steps):
+    """Run a generator of prompts (e.g. Combat.execute_turn) to the end, answering each with input()"""
+    try:
+        prompt = next(steps)
+        while True:
+            prompt = steps.send(input(prompt))
+    except StopIteration as finished:
+        return finished.value
 
 class Combat:
-    """Handles combat between a player and villain"""
+    """
+    Handles combat between a player and villain
     
-    def __init__(self, player, villain):
+    Steps that need the player's input are generators yielding the prompt
+    and receiving the answer, see Game.step.
+    """
+    
+    def __init__(self, player, villain, delay=1.0):
         self.player = player
         self.villain = villain
+        self.delay = delay  # Seconds of pause after each turn, 0 for none
         self.turn = 0  # 0 for player's turn, 1 for villain's turn
         self.turn_count = 0  # Track how many turns have passed
         
     def start_combat(self):
         """Initialize combat"""
-        print("\n" + "="*50)
-        print(f"⚔️  COMBAT BEGINS: {self.player.emoji} {self.player.name} vs {self.villain.emoji} {self.villain.name}  ⚔️")
-        print("="*50 + "\n")
+        say("\n" + "="*50)
+        say(f"⚔️  COMBAT BEGINS: {self.player.emoji} {self.player.name} vs {self.villain.emoji} {self.villain.name}  ⚔️")
+        say("="*50 + "\n")
         
-        print(self.player.status())
-        print(self.villain.status())
-        print("\n")
+        say(self.player.status())
+        say(self.villain.status())
+        say("\n")
         
+    def pause(self):
+        """Wait between turns"""
+        if self.delay:
+            time.sleep(self.delay)
+            
     def player_turn(self):
         """Handle player's turn"""
-        print("\n" + "-"*50)
-        print(f"{self.player.emoji} {self.player.name}'s turn!")
-        print("-"*50)
+        say("\n" + "-"*50)
+        say(f"{self.player.emoji} {self.player.name}'s turn!")
+        say("-"*50)
         
-        action = self.get_player_action()
-        self.execute_player_action(action)
+        action = yield from self.get_player_action()
+        yield from self.execute_player_action(action)
         
         # Reset block status if not actively blocking this turn
         if action != "3" and self.player.is_blocking:
             self.player.is_blocking = False
             
-        time.sleep(1)
+        self.pause()
         
     def villain_turn(self):
         """Handle villain's turn"""
-        print("\n" + "-"*50)
-        print(f"{self.villain.emoji} {self.villain.name}'s turn!")
-        print("-"*50)
+        say("\n" + "-"*50)
+        say(f"{self.villain.emoji} {self.villain.name}'s turn!")
+        say("-"*50)
         
         # Simple AI for villain
         action = self.get_villain_action()
@@ -50,35 +71,35 @@ class Combat:
         if action != 3 and self.villain.is_blocking:
             self.villain.is_blocking = False
             
-        time.sleep(1)
+        self.pause()
         
     def get_player_action(self):
         """Get player's chosen action"""
-        print("\nChoose your action:")
-        print("1. Attack ⚔️")
-        print("2. Special Attack 🔥")
-        print("3. Block 🛡️")
-        print("4. Dodge 🌪️")
-        print("5. Use Item 🎒")
+        say("\nChoose your action:")
+        say("1. Attack ⚔️")
+        say("2. Special Attack 🔥")
+        say("3. Block 🛡️")
+        say("4. Dodge 🌪️")
+        say("5. Use Item 🎒")
         
         # Special case for Mage class - Add healing option
         if self.player.__class__.__name__ == "Mage":
-            print("6. Heal ✨")
+            say("6. Heal ✨")
             valid_actions = ["1", "2", "3", "4", "5", "6"]
         else:
             valid_actions = ["1", "2", "3", "4", "5"]
             
         while True:
-            action = input("Enter your choice (1-{}): ".format(len(valid_actions)))
+            action = yield "Enter your choice (1-{}): ".format(len(valid_actions))
             if action in valid_actions:
                 return action
-            print("Invalid choice. Try again.")
+            say("Invalid choice. Try again.")
             
     def execute_player_action(self, action):
         """Execute the player's chosen action"""
         if action == "1":  # Attack
             damage = self.player.attack(self.villain)
-            print(f"{self.player.emoji} {self.player.name} attacks for {damage} damage!")
+            say(f"{self.player.emoji} {self.player.name} attacks for {damage} damage!")
             
         elif action == "2":  # Special Attack
             # Different message based on class
@@ -95,18 +116,18 @@ class Combat:
                 
             damage = self.player.special_attack(self.villain)
             if damage > 0:
-                print(f"{self.player.emoji} {self.player.name}'s {special_name} deals {damage} damage!")
+                say(f"{self.player.emoji} {self.player.name}'s {special_name} deals {damage} damage!")
                 
         elif action == "3":  # Block
             self.player.block()
-            print(f"{self.player.emoji} {self.player.name} takes a defensive stance! 🛡️")
+            say(f"{self.player.emoji} {self.player.name} takes a defensive stance! 🛡️")
             
         elif action == "4":  # Dodge
             self.player.dodge()
-            print(f"{self.player.emoji} {self.player.name} prepares to dodge the next attack! 🌪️")
+            say(f"{self.player.emoji} {self.player.name} prepares to dodge the next attack! 🌪️")
             
         elif action == "5":  # Use Item
-            self.use_item()
+            yield from self.use_item()
             
         elif action == "6" and self.player.__class__.__name__ == "Mage":  # Heal (Mage only)
             self.player.heal()
@@ -123,18 +144,18 @@ class Combat:
             
         consumables = self.player.inventory.get_consumables()
         if not consumables:
-            print(f"{self.player.emoji} {self.player.name} has no usable items!")
+            say(f"{self.player.emoji} {self.player.name} has no usable items!")
             return
             
-        print("\nChoose an item to use:")
+        say("\nChoose an item to use:")
         for i, item in enumerate(consumables, 1):
-            print(f"{i}. {item}")
+            say(f"{i}. {item}")
             
         while True:
             try:
-                choice = input(f"Enter your choice (1-{len(consumables)}, or 0 to cancel): ")
+                choice = yield f"Enter your choice (1-{len(consumables)}, or 0 to cancel): "
                 if choice == "0":
-                    print("Canceled item use.")
+                    say("Canceled item use.")
                     return
                     
                 choice_idx = int(choice) - 1
@@ -144,9 +165,9 @@ class Combat:
                         self.player.inventory.remove_item(item)
                     return
                 else:
-                    print("Invalid choice. Try again.")
+                    say("Invalid choice. Try again.")
             except ValueError:
-                print("Please enter a number.")
+                say("Please enter a number.")
             
     def get_villain_action(self):
         """Determine villain's action based on simple AI"""
@@ -182,7 +203,7 @@ class Combat:
         """Execute the villain's chosen action"""
         if action == 1:  # Attack
             damage = self.villain.attack(self.player)
-            print(f"{self.villain.emoji} {self.villain.name} attacks for {damage} damage!")
+            say(f"{self.villain.emoji} {self.villain.name} attacks for {damage} damage!")
             
         elif action == 2:  # Special Attack
             # Different message based on class
@@ -199,11 +220,11 @@ class Combat:
                 
             damage = self.villain.special_attack(self.player)
             if damage > 0:
-                print(f"{self.villain.emoji} {self.villain.name}'s {special_name} deals {damage} damage!")
+                say(f"{self.villain.emoji} {self.villain.name}'s {special_name} deals {damage} damage!")
                 
         elif action == 3:  # Block
             self.villain.block()
-            print(f"{self.villain.emoji} {self.villain.name} takes a defensive stance! 🛡️")
+            say(f"{self.villain.emoji} {self.villain.name} takes a defensive stance! 🛡️")
             
         elif action == 4 and self.villain.__class__.__name__ == "DarkMage":  # DarkMage heal
             # Simple heal for Dark Mage
@@ -213,41 +234,41 @@ class Combat:
                 old_hp = self.villain.hp
                 self.villain.hp = min(self.villain.max_hp, self.villain.hp + heal_amount)
                 actual_heal = self.villain.hp - old_hp
-                print(f"{self.villain.emoji} {self.villain.name} casts Dark Healing and recovers {actual_heal} HP! 🌑✨")
+                say(f"{self.villain.emoji} {self.villain.name} casts Dark Healing and recovers {actual_heal} HP! 🌑✨")
             else:
                 # Fallback to attack if not enough mana
                 damage = self.villain.attack(self.player)
-                print(f"{self.villain.emoji} {self.villain.name} attacks for {damage} damage!")
+                say(f"{self.villain.emoji} {self.villain.name} attacks for {damage} damage!")
                 
     def check_combat_end(self):
         """Check if combat has ended"""
         if not self.player.is_alive():
-            print("\n" + "="*50)
-            print(f"💀 {self.player.emoji} {self.player.name} has been defeated! 💀")
-            print(f"{self.villain.emoji} {self.villain.name} wins with {self.villain.hp} HP remaining!")
-            print("="*50)
+            say("\n" + "="*50)
+            say(f"💀 {self.player.emoji} {self.player.name} has been defeated! 💀")
+            say(f"{self.villain.emoji} {self.villain.name} wins with {self.villain.hp} HP remaining!")
+            say("="*50)
             return True
             
         if not self.villain.is_alive():
-            print("\n" + "="*50)
-            print(f"🏆 {self.player.emoji} {self.player.name} is victorious! 🏆")
-            print(f"{self.villain.emoji} {self.villain.name} has been defeated!")
-            print("="*50)
+            say("\n" + "="*50)
+            say(f"🏆 {self.player.emoji} {self.player.name} is victorious! 🏆")
+            say(f"{self.villain.emoji} {self.villain.name} has been defeated!")
+            say("="*50)
             return True
             
         return False
         
     def display_status(self):
         """Display current status of combatants"""
-        print("\n" + "."*50)
-        print(self.player.status())
-        print(self.villain.status())
-        print("."*50 + "\n")
+        say("\n" + "."*50)
+        say(self.player.status())
+        say(self.villain.status())
+        say("."*50 + "\n")
         
     def execute_turn(self):
-        """Execute a single turn of combat"""
+        """Execute a single turn of combat, returns True once combat is over"""
         if self.turn == 0:
-            self.player_turn()
+            yield from self.player_turn()
             self.turn = 1
         else:
             self.villain_turn()
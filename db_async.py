@@ -0,0 +1,237 @@
+"""
+Asyncio access to saved characters, for hosting many players on one event loop
+
+The coroutines here mirror db_utils and share its models, load cache and
+save logic: each one opens an AsyncSession and runs the same synchronous
+code through run_sync, so the database driver is awaited instead of
+blocking the loop. They need an async driver, aiosqlite for SQLite or
+asyncpg for PostgreSQL, picked from DATABASE_URL automatically.
+
+The game itself keeps using db_utils. BlockingDatabase runs these
+coroutines on a private loop for synchronous code that has to share the
+async engine, and run_in_thread covers db_utils functions without an
+async version.
+"""
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from db_models import Session, get_database_url, engine_options, ensure_schema, _configure_sqlite
+from db_metrics import instrument
+from db_utils import (SaveConflictError, snapshot_character, _save_snapshot, _after_save, _merge_for_retry,
+                      _load_record, _build_character, _active_characters, _delete_character, _load_cache)
+
+# Sync URL scheme -> async driver for the same database
+_ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+}
+
+def get_async_database_url(url=None):
+    """DATABASE_URL with its driver swapped for an async one, unless it already names one"""
+    url = url or get_database_url()
+    scheme, separator, rest = url.partition('://')
+    if '+' in scheme:
+        return url
+    return _ASYNC_DRIVERS.get(scheme, scheme) + separator + rest
+
+# Async connections belong to the loop that opened them, so each loop gets its own engine
+_async_engines = weakref.WeakKeyDictionary()
+_async_engine_lock = threading.Lock()
+_schema_checked = False
+
+def get_async_engine():
+    """Return the async engine for the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    engine = _async_engines.get(loop)
+    if engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        with _async_engine_lock:
+            engine = _async_engines.get(loop)
+            if engine is None:
+                url = get_async_database_url()
+                engine = create_async_engine(url, **engine_options(url))
+                if engine.dialect.name == "sqlite":
+                    event.listen(engine.sync_engine, "connect", _configure_sqlite)
+                instrument(engine.sync_engine)
+                _async_engines[loop] = engine
+    return engine
+
+async def dispose_async_engine():
+    """Close the running loop's pooled connections, call before the loop shuts down"""
+    engine = _async_engines.pop(asyncio.get_running_loop(), None)
+    if engine is not None:
+        await engine.dispose()
+
+@asynccontextmanager
+async def async_session_scope():
+    """Async counterpart of session_scope"""
+    global _schema_checked
+    from sqlalchemy.ext.asyncio import AsyncSession
+    if not _schema_checked:
+        await asyncio.to_thread(ensure_schema)  # Once per process, through the sync engine
+        _schema_checked = True
+    
+    # Session.class_ carries the event listeners registered on db_models.Session
+    session = AsyncSession(bind=get_async_engine(), expire_on_commit=False, sync_session_class=Session.class_)
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+async def save_character(character, overwrite=False, on_conflict=None, retries=3):
+    """
+    Save character data to database without blocking the event loop
+    
+    Same arguments, result and SaveConflictError handling as db_utils.save_character.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await _write_character(character, overwrite)
+        except SaveConflictError as conflict:
+            if on_conflict is None or attempt == retries:
+                raise
+            stored = await load_character(conflict.character_id)
+            if stored is None:
+                raise
+            character = _merge_for_retry(character, stored, on_conflict)
+            if character is None:
+                return None
+
+async def _write_character(character, overwrite):
+    """One attempt at save_character, raising SaveConflictError on a conflict"""
+    try:
+        snapshot = snapshot_character(character)
+        async with async_session_scope() as session:
+            saved_character = await session.run_sync(_save_snapshot, snapshot, overwrite)
+        _after_save(character, snapshot, saved_character)
+        return saved_character
+    
+    except SaveConflictError:
+        raise
+    except SQLAlchemyError as e:
+        print(f"Database error: {e}")
+        return None
+    except Exception as e:
+        print(f"Error saving character: {e}")
+        return None
+
+async def load_character(character_id):
+    """
+    Load character data from database without blocking the event loop
+    
+    Args:
+        character_id: ID of character to load
+    
+    Returns:
+        Character object if successful, None otherwise
+    """
+    try:
+        async with async_session_scope() as session:
+            record = await session.run_sync(_load_record, character_id)
+        return _build_character(record) if record else None
+    
+    except SQLAlchemyError as e:
+        print(f"Database error: {e}")
+        return None
+    except Exception as e:
+        print(f"Error loading character: {e}")
+        return None
+
+async def get_all_characters():
+    """
+    Get all saved characters without blocking the event loop
+    
+    Returns:
+        List of SavedCharacter objects
+    """
+    try:
+        async with async_session_scope() as session:
+            return await session.run_sync(_active_characters)
+    except SQLAlchemyError as e:
+        print(f"Database error: {e}")
+        return []
+
+async def delete_character(character_id):
+    """
+    Delete character by ID (soft delete) without blocking the event loop
+    
+    Args:
+        character_id: ID of character to delete
+    
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        async with async_session_scope() as session:
+            deleted = await session.run_sync(_delete_character, character_id)
+        _load_cache.invalidate(character_id)
+        return deleted
+    
+    except SQLAlchemyError as e:
+        print(f"Database error: {e}")
+        return False
+    except Exception as e:
+        print(f"Error deleting character: {e}")
+        return False
+
+async def run_in_thread(func, *args, **kwargs):
+    """Await a blocking db_utils function (list_characters, append_journal, ...) on a worker thread"""
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+class BlockingDatabase:
+    """
+    Synchronous front for the coroutines above
+    
+    Runs its own event loop on a background thread and waits for each
+    call, so code that is not async can use the async engine, e.g. an
+    admin command inside a server process.
+    """
+    
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="db-async", daemon=True)
+        self._thread.start()
+    
+    def _run(self, coroutine):
+        """Run a coroutine on the private loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+    
+    def save_character(self, character, overwrite=False, on_conflict=None, retries=3):
+        """Blocking save_character"""
+        return self._run(save_character(character, overwrite, on_conflict, retries))
+    
+    def load_character(self, character_id):
+        """Blocking load_character"""
+        return self._run(load_character(character_id))
+    
+    def get_all_characters(self):
+        """Blocking get_all_characters"""
+        return self._run(get_all_characters())
+    
+    def delete_character(self, character_id):
+        """Blocking delete_character"""
+        return self._run(delete_character(character_id))
+    
+    def close(self):
+        """Close the loop's connections and stop its thread"""
+        if self._loop.is_closed():
+            return
+        self._run(dispose_async_engine())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
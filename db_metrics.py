@@ -0,0 +1,150 @@
+"""
+Per-action SQL statistics, switched on with DB_METRICS=1
+
+Engine event hooks count every statement sent to the database with its
+time and the rows it wrote, grouped by the game action that caused it:
+the menu choice Game is handling, or the thread name for work done off
+the game thread such as the background save writer. A statement that runs
+more than DB_METRICS_N1 times within one action is reported as a likely
+N+1 query, and a summary table is printed to stderr at exit.
+
+Nothing is hooked when DB_METRICS is unset, and this module does not
+import SQLAlchemy until an engine is instrumented.
+"""
+import os
+import sys
+import time
+import atexit
+import threading
+import contextvars
+from contextlib import contextmanager
+
+ENABLED = os.environ.get('DB_METRICS', '').lower() in ('1', 'true', 'yes', 'on')
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('DB_METRICS_N1', 10))
+
+
+class ActionStats:
+    """Statement totals for every run of one action"""
+    
+    def __init__(self):
+        self.runs = 0
+        self.statements = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.rows = 0
+    
+    def add(self, seconds, rows):
+        """Count one statement"""
+        self.statements += 1
+        self.seconds += seconds
+        self.slowest = max(self.slowest, seconds)
+        self.rows += rows
+
+
+class _Run(ActionStats):
+    """One run of an action, the unit N+1 detection looks at"""
+    
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.repeats = {}  # statement -> times run
+
+
+_current = contextvars.ContextVar('db_action', default=None)
+_totals = {}  # action name -> ActionStats
+_lock = threading.Lock()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Note when a statement started"""
+    conn.info.setdefault('db_metrics_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Charge a finished statement to the current action"""
+    seconds = time.perf_counter() - conn.info['db_metrics_started'].pop()
+    rows = max(cursor.rowcount or 0, 0)  # Rows written; drivers report -1 for SELECT
+    run = _current.get()
+    
+    if run is None:
+        with _lock:
+            _totals.setdefault(f"({threading.current_thread().name})", ActionStats()).add(seconds, rows)
+        return
+    
+    run.add(seconds, rows)
+    repeats = run.repeats[statement] = run.repeats.get(statement, 0) + 1
+    if repeats == N_PLUS_ONE_THRESHOLD + 1:
+        print(f"⚠️ Possible N+1 query during '{run.name}', this statement ran more than "
+              f"{N_PLUS_ONE_THRESHOLD} times:\n    {' '.join(statement.split())[:200]}", file=sys.stderr)
+
+def instrument(engine):
+    """Attach the statement hooks to an engine, if DB_METRICS is on"""
+    if not ENABLED:
+        return
+    from sqlalchemy import event
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+def _finish(run):
+    """Add a finished run to the totals"""
+    with _lock:
+        stats = _totals.setdefault(run.name, ActionStats())
+        stats.runs += 1
+        stats.statements += run.statements
+        stats.seconds += run.seconds
+        stats.slowest = max(stats.slowest, run.slowest)
+        stats.rows += run.rows
+
+def start_action(name):
+    """Charge statements from here on to a new run of name, finishing the current one"""
+    if not ENABLED:
+        return
+    finish_action()
+    _current.set(_Run(name))
+
+def finish_action():
+    """Finish the current action, later statements are charged to the thread"""
+    run = _current.get()
+    if run is not None:
+        _current.set(None)
+        _finish(run)
+
+@contextmanager
+def action(name):
+    """Charge the statements run inside the block to one run of name"""
+    if not ENABLED:
+        yield
+        return
+    run = _Run(name)
+    token = _current.set(run)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+        _finish(run)
+
+def report():
+    """Totals per action, most database time first, as a printable table"""
+    with _lock:
+        rows = sorted(_totals.items(), key=lambda item: item[1].seconds, reverse=True)
+    lines = [f"{'action':<28} {'runs':>5} {'queries':>8} {'per run':>8} {'total ms':>9} {'avg ms':>7} "
+             f"{'max ms':>7} {'rows':>6}"]
+    for name, stats in rows:
+        per_run = f"{stats.statements / stats.runs:.1f}" if stats.runs else "-"
+        average = stats.seconds / stats.statements * 1000 if stats.statements else 0.0
+        lines.append(f"{name[:28]:<28} {stats.runs or '-':>5} {stats.statements:>8} {per_run:>8} "
+                     f"{stats.seconds * 1000:>9.1f} {average:>7.2f} {stats.slowest * 1000:>7.2f} {stats.rows:>6}")
+    return "\n".join(lines)
+
+def reset():
+    """Forget everything counted so far"""
+    with _lock:
+        _totals.clear()
+
+def _print_report():
+    """Exit hook printing the summary"""
+    finish_action()
+    if _totals:
+        print("\nDatabase queries by action\n" + report(), file=sys.stderr)
+
+if ENABLED:
+    atexit.register(_print_report)
@@ -1,18 +1,102 @@
 """Database models for RPG game"""
 import os
 import json
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Text, LargeBinary, DateTime, Float, ForeignKey, Boolean, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, relationship
+from db_metrics import instrument
 
-# Get database URL from environment variables
-DATABASE_URL = os.environ.get("DATABASE_URL")
+# Used when DATABASE_URL is not set: a SQLite file next to the game
+DEFAULT_DATABASE_URL = "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "rpg_game.db")
 
-# Create engine and session
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-session = Session()
+# Bump whenever the models change so existing databases get upgraded once
+SCHEMA_VERSION = 8
+
+def get_database_url():
+    """Database URL from the environment, or the local SQLite default"""
+    return os.environ.get("DATABASE_URL") or DEFAULT_DATABASE_URL
+
+def _env_int(name, default):
+    """Read an integer setting from the environment"""
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def _env_bool(name, default):
+    """Read a yes/no setting from the environment"""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def engine_options(url):
+    """
+    Engine and pool settings for a database URL
+    
+    Pool settings can be tuned with DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE (seconds) and DB_POOL_PRE_PING.
+    """
+    options = {
+        'pool_pre_ping': _env_bool("DB_POOL_PRE_PING", True),
+        'pool_recycle': _env_int("DB_POOL_RECYCLE", 1800),
+    }
+    
+    in_memory = url.startswith("sqlite") and (url.endswith(":memory:") or url.rstrip("/") == "sqlite:")
+    if url.startswith("sqlite"):
+        # Sessions are opened per operation and may run on any thread
+        options['connect_args'] = {'check_same_thread': False}
+    if not in_memory:
+        options['pool_size'] = _env_int("DB_POOL_SIZE", 5)
+        options['max_overflow'] = _env_int("DB_MAX_OVERFLOW", 10)
+    return options
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Per-connection SQLite settings so several writers can share the file"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={_env_int('SQLITE_BUSY_TIMEOUT', 5000)}")
+    cursor.close()
+
+# The engine is created on first use so importing the models stays cheap
+_engine = None
+_engine_lock = threading.Lock()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def get_engine():
+    """Return the shared engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                url = get_database_url()
+                new_engine = create_engine(url, **engine_options(url))
+                if new_engine.dialect.name == "sqlite":
+                    event.listen(new_engine, "connect", _configure_sqlite)
+                instrument(new_engine)
+                _engine = new_engine
+    return _engine
+
+# Loaded attributes stay readable after the session that loaded them closes
+Session = sessionmaker(expire_on_commit=False)
+
+@contextmanager
+def session_scope():
+    """Open a session for one unit of work, committing if it succeeds"""
+    ensure_schema()
+    session = Session(bind=get_engine())
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 
 # Create declarative base
 Base = declarative_base()
@@ -38,16 +122,34 @@ class SavedCharacter(Base):
     gold = Column(Integer, default=0)
     luck = Column(Integer, default=0)  # Hidden luck stat for shop items
     created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(Float)  # time.time() when the character was created, None for older saves
     last_saved = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    journal_seq = Column(Integer, default=0)  # Last save_journal entry folded into this row
+    version = Column(Integer, nullable=False, default=0)  # Bumped by every save, see __mapper_args__
     
     # JSON fields for more complex data
     inventory_items = Column(Text, default='[]')  # JSON string of items
     equipment = Column(Text, default='{}')  # JSON string of equipped items
     skills = Column(Text, default='[]')  # JSON string of unlocked skills
+    tier_times = Column(Text, default='[]')  # JSON list of time.time() each class tier was reached
+    save_blob = Column(LargeBinary)  # Bag and equipment packed by save_codec, when SAVE_CODEC=binary
     
     # Relationships
-    items = relationship("SavedItem", back_populates="character", cascade="all, delete-orphan")
+    items = relationship("SavedItem", back_populates="character", cascade="all, delete-orphan",
+                         order_by="SavedItem.id")
+    
+    __table_args__ = (
+        # Save lookups by name and class only ever look at active rows
+        Index('ix_saved_characters_active_name_class', name, character_class,
+              postgresql_where=(is_active == True), sqlite_where=(is_active == True)),
+        # Active-only listings, newest saves first
+        Index('ix_saved_characters_active_last_saved', is_active, last_saved),
+    )
+    # Updates only apply WHERE version still matches what was read, and a
+    # lost race raises StaleDataError. Saves set the new version themselves
+    # so storage-only rewrites (save_codec convert) leave it alone.
+    __mapper_args__ = {'version_id_col': version, 'version_id_generator': False}
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -69,22 +171,32 @@ class SavedCharacter(Base):
             'gold': self.gold,
             'luck': self.luck,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at,
             'last_saved': self.last_saved.isoformat() if self.last_saved else None,
+            'version': self.version,
             'inventory_items': json.loads(self.inventory_items),
             'equipment': json.loads(self.equipment),
             'skills': json.loads(self.skills),
+            'tier_times': json.loads(self.tier_times or '[]'),
+            'items': [item.to_dict() for item in self.items],
         }
 
 class SavedItem(Base):
-    """Model for saved items"""
+    """Model for saved items, one row per item in a character's bag or equipment slot"""
     __tablename__ = 'saved_items'
+    __table_args__ = (
+        Index('ix_saved_items_type_quality', 'item_type', 'quality'),
+    )
     
     id = Column(Integer, primary_key=True)
-    character_id = Column(Integer, ForeignKey('saved_characters.id'), nullable=False)
+    character_id = Column(Integer, ForeignKey('saved_characters.id'), nullable=False, index=True)
     name = Column(String(100), nullable=False)
     description = Column(Text)
-    item_type = Column(String(20))  # weapon, armor, accessory, consumable, etc.
+    item_type = Column(String(20))  # weapon, armor, accessory, health_potion, etc.
     value = Column(Integer, default=0)
+    quality = Column(String(20))  # common, uncommon, rare (equipment only)
+    location = Column(String(10), nullable=False, default='bag')  # 'bag' or 'slot'
+    slot = Column(String(20))  # Equipment slot when location is 'slot'
     
     # JSON field for item-specific attributes
     attributes = Column(Text, default='{}')  # JSON string for attributes like damage, defense, etc.
@@ -100,13 +212,149 @@ class SavedItem(Base):
             'description': self.description,
             'item_type': self.item_type,
             'value': self.value,
+            'quality': self.quality,
+            'location': self.location,
+            'slot': self.slot,
             'attributes': json.loads(self.attributes),
         }
 
+class SaveJournalEntry(Base):
+    """Model for one change journaled since a character's last full save"""
+    __tablename__ = 'save_journal'
+    __table_args__ = (
+        UniqueConstraint('character_id', 'seq', name='uq_save_journal_character_seq'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    character_id = Column(Integer, ForeignKey('saved_characters.id'), nullable=False)
+    seq = Column(Integer, nullable=False)  # Replay order within the character
+    event_type = Column(String(20), nullable=False)  # gold, xp, stats, skills, tier_times, item_added, item_removed, equip
+    payload = Column(Text, default='{}')  # JSON string with the event data
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'character_id': self.character_id,
+            'seq': self.seq,
+            'event_type': self.event_type,
+            'payload': json.loads(self.payload),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+class ArchivedCharacter(Base):
+    """Model for a deleted save moved out of saved_characters by the maintenance job"""
+    __tablename__ = 'archived_characters'
+    
+    id = Column(Integer, primary_key=True)
+    original_id = Column(Integer, nullable=False, index=True)  # saved_characters id it had
+    name = Column(String(50), nullable=False)
+    character_class = Column(String(20), nullable=False)
+    deleted_at = Column(DateTime)  # last_saved of the row, which a soft delete bumps
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed JSON export record
+    
+    def to_dict(self):
+        """Convert to dictionary, without the payload"""
+        return {
+            'id': self.id,
+            'original_id': self.original_id,
+            'name': self.name,
+            'character_class': self.character_class,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None,
+        }
+
+class LeaderboardEntry(Base):
+    """Model for one character's score on one leaderboard, kept up to date by saves"""
+    __tablename__ = 'leaderboard_entries'
+    __table_args__ = (
+        UniqueConstraint('character_id', 'board', name='uq_leaderboard_character_board'),
+        Index('ix_leaderboard_board_score', 'board', 'score', 'recorded_at'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    board = Column(String(20), nullable=False)  # level, gold, tier_1 ... tier_6
+    character_id = Column(Integer, ForeignKey('saved_characters.id'), nullable=False)
+    name = Column(String(50), nullable=False)  # Copied so rankings never join saved_characters
+    character_class = Column(String(20), nullable=False)
+    score = Column(Integer, nullable=False)  # Seconds from creation on the tier boards
+    recorded_at = Column(DateTime, default=datetime.utcnow)  # When the score was reached, breaks ties
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'board': self.board,
+            'character_id': self.character_id,
+            'name': self.name,
+            'character_class': self.character_class,
+            'score': self.score,
+            'recorded_at': self.recorded_at.isoformat() if self.recorded_at else None,
+        }
+
+def upgrade_schema(bind):
+    """Add columns and indexes that older databases were created without"""
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                # Existing rows get numeric defaults such as a version of 0 rather than NULL
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if type(default) is int:
+                    column_type += f' DEFAULT {default}'
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                
+    # Indexes added after a table was first created are missing there
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+class SchemaInfo(Base):
+    """Single-row table recording which SCHEMA_VERSION the database is at"""
+    __tablename__ = 'schema_info'
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+def _stored_schema_version(bind):
+    """Schema version recorded in the database, None if never recorded"""
+    try:
+        with bind.connect() as conn:
+            return conn.execute(text("SELECT version FROM schema_info WHERE id = 1")).scalar()
+    except SQLAlchemyError:
+        return None  # schema_info does not exist yet
+
 # Create all tables
 def init_db():
     """Initialize database tables"""
+    global _schema_ready
+    engine = get_engine()
     Base.metadata.create_all(engine)
+    upgrade_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(SchemaInfo.__table__.delete())
+        conn.execute(SchemaInfo.__table__.insert().values(id=1, version=SCHEMA_VERSION))
+    _schema_ready = True
+
+def ensure_schema():
+    """Run init_db once per process, and only if the stored version is behind"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        if _stored_schema_version(get_engine()) == SCHEMA_VERSION:
+            _schema_ready = True
+            return
+        init_db()
 
 if __name__ == "__main__":
     # Initialize database
@@ -1,208 +1,745 @@
 """Utility functions for database operations"""
+import os
 import json
 from datetime import datetime
+from sqlalchemy import func, select, insert, update, delete, bindparam
 from sqlalchemy.exc import SQLAlchemyError
-from db_models import session, SavedCharacter, SavedItem, init_db
-from items import Item, Equipment, Consumable, Weapon, Armor, Accessory, HealthPotion, ManaPotion, StrengthElixir
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+from db_models import session_scope, SavedCharacter, SavedItem, SaveJournalEntry
+from items import Weapon, Armor, Accessory, HealthPotion, ManaPotion, StrengthElixir
 from characters import Barbarian, Archer, Mage
+from save_codec import encode_items, decode_items, CodecError
+from save_cache import LoadCache
+from leaderboards import record_scores, forget_character
+from game_output import say
 
-# Initialize the database
-init_db()
+# 'rows' keeps items in saved_items, 'binary' packs them into saved_characters.save_blob
+SAVE_CODEC = os.environ.get('SAVE_CODEC', 'rows')
 
-def save_character(character, overwrite=False):
+
+class SaveConflictError(Exception):
+    """Raised when a save was written elsewhere since this copy of the character was saved or loaded"""
+    
+    def __init__(self, character_id, expected_version, actual_version=None):
+        self.character_id = character_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version  # None if another writer won between read and write
+        if actual_version is None:
+            super().__init__(f"Save {character_id} was written elsewhere while saving over version {expected_version}")
+        else:
+            super().__init__(f"Save {character_id} is at version {actual_version}, expected {expected_version}")
+
+
+# Statements on the save, load and journal hot paths, built once with bound
+# parameters so calls skip rebuilding them and reuse their compiled SQL
+_characters = SavedCharacter.__table__
+_saved_items = SavedItem.__table__
+_journal = SaveJournalEntry.__table__
+
+_SELECT_SAVE = select(SavedCharacter).where(
+    SavedCharacter.id == bindparam('character_id'),
+    SavedCharacter.is_active == True
+)
+_SELECT_SAVE_BY_NAME = select(SavedCharacter).where(
+    SavedCharacter.name == bindparam('name'),
+    SavedCharacter.character_class == bindparam('character_class'),
+    SavedCharacter.is_active == True
+).limit(1)
+# No .values(): the SET clause follows the columns passed to each execute
+_UPDATE_SAVE = update(_characters).where(
+    _characters.c.id == bindparam('character_id'),
+    _characters.c.version == bindparam('expected_version')
+)
+_SELECT_LOAD_TOKEN = select(
+    _characters.c.version,
+    select(func.max(_journal.c.seq)).where(_journal.c.character_id == _characters.c.id).scalar_subquery()
+).where(_characters.c.id == bindparam('character_id'), _characters.c.is_active == True)
+_SELECT_ROW = select(_characters).where(_characters.c.id == bindparam('character_id'), _characters.c.is_active == True)
+_SELECT_ITEMS = select(_saved_items).where(_saved_items.c.character_id == bindparam('character_id')).order_by(_saved_items.c.id)
+_INSERT_ITEMS = insert(_saved_items)
+_DELETE_ITEMS = delete(_saved_items).where(_saved_items.c.id.in_(bindparam('ids', expanding=True)))
+_DELETE_CHARACTER_ITEMS = delete(_saved_items).where(_saved_items.c.character_id == bindparam('character_id'))
+_SELECT_JOURNAL_STATE = select(_characters.c.journal_seq, _characters.c.version).where(
+    _characters.c.id == bindparam('character_id'),
+    _characters.c.is_active == True
+)
+_SELECT_JOURNAL = select(_journal.c.seq, _journal.c.event_type, _journal.c.payload).where(
+    _journal.c.character_id == bindparam('character_id'),
+    _journal.c.seq > bindparam('after_seq')
+).order_by(_journal.c.seq)
+_INSERT_JOURNAL = insert(_journal)
+_FOLD_JOURNAL = delete(_journal).where(
+    _journal.c.character_id == bindparam('character_id'),
+    _journal.c.seq <= bindparam('through_seq')
+)
+_DELETE_CHARACTER_JOURNAL = delete(_journal).where(_journal.c.character_id == bindparam('character_id'))
+
+
+# Item class -> (type name, function adding the type's own fields)
+_ITEM_ENCODERS = {}
+# Type name -> function building the item from its serialized dict
+_ITEM_DECODERS = {}
+
+def register_item_type(item_class, type_name, encode, decode):
     """
-    Save character data to database
+    Add an item type to the save format
     
     Args:
-        character: Character object to save
-        overwrite: Whether to overwrite existing character with same name
+        item_class: Class of the items; subclasses without their own entry save as this type
+        type_name: Name stored in saves, must never change
+        encode: Function(item, item_data) adding the type's own fields to item_data
+        decode: Function(item_data) returning the item
+    """
+    _ITEM_ENCODERS[item_class] = (type_name, encode)
+    _ITEM_DECODERS[type_name] = decode
+
+def _template(item_class, *args):
+    """Attributes of a freshly constructed item, copied into every item hydrated from it"""
+    return dict(item_class(*args).__dict__)
+
+def _equipment_decoder(item_class, stat_boost):
+    """Decoder for an Equipment class, stat_boost maps item_data to the item's stat_boost dict"""
+    template = _template(item_class, '', '', 0, 0)  # Only supplies emoji and slot
+    new = item_class.__new__
     
-    Returns:
-        SavedCharacter object if successful, None otherwise
+    def decode(item_data):
+        # Fill the instance dict directly rather than running the constructor chain
+        item = new(item_class)
+        state = item.__dict__
+        state.update(template)
+        state['name'] = item_data['name']
+        state['description'] = item_data['description']
+        state['value'] = item_data['value']
+        state['stat_boost'] = stat_boost(item_data)
+        state['quality'] = item_data.get('quality') or 'common'
+        return item
+    return decode
+
+def _consumable_decoder(item_class, sized=True):
+    """Decoder for a consumable whose name, description and value follow from its size, if sized"""
+    templates = {}  # size -> template, filled in as sizes are seen
+    new = item_class.__new__
+    
+    def decode(item_data):
+        size = item_data.get('size', 'small') if sized else None
+        template = templates.get(size)
+        if template is None:
+            template = templates[size] = _template(item_class, size) if sized else _template(item_class)
+        item = new(item_class)
+        item.__dict__.update(template)
+        uses = item_data.get('uses', 1)
+        if uses != 1:
+            item.uses = uses
+        return item
+    return decode
+
+def _encode_weapon(item, item_data):
+    """Weapon fields"""
+    item_data['attack_boost'] = item.stat_boost.get('attack', 0)
+    item_data['quality'] = item.quality
+
+def _encode_armor(item, item_data):
+    """Armor fields"""
+    item_data['defense_boost'] = item.stat_boost.get('defense', 0)
+    item_data['quality'] = item.quality
+
+def _encode_accessory(item, item_data):
+    """Accessory fields"""
+    item_data['stat_boosts'] = dict(item.stat_boost)  # Copied so snapshots stay detached
+    item_data['quality'] = item.quality
+
+def _encode_potion(item, item_data):
+    """Health and mana potion fields"""
+    item_data['size'] = item.size
+    item_data['uses'] = item.uses
+
+def _encode_consumable(item, item_data):
+    """Fields of a consumable without a size"""
+    item_data['uses'] = item.uses
+
+register_item_type(Weapon, 'weapon', _encode_weapon,
+                   _equipment_decoder(Weapon, lambda item_data: {'attack': item_data.get('attack_boost', 0)}))
+register_item_type(Armor, 'armor', _encode_armor,
+                   _equipment_decoder(Armor, lambda item_data: {'defense': item_data.get('defense_boost', 0)}))
+register_item_type(Accessory, 'accessory', _encode_accessory,
+                   _equipment_decoder(Accessory, lambda item_data: dict(item_data.get('stat_boosts', {}))))
+register_item_type(HealthPotion, 'health_potion', _encode_potion,
+                   _consumable_decoder(HealthPotion))
+register_item_type(ManaPotion, 'mana_potion', _encode_potion,
+                   _consumable_decoder(ManaPotion))
+register_item_type(StrengthElixir, 'strength_elixir', _encode_consumable,
+                   _consumable_decoder(StrengthElixir, sized=False))
+
+def _serialize_item(item):
+    """Convert an item to a plain dict for storage"""
+    item_data = {
+        'name': item.name,
+        'description': item.description,
+        'value': item.value,
+    }
+    
+    item_class = type(item)
+    entry = _ITEM_ENCODERS.get(item_class)
+    if entry is None:
+        # Subclasses save as their nearest registered base
+        entry = next((_ITEM_ENCODERS[cls] for cls in item_class.__mro__ if cls in _ITEM_ENCODERS), None)
+    if entry is not None:
+        item_data['type'] = entry[0]
+        entry[1](item, item_data)
+    return item_data
+
+def _deserialize_item(item_data):
+    """Rebuild an item from its stored dict, None for unknown types"""
+    decode = _ITEM_DECODERS.get(item_data.get('type'))
+    return decode(item_data) if decode else None
+
+# Keys of a serialized item that have their own saved_items column
+_ITEM_COLUMNS = ('name', 'description', 'value', 'type', 'quality')
+
+def _item_row_values(item_data, location, slot=None):
+    """Column values for the saved_items row holding a serialized item"""
+    attributes = {key: value for key, value in item_data.items() if key not in _ITEM_COLUMNS}
+    return {
+        'name': item_data['name'],
+        'description': item_data['description'],
+        'value': item_data['value'],
+        'item_type': item_data.get('type'),
+        'quality': item_data.get('quality'),
+        'location': location,
+        'slot': slot,
+        'attributes': json.dumps(attributes, sort_keys=True),
+    }
+
+def _item_row_key(values):
+    """Identity of an item row, rows with equal keys hold interchangeable items"""
+    return tuple(values[column] for column in ('location', 'slot', 'item_type', 'name',
+                                               'description', 'value', 'quality', 'attributes'))
+
+def _row_item_data(row):
+    """Serialized item dict from its saved_items row"""
+    item_data = json.loads(row.attributes or '{}')
+    item_data.update({
+        'name': row.name,
+        'description': row.description,
+        'value': row.value,
+        'type': row.item_type,
+        'quality': row.quality,
+    })
+    return item_data
+
+def _stored_items(saved_character, item_rows=None):
     """
-    try:
-        # Check if character with same name exists
-        existing_character = session.query(SavedCharacter).filter_by(
-            name=character.name,
-            character_class=character.__class__.__name__,
-            is_active=True
-        ).first()
+    Bag list and equipment dict of serialized items, from wherever the save keeps them
+    
+    item_rows are the save's saved_items rows when already read, otherwise
+    they come from saved_character.items.
+    """
+    if saved_character.save_blob:
+        return decode_items(saved_character.save_blob)
         
-        if existing_character and not overwrite:
-            return None  # Don't overwrite
+    if item_rows is None:
+        item_rows = saved_character.items
+    if item_rows:
+        bag = []
+        equipment = {}
+        for row in item_rows:
+            if row.location == 'slot':
+                equipment[row.slot] = _row_item_data(row)
+            else:
+                bag.append(_row_item_data(row))
+        return bag, equipment
         
-        if existing_character:
-            # Update existing character
-            existing_character.level = character.level
-            existing_character.xp = character.xp
-            existing_character.xp_to_level = character.xp_to_level
-            existing_character.hp = character.hp
-            existing_character.max_hp = character.max_hp
-            existing_character.mana = character.mana
-            existing_character.max_mana = character.max_mana
-            existing_character.base_attack = character.base_attack
-            existing_character.defense = character.defense
-            existing_character.luck = character.luck if hasattr(character, 'luck') else 0
-            existing_character.last_saved = datetime.utcnow()
-            
-            # Save inventory gold
-            if hasattr(character, 'inventory') and character.inventory:
-                existing_character.gold = character.inventory.gold
-                
-                # Save inventory items
-                inventory_items = []
-                for item in character.inventory.items:
-                    item_data = {
-                        'name': item.name,
-                        'description': item.description,
-                        'value': item.value,
-                    }
-                    
-                    # Add type-specific data
-                    if isinstance(item, Weapon):
-                        item_data['type'] = 'weapon'
-                        item_data['attack_boost'] = item.stat_boost.get('attack', 0)
-                    elif isinstance(item, Armor):
-                        item_data['type'] = 'armor'
-                        item_data['defense_boost'] = item.stat_boost.get('defense', 0)
-                    elif isinstance(item, Accessory):
-                        item_data['type'] = 'accessory'
-                        item_data['stat_boosts'] = item.stat_boost
-                    elif isinstance(item, HealthPotion):
-                        item_data['type'] = 'health_potion'
-                        item_data['size'] = item.size
-                    elif isinstance(item, ManaPotion):
-                        item_data['type'] = 'mana_potion'
-                        item_data['size'] = item.size
-                    elif isinstance(item, StrengthElixir):
-                        item_data['type'] = 'strength_elixir'
-                    
-                    inventory_items.append(item_data)
-                
-                existing_character.inventory_items = json.dumps(inventory_items)
-            
-            # Save equipment
-            if hasattr(character, 'equipment') and character.equipment:
-                equipment_data = {}
-                for slot, item in character.equipment.items():
-                    item_data = {
-                        'name': item.name,
-                        'description': item.description,
-                        'value': item.value,
-                    }
-                    
-                    # Add type-specific data
-                    if isinstance(item, Weapon):
-                        item_data['type'] = 'weapon'
-                        item_data['attack_boost'] = item.stat_boost.get('attack', 0)
-                    elif isinstance(item, Armor):
-                        item_data['type'] = 'armor'
-                        item_data['defense_boost'] = item.stat_boost.get('defense', 0)
-                    elif isinstance(item, Accessory):
-                        item_data['type'] = 'accessory'
-                        item_data['stat_boosts'] = item.stat_boost
-                    
-                    equipment_data[slot] = item_data
-                
-                existing_character.equipment = json.dumps(equipment_data)
+    # Saves written before saved_items keep everything in JSON columns
+    return (json.loads(saved_character.inventory_items or '[]'),
+            json.loads(saved_character.equipment or '{}'))
+
+def _item_changes(item_rows, snapshot):
+    """
+    Compare stored saved_items rows with a snapshot's bag and equipment
+    
+    Rows holding an unchanged item are kept as they are, so picking up or
+    using a single potion costs one INSERT or DELETE instead of a rewrite.
+    
+    Returns:
+        (column values of the rows to insert, stored rows to delete)
+    """
+    wanted = [_item_row_values(item_data, 'bag') for item_data in snapshot['bag']]
+    for slot, item_data in snapshot['equipment'].items():
+        wanted.append(_item_row_values(item_data, 'slot', slot))
             
-            saved_character = existing_character
+    # Index the rows already stored for this character
+    unmatched = {}
+    for row in item_rows:
+        row_values = {
+            'name': row.name,
+            'description': row.description,
+            'value': row.value,
+            'item_type': row.item_type,
+            'quality': row.quality,
+            'location': row.location,
+            'slot': row.slot,
+            'attributes': row.attributes,
+        }
+        unmatched.setdefault(_item_row_key(row_values), []).append(row)
+        
+    inserts = []
+    for values in wanted:
+        rows = unmatched.get(_item_row_key(values))
+        if rows:
+            rows.pop()  # Identical item already stored
         else:
-            # Create new character record
-            inventory_items = []
-            equipment_data = {}
-            gold = 0
+            inserts.append(values)
+    return inserts, [row for rows in unmatched.values() for row in rows]
+
+def _sync_items(saved_character, snapshot):
+    """Bring the character's saved_items rows in line with a snapshot's bag and equipment"""
+    inserts, leftovers = _item_changes(saved_character.items, snapshot)
+    for values in inserts:
+        saved_character.items.append(SavedItem(**values))
+        
+    # Whatever is left over is no longer carried (delete-orphan removes the row)
+    for row in leftovers:
+        saved_character.items.remove(row)
             
-            # Save inventory if it exists
-            if hasattr(character, 'inventory') and character.inventory:
-                gold = character.inventory.gold
-                
-                # Save inventory items
-                for item in character.inventory.items:
-                    item_data = {
-                        'name': item.name,
-                        'description': item.description,
-                        'value': item.value,
-                    }
-                    
-                    # Add type-specific data
-                    if isinstance(item, Weapon):
-                        item_data['type'] = 'weapon'
-                        item_data['attack_boost'] = item.stat_boost.get('attack', 0)
-                    elif isinstance(item, Armor):
-                        item_data['type'] = 'armor'
-                        item_data['defense_boost'] = item.stat_boost.get('defense', 0)
-                    elif isinstance(item, Accessory):
-                        item_data['type'] = 'accessory'
-                        item_data['stat_boosts'] = item.stat_boost
-                    elif isinstance(item, HealthPotion):
-                        item_data['type'] = 'health_potion'
-                        item_data['size'] = item.size
-                    elif isinstance(item, ManaPotion):
-                        item_data['type'] = 'mana_potion'
-                        item_data['size'] = item.size
-                    elif isinstance(item, StrengthElixir):
-                        item_data['type'] = 'strength_elixir'
-                    
-                    inventory_items.append(item_data)
+    # Items now live in saved_items, drop the blob and legacy JSON copies
+    if saved_character.save_blob is not None:
+        saved_character.save_blob = None
+    if saved_character.inventory_items != '[]':
+        saved_character.inventory_items = '[]'
+    if saved_character.equipment != '{}':
+        saved_character.equipment = '{}'
+
+def _store_blob(saved_character, snapshot):
+    """
+    Pack a snapshot's bag and equipment into save_blob, replacing any saved_items rows
+    
+    Returns False, changing nothing, if an item has no binary format.
+    """
+    try:
+        saved_character.save_blob = encode_items(snapshot['bag'], snapshot['equipment'])
+    except CodecError:
+        return False
+    if saved_character.id is not None and saved_character.items:
+        saved_character.items.clear()  # delete-orphan removes the rows
+    if saved_character.inventory_items != '[]':
+        saved_character.inventory_items = '[]'
+    if saved_character.equipment != '{}':
+        saved_character.equipment = '{}'
+    return True
+
+# Character attributes copied one-to-one into saved_characters columns
+_STAT_FIELDS = ('level', 'xp', 'xp_to_level', 'hp', 'max_hp', 'mana', 'max_mana',
+                'base_attack', 'defense', 'luck', 'class_tier', 'class_title', 'started_at')
+
+def snapshot_character(character):
+    """
+    Capture everything a save writes as plain data
+    
+    The snapshot shares nothing with the live character, so it can be
+    written later or on another thread while the game keeps playing.
+    """
+    dirty = character.dirty_fields() if hasattr(character, 'dirty_fields') else None
+    snapshot = {
+        'name': character.name,
+        'character_class': character.__class__.__name__,
+        'save_id': getattr(character, 'save_id', None),
+        'journal_seq': getattr(character, 'journal_seq', 0),
+        'version': getattr(character, 'save_version', None),  # None: no conflict check
+        'dirty': sorted(dirty) if dirty is not None else None,  # None: write everything
+    }
+    for field in _STAT_FIELDS:
+        snapshot[field] = getattr(character, field)
+    snapshot['skills'] = list(getattr(character, 'skills', []))
+    snapshot['tier_times'] = list(getattr(character, 'tier_times', []))
+        
+    inventory = getattr(character, 'inventory', None)
+    snapshot['gold'] = inventory.gold if inventory else None
+    snapshot['bag'] = [_serialize_item(item) for item in inventory.items] if inventory else []
+    snapshot['equipment'] = {slot: _serialize_item(item)
+                             for slot, item in getattr(character, 'equipment', {}).items()}
+    return snapshot
+
+def _save_snapshot(session, snapshot, overwrite):
+    """Write a snapshot in an open session, returns the SavedCharacter or None"""
+    existing_character = None
+    if snapshot.get('save_id') is not None:
+        # Saved or loaded before, so the row is already known
+        existing_character = session.scalars(_SELECT_SAVE, {'character_id': snapshot['save_id']}).first()
+        
+    if existing_character is None:
+        # Check if character with same name exists
+        existing_character = session.scalars(_SELECT_SAVE_BY_NAME, {
+            'name': snapshot['name'],
+            'character_class': snapshot['character_class']
+        }).first()
+    
+    if existing_character and not overwrite:
+        return None  # Don't overwrite
+    
+    dirty = snapshot.get('dirty')
+    if existing_character:
+        saved_character = existing_character
+    else:
+        # Create new character record
+        saved_character = SavedCharacter(
+            name=snapshot['name'],
+            character_class=snapshot['character_class'],
+            inventory_items='[]',
+            equipment='{}'
+        )
+        session.add(saved_character)
+        dirty = None
+        
+    # The row this character was saved or loaded from, rather than a new one or another character's
+    same_save = saved_character.id is not None and saved_character.id == snapshot.get('save_id')
+    if existing_character and not same_save:
+        # Overwriting a different save: write everything and drop its journal,
+        # which describes the character being replaced
+        dirty = None
+        session.execute(_DELETE_CHARACTER_JOURNAL, {'character_id': saved_character.id})
+        saved_character.journal_seq = snapshot.get('journal_seq', 0)
+        
+    if same_save and (saved_character.journal_seq or 0) > snapshot.get('journal_seq', 0):
+        return saved_character  # A newer save already covers this snapshot
+        
+    # Someone else saved this character since the snapshot's copy was read
+    expected_version = snapshot.get('version')
+    if expected_version is not None and same_save and saved_character.version != expected_version:
+        raise SaveConflictError(saved_character.id, expected_version, saved_character.version)
+        
+    if dirty is not None and not dirty:
+        return saved_character  # Nothing changed since the last save
+        
+    # Any flush from here on sends the UPDATE, which only matches while
+    # the version is still the one read above
+    character_id = saved_character.id
+    try:
+        if not _update_snapshot(session, saved_character, snapshot, dirty):
+            _write_snapshot(session, saved_character, snapshot, dirty)
+            session.flush()
+    except StaleDataError as error:
+        raise SaveConflictError(character_id, expected_version) from error
+    return saved_character
+
+def _update_snapshot(session, saved_character, snapshot, dirty):
+    """
+    Write a save's changed fields with Core statements instead of the unit of work
+    
+    Only handles saves of an existing row with known dirty fields whose
+    items stay in the storage format they are in. First saves, full
+    rewrites and format changes return False, having written nothing, and
+    go through _write_snapshot.
+    
+    Raises:
+        SaveConflictError if the row's version moved on since it was read
+    """
+    if dirty is None or saved_character.id is None:
+        return False
+        
+    values = {}
+    item_changes = None
+    packing = False  # Moving rows-format items into the blob
+    if 'items' in dirty or 'equipment' in dirty:
+        if SAVE_CODEC == 'binary':
+            packing = saved_character.save_blob is None
+            try:
+                values['save_blob'] = encode_items(snapshot['bag'], snapshot['equipment'])
+            except CodecError:
+                return False
+        if saved_character.inventory_items != '[]' or saved_character.equipment != '{}':
+            return False  # Legacy JSON columns, let _write_snapshot move them over
+        if SAVE_CODEC != 'binary':
+            if saved_character.save_blob is not None:
+                return False
+            item_rows = session.execute(_SELECT_ITEMS, {'character_id': saved_character.id}).all()
+            item_changes = _item_changes(item_rows, snapshot)
             
-            # Save equipment if it exists
-            if hasattr(character, 'equipment') and character.equipment:
-                for slot, item in character.equipment.items():
-                    item_data = {
-                        'name': item.name,
-                        'description': item.description,
-                        'value': item.value,
-                    }
-                    
-                    # Add type-specific data
-                    if isinstance(item, Weapon):
-                        item_data['type'] = 'weapon'
-                        item_data['attack_boost'] = item.stat_boost.get('attack', 0)
-                    elif isinstance(item, Armor):
-                        item_data['type'] = 'armor'
-                        item_data['defense_boost'] = item.stat_boost.get('defense', 0)
-                    elif isinstance(item, Accessory):
-                        item_data['type'] = 'accessory'
-                        item_data['stat_boosts'] = item.stat_boost
-                    
-                    equipment_data[slot] = item_data
+    for field in _STAT_FIELDS:
+        if field in dirty:
+            values[field] = snapshot[field]
+    if 'skills' in dirty:
+        values['skills'] = json.dumps(snapshot['skills'])
+    if 'tier_times' in dirty:
+        values['tier_times'] = json.dumps(snapshot['tier_times'])
+    if snapshot['gold'] is not None:
+        if 'gold' in dirty:
+            values['gold'] = snapshot['gold']
+    elif saved_character.gold is None:
+        values['gold'] = 0
+    if snapshot.get('journal_seq'):
+        values['journal_seq'] = snapshot['journal_seq']
+    values['last_saved'] = datetime.utcnow()
+    values['version'] = (saved_character.version or 0) + 1
+    
+    # Same compare-and-set as the mapper's version check
+    result = session.execute(_UPDATE_SAVE, dict(values, character_id=saved_character.id,
+                                                expected_version=saved_character.version))
+    if result.rowcount != 1:
+        raise SaveConflictError(saved_character.id, snapshot.get('version'))
+    for key, value in values.items():
+        set_committed_value(saved_character, key, value)  # Loaded copy matches the row, nothing left to flush
+        
+    if snapshot.get('journal_seq'):
+        session.execute(_FOLD_JOURNAL, {'character_id': saved_character.id,
+                                        'through_seq': snapshot['journal_seq']})
+    if packing:
+        session.execute(_DELETE_CHARACTER_ITEMS, {'character_id': saved_character.id})
+        session.expire(saved_character, ['items'])
+    if item_changes and (item_changes[0] or item_changes[1]):
+        inserts, leftovers = item_changes
+        if leftovers:
+            session.execute(_DELETE_ITEMS, {'ids': [row.id for row in leftovers]})
+        if inserts:
+            session.execute(_INSERT_ITEMS, [dict(row_values, character_id=saved_character.id)
+                                            for row_values in inserts])
+        session.expire(saved_character, ['items'])
+        
+    record_scores(session, saved_character, dirty)
+    return True
+
+def _write_snapshot(session, saved_character, snapshot, dirty):
+    """Copy a snapshot's changed fields, items and scores onto its row"""
+    # Journal entries up to the snapshot are folded into it now
+    if snapshot.get('journal_seq'):
+        if saved_character.id is not None:
+            session.execute(_FOLD_JOURNAL, {'character_id': saved_character.id,
+                                            'through_seq': snapshot['journal_seq']})
+        saved_character.journal_seq = snapshot['journal_seq']
+        
+    # Only changed columns end up in the UPDATE
+    for field in _STAT_FIELDS:
+        if dirty is None or field in dirty:
+            setattr(saved_character, field, snapshot[field])
+    if dirty is None or 'skills' in dirty:
+        saved_character.skills = json.dumps(snapshot['skills'])
+    if dirty is None or 'tier_times' in dirty:
+        saved_character.tier_times = json.dumps(snapshot['tier_times'])
+    saved_character.last_saved = datetime.utcnow()
+    saved_character.version = (saved_character.version or 0) + 1
+    
+    # Save inventory gold
+    if snapshot['gold'] is not None:
+        if dirty is None or 'gold' in dirty:
+            saved_character.gold = snapshot['gold']
+    elif saved_character.gold is None:
+        saved_character.gold = 0
+        
+    # Save inventory and equipment as a blob or as saved_items rows
+    if dirty is None or 'items' in dirty or 'equipment' in dirty:
+        if SAVE_CODEC != 'binary' or not _store_blob(saved_character, snapshot):
+            _sync_items(saved_character, snapshot)
             
-            saved_character = SavedCharacter(
-                name=character.name,
-                character_class=character.__class__.__name__,
-                level=character.level,
-                xp=character.xp,
-                xp_to_level=character.xp_to_level,
-                hp=character.hp,
-                max_hp=character.max_hp,
-                mana=character.mana,
-                max_mana=character.max_mana,
-                base_attack=character.base_attack,
-                defense=character.defense,
-                gold=gold,
-                luck=character.luck if hasattr(character, 'luck') else 0,
-                inventory_items=json.dumps(inventory_items),
-                equipment=json.dumps(equipment_data)
-            )
-            session.add(saved_character)
+    record_scores(session, saved_character, dirty)
+
+def keep_mine(character, stored):
+    """on_conflict hook for save_character: overwrite the other save with this character"""
+    return character
+
+def save_character(character, overwrite=False, on_conflict=None, retries=3):
+    """
+    Save character data to database
+    
+    Args:
+        character: Character object to save
+        overwrite: Whether to overwrite existing character with same name
+        on_conflict: Function(character, stored) called when the save was written
+            elsewhere since character was saved or loaded. stored is a freshly
+            loaded copy of that save. Return the character to write over it,
+            usually character with whatever it takes from stored merged in,
+            or None to leave the stored save alone.
+        retries: Conflicts resolved through on_conflict before giving up
+    
+    Returns:
+        SavedCharacter object if successful, None otherwise
+    
+    Raises:
+        SaveConflictError if the save changed elsewhere and on_conflict is
+        not given or keeps losing the race
+    """
+    for attempt in range(retries + 1):
+        try:
+            return _write_character(character, overwrite)
+        except SaveConflictError as conflict:
+            if on_conflict is None or attempt == retries:
+                raise
+            stored = load_character(conflict.character_id)
+            if stored is None:
+                raise
+            character = _merge_for_retry(character, stored, on_conflict)
+            if character is None:
+                return None
+
+def _merge_for_retry(character, stored, on_conflict):
+    """Run on_conflict and set up its result to be saved over stored, None to give up"""
+    merged = on_conflict(character, stored)
+    if merged is None:
+        return None
         
-        session.commit()
+    # Try again against the version just read, writing every field
+    merged.save_id = stored.save_id
+    merged.save_version = stored.save_version
+    merged.journal_seq = max(merged.journal_seq, stored.journal_seq)
+    merged.mark_all_dirty()
+    return merged
+
+def _after_save(character, snapshot, saved_character):
+    """Point a character at the save its snapshot was just written to"""
+    if saved_character:
+        _load_cache.invalidate(saved_character.id)
+    if saved_character and hasattr(character, 'mark_clean'):
+        character.save_id = saved_character.id
+        character.save_version = saved_character.version
+        character.save_conflict = None
+        character.journal_base = snapshot
+        character.mark_clean()
+
+def _write_character(character, overwrite):
+    """One attempt at save_character, raising SaveConflictError on a conflict"""
+    try:
+        snapshot = snapshot_character(character)
+        with session_scope() as session:
+            saved_character = _save_snapshot(session, snapshot, overwrite)
+        _after_save(character, snapshot, saved_character)
         return saved_character
     
+    except SaveConflictError:
+        raise
     except SQLAlchemyError as e:
-        session.rollback()
-        print(f"Database error: {e}")
+        say(f"Database error: {e}")
         return None
     except Exception as e:
-        session.rollback()
-        print(f"Error saving character: {e}")
+        say(f"Error saving character: {e}")
         return None
 
+def save_snapshots(entries):
+    """
+    Save several character snapshots in one transaction
+    
+    A snapshot whose save changed elsewhere is skipped without affecting
+    the rest of the batch.
+    
+    Args:
+        entries: List of (snapshot, overwrite) pairs from snapshot_character
+    
+    Returns:
+        List with a SavedCharacter, None or SaveConflictError per entry, in order
+    
+    Raises:
+        SQLAlchemyError if the transaction fails, so callers can retry
+        SaveConflictError if another writer won a race mid-batch; nothing
+        in the batch is written and saving the entries one at a time
+        will show which one conflicted
+    """
+    results = []
+    with session_scope() as session:
+        for snapshot, overwrite in entries:
+            try:
+                results.append(_save_snapshot(session, snapshot, overwrite))
+            except SaveConflictError as conflict:
+                if conflict.actual_version is None:
+                    raise  # The failed UPDATE leaves the transaction unusable
+                results.append(conflict)  # Caught before anything was written
+    for saved_character in results:
+        if saved_character and not isinstance(saved_character, SaveConflictError):
+            _load_cache.invalidate(saved_character.id)
+    return results
+
+_CHARACTER_CLASSES = {cls.__name__: cls for cls in (Barbarian, Archer, Mage)}
+
+def _read_save(session, saved_character):
+    """Everything load_character needs from a saved_characters row, as plain data that can be cached"""
+    record = {
+        'id': saved_character.id,
+        'name': saved_character.name,
+        'character_class': saved_character.character_class,
+        'gold': saved_character.gold,
+        'skills': json.loads(saved_character.skills or '[]'),
+        'tier_times': json.loads(saved_character.tier_times or '[]'),
+        'journal_seq': saved_character.journal_seq or 0,
+        'version': saved_character.version,
+    }
+    for field in _STAT_FIELDS:
+        record[field] = getattr(saved_character, field)
+    item_rows = None if saved_character.save_blob else session.execute(
+        _SELECT_ITEMS, {'character_id': saved_character.id}).all()
+    record['bag'], record['equipment'] = _stored_items(saved_character, item_rows)
+    
+    # Whatever was journaled since the row was written
+    entries = session.execute(_SELECT_JOURNAL, {'character_id': saved_character.id,
+                                                'after_seq': record['journal_seq']}).all()
+    record['journal'] = [(seq, event_type, json.loads(payload or '{}')) for seq, event_type, payload in entries]
+    return record
+
+def _build_character(record):
+    """Create a live character from a _read_save record, leaving the record untouched"""
+    character = _CHARACTER_CLASSES[record['character_class']](record['name'])
+    
+    # Load basic stats and class evolution
+    for field in _STAT_FIELDS:
+        setattr(character, field, record[field])
+    character.class_tier = character.class_tier or 0
+    character.class_title = character.class_title or ''
+    character.skills = list(record['skills'])
+    character.tier_times = list(record.get('tier_times', []))
+    
+    # Load gold
+    character.inventory.gold = record['gold']
+    
+    # Clear default inventory items
+    character.inventory.items = []
+    
+    # Load inventory and equipment
+    for item_data in record['bag']:
+        item = _deserialize_item(item_data)
+        if item:
+            character.inventory.add_item(item)
+            
+    for slot, item_data in record['equipment'].items():
+        item = _deserialize_item(item_data)
+        if item:
+            # Skip the normal equip method to avoid duplicate stat boosts
+            character.equipment[slot] = item
+            
+    # Replay the journal on top of the row
+    character.journal_seq = record['journal_seq']
+    for seq, event_type, payload in record['journal']:
+        _apply_journal_event(character, event_type, payload)
+        character.journal_seq = seq
+        
+    # Later saves only write what changes from here
+    character.save_id = record['id']
+    character.save_version = record['version']
+    character.journal_base = snapshot_character(character)
+    if record['journal']:
+        character.mark_all_dirty()  # The row itself is still behind the journal
+    else:
+        character.mark_clean()
+    return character
+
+# Decoded saves kept in memory, LOAD_CACHE_SIZE=0 turns the cache off
+_load_cache = LoadCache(int(os.environ.get('LOAD_CACHE_SIZE', 128)))
+
+def cache_stats():
+    """
+    Counters for the load_character cache
+    
+    Returns:
+        Dict with hits, misses, hit_rate, evictions, invalidations, size and capacity
+    """
+    return _load_cache.stats()
+
+def clear_load_cache():
+    """Empty the load_character cache and reset its counters"""
+    _load_cache.clear()
+
 def load_character(character_id):
     """
     Load character data from database
     
+    Repeated loads of an unchanged save are served from memory after a
+    single version check.
+    
     Args:
         character_id: ID of character to load
     
@@ -210,119 +747,296 @@ def load_character(character_id):
         Character object if successful, None otherwise
     """
     try:
-        saved_character = session.query(SavedCharacter).filter_by(
-            id=character_id,
-            is_active=True
-        ).first()
-        
-        if not saved_character:
-            return None
+        with session_scope() as session:
+            record = _load_record(session, character_id)
+        return _build_character(record) if record else None
+    
+    except SQLAlchemyError as e:
+        say(f"Database error: {e}")
+        return None
+    except Exception as e:
+        say(f"Error loading character: {e}")
+        return None
+
+def _load_record(session, character_id):
+    """A save's _read_save record, from the load cache when the save is unchanged"""
+    # The row's version and newest journal entry change with every write
+    token = session.execute(_SELECT_LOAD_TOKEN, {'character_id': character_id}).first()
+    
+    if token is None:
+        _load_cache.invalidate(character_id)
+        return None
+    token = tuple(token)
+    
+    record = _load_cache.get(character_id, token)
+    if record is None:
+        saved_character = session.execute(_SELECT_ROW, {'character_id': character_id}).first()
         
-        # Create appropriate character class
-        if saved_character.character_class == "Barbarian":
-            character = Barbarian(saved_character.name)
-        elif saved_character.character_class == "Archer":
-            character = Archer(saved_character.name)
-        elif saved_character.character_class == "Mage":
-            character = Mage(saved_character.name)
-        else:
+        if not saved_character or saved_character.character_class not in _CHARACTER_CLASSES:
             return None
+        record = _read_save(session, saved_character)
+        _load_cache.put(character_id, token, record)
+    return record
+
+# Journal entries allowed to pile up before the game folds them into a full save
+JOURNAL_COMPACT_EVERY = int(os.environ.get('JOURNAL_COMPACT_EVERY', 50))
+
+def _item_key(item_data):
+    """Comparable form of a serialized item"""
+    return json.dumps(item_data, sort_keys=True)
+
+def _journal_events(base, snapshot):
+    """List the (event_type, payload) pairs that turn snapshot base into snapshot"""
+    events = []
+    dirty = snapshot.get('dirty')
+    
+    if snapshot['gold'] is not None and snapshot['gold'] != base['gold']:
+        events.append(('gold', {'delta': snapshot['gold'] - (base['gold'] or 0)}))
+    if snapshot['xp'] != base['xp']:
+        events.append(('xp', {'delta': snapshot['xp'] - base['xp']}))
         
-        # Load basic stats
-        character.level = saved_character.level
-        character.xp = saved_character.xp
-        character.xp_to_level = saved_character.xp_to_level
-        character.hp = saved_character.hp
-        character.max_hp = saved_character.max_hp
-        character.mana = saved_character.mana
-        character.max_mana = saved_character.max_mana
-        character.base_attack = saved_character.base_attack
-        character.defense = saved_character.defense
-        character.luck = saved_character.luck
+    stats = {field: snapshot[field] for field in _STAT_FIELDS
+             if field != 'xp' and snapshot[field] != base[field]}
+    if stats:
+        events.append(('stats', stats))
+    if snapshot['skills'] != base['skills']:
+        events.append(('skills', {'skills': snapshot['skills']}))
+    if snapshot['tier_times'] != base.get('tier_times', []):
+        events.append(('tier_times', {'tier_times': snapshot['tier_times']}))
         
-        # Load gold
-        character.inventory.gold = saved_character.gold
+    if dirty is None or 'items' in dirty:
+        # Compare bags as multisets, an item moving in the bag is no change
+        counts = {}
+        for item_data in base['bag']:
+            key = _item_key(item_data)
+            counts[key] = counts.get(key, 0) + 1
+        added = []
+        for item_data in snapshot['bag']:
+            key = _item_key(item_data)
+            if counts.get(key):
+                counts[key] -= 1
+            else:
+                added.append(item_data)
+        for key, count in counts.items():
+            events.extend([('item_removed', {'item': json.loads(key)})] * count)
+        events.extend(('item_added', {'item': item_data}) for item_data in added)
         
-        # Clear default inventory items
-        character.inventory.items = []
+    if dirty is None or 'equipment' in dirty:
+        for slot in sorted(set(base['equipment']) | set(snapshot['equipment'])):
+            item_data = snapshot['equipment'].get(slot)
+            if item_data != base['equipment'].get(slot):
+                events.append(('equip', {'slot': slot, 'item': item_data}))
+                
+    return events
+
+def _apply_journal_event(character, event_type, payload):
+    """Replay one journal event onto a loaded character"""
+    if event_type == 'gold':
+        character.inventory.gold += payload['delta']
+    elif event_type == 'xp':
+        character.xp += payload['delta']
+    elif event_type == 'stats':
+        for field, value in payload.items():
+            if field in _STAT_FIELDS:
+                setattr(character, field, value)
+    elif event_type == 'skills':
+        character.skills = list(payload['skills'])
+    elif event_type == 'tier_times':
+        character.tier_times = list(payload['tier_times'])
+    elif event_type == 'item_added':
+        item = _deserialize_item(payload['item'])
+        if item:
+            character.inventory.add_item(item)
+    elif event_type == 'item_removed':
+        key = _item_key(payload['item'])
+        for item in character.inventory.items:
+            if _item_key(_serialize_item(item)) == key:
+                character.inventory.remove_item(item)
+                break
+    elif event_type == 'equip':
+        item = _deserialize_item(payload['item']) if payload['item'] else None
+        if item:
+            # Skip the normal equip method to avoid duplicate stat boosts
+            character.equipment[payload['slot']] = item
+        else:
+            character.equipment.pop(payload['slot'], None)
+
+def append_journal(character):
+    """
+    Journal what changed since the character was last saved, loaded or journaled
+    
+    Much cheaper than a full save: only a few small rows are inserted and
+    the saved_characters row is left alone until the journal is compacted.
+    
+    Args:
+        character: Character object that has been saved or loaded before
+    
+    Returns:
+        Number of journal entries not yet folded into a full save,
+        or None if the character has no save to journal against
+    
+    Raises:
+        SaveConflictError if the save was written elsewhere since the
+        character was saved or loaded
+    """
+    save_id = getattr(character, 'save_id', None)
+    base = getattr(character, 'journal_base', None)
+    if save_id is None or base is None:
+        return None
         
-        # Load inventory items
-        inventory_items = json.loads(saved_character.inventory_items)
-        for item_data in inventory_items:
-            item = None
-            
-            if item_data.get('type') == 'weapon':
-                item = Weapon(
-                    item_data['name'],
-                    item_data['description'],
-                    item_data['value'],
-                    item_data.get('attack_boost', 0)
-                )
-            elif item_data.get('type') == 'armor':
-                item = Armor(
-                    item_data['name'],
-                    item_data['description'],
-                    item_data['value'],
-                    item_data.get('defense_boost', 0)
-                )
-            elif item_data.get('type') == 'accessory':
-                item = Accessory(
-                    item_data['name'],
-                    item_data['description'],
-                    item_data['value'],
-                    item_data.get('stat_boosts', {})
-                )
-            elif item_data.get('type') == 'health_potion':
-                item = HealthPotion(item_data.get('size', 'small'))
-            elif item_data.get('type') == 'mana_potion':
-                item = ManaPotion(item_data.get('size', 'small'))
-            elif item_data.get('type') == 'strength_elixir':
-                item = StrengthElixir()
-            
-            if item:
-                character.inventory.add_item(item)
+    try:
+        snapshot = snapshot_character(character)
+        events = _journal_events(base, snapshot)
+        seq = character.journal_seq
         
-        # Load equipment
-        equipment_data = json.loads(saved_character.equipment)
-        for slot, item_data in equipment_data.items():
-            item = None
+        with session_scope() as session:
+            saved = session.execute(_SELECT_JOURNAL_STATE, {'character_id': save_id}).first()
+            if saved is None:
+                return None  # The save was deleted
+            saved_seq = saved.journal_seq or 0
             
-            if item_data.get('type') == 'weapon':
-                item = Weapon(
-                    item_data['name'],
-                    item_data['description'],
-                    item_data['value'],
-                    item_data.get('attack_boost', 0)
-                )
-            elif item_data.get('type') == 'armor':
-                item = Armor(
-                    item_data['name'],
-                    item_data['description'],
-                    item_data['value'],
-                    item_data.get('defense_boost', 0)
-                )
-            elif item_data.get('type') == 'accessory':
-                item = Accessory(
-                    item_data['name'],
-                    item_data['description'],
-                    item_data['value'],
-                    item_data.get('stat_boosts', {})
-                )
+            # Our own queued saves move the version on, so only check once they are written
+            expected_version = getattr(character, 'save_version', None)
+            if (expected_version is not None and not getattr(character, 'saves_in_flight', 0)
+                    and saved.version != expected_version):
+                raise SaveConflictError(save_id, expected_version, saved.version)
             
-            if item:
-                # Skip the normal equip method to avoid duplicate stat boosts
-                # Just put the item in the equipment dict
-                character.equipment[slot] = item
+            entries = []
+            for event_type, payload in events:
+                seq += 1
+                entries.append({
+                    'character_id': save_id,
+                    'seq': seq,
+                    'event_type': event_type,
+                    'payload': json.dumps(payload),
+                })
+            if entries:
+                session.execute(_INSERT_JOURNAL, entries)
                 
-        return character
+        # Dirty fields stay set, the next full save still has to write them
+        _load_cache.invalidate(save_id)
+        character.journal_seq = seq
+        character.journal_base = snapshot
+        return seq - saved_seq
     
+    except SaveConflictError:
+        raise
     except SQLAlchemyError as e:
-        print(f"Database error: {e}")
+        say(f"Database error: {e}")
         return None
     except Exception as e:
-        print(f"Error loading character: {e}")
+        say(f"Error journaling character: {e}")
         return None
 
+def compact_journal(character_id):
+    """
+    Fold a saved character's journal into its saved_characters row
+    
+    Args:
+        character_id: ID of character to compact
+    
+    Returns:
+        True if journal entries were folded in, False otherwise
+    """
+    try:
+        with session_scope() as session:
+            saved_seq = session.query(SavedCharacter.journal_seq).filter_by(
+                id=character_id,
+                is_active=True
+            ).scalar() or 0
+            pending = session.query(SaveJournalEntry.id).filter(
+                SaveJournalEntry.character_id == character_id,
+                SaveJournalEntry.seq > saved_seq
+            ).first()
+        if not pending:
+            return False
+    except SQLAlchemyError as e:
+        say(f"Database error: {e}")
+        return False
+        
+    character = load_character(character_id)
+    try:
+        return bool(character and save_character(character, overwrite=True))
+    except SaveConflictError:
+        return False  # Written elsewhere meanwhile, leave it to that writer
+
+def convert_saves(codec, batch_size=500):
+    """
+    Rewrite the items of every active save in another storage format
+    
+    Args:
+        codec: 'binary' to pack items into save_blob, 'rows' for saved_items rows
+        batch_size: Saves converted per transaction
+    
+    Returns:
+        Number of saves rewritten
+    """
+    if codec not in ('binary', 'rows'):
+        raise ValueError(f"Unknown codec: {codec}")
+        
+    converted = 0
+    last_id = 0
+    while True:
+        with session_scope() as session:
+            batch = session.query(SavedCharacter).filter(
+                SavedCharacter.is_active == True,
+                SavedCharacter.id > last_id
+            ).order_by(SavedCharacter.id).limit(batch_size).all()
+            if not batch:
+                return converted
+                
+            for saved_character in batch:
+                last_id = saved_character.id
+                if (codec == 'binary') == bool(saved_character.save_blob):
+                    continue  # Already stored that way
+                    
+                # Round trip through the item classes so every format sees full item dicts
+                bag, equipment = _stored_items(saved_character)
+                snapshot = {'bag': [], 'equipment': {}}
+                for item_data in bag:
+                    item = _deserialize_item(item_data)
+                    if item:
+                        snapshot['bag'].append(_serialize_item(item))
+                for slot, item_data in equipment.items():
+                    item = _deserialize_item(item_data)
+                    if item:
+                        snapshot['equipment'][slot] = _serialize_item(item)
+                if codec == 'binary':
+                    if not _store_blob(saved_character, snapshot):
+                        continue
+                else:
+                    _sync_items(saved_character, snapshot)
+                converted += 1
+
+def find_item_owners(item_type=None, quality=None, location=None):
+    """
+    Find saved characters that own matching items
+    
+    Only saves whose items are kept as saved_items rows are searched,
+    not those packed into save_blob by the binary codec.
+    
+    Args:
+        item_type: Item type to match, e.g. 'weapon'
+        quality: Item quality to match, e.g. 'rare'
+        location: 'bag' or 'slot' to only match carried or equipped items
+    
+    Returns:
+        List of SavedCharacter objects
+    """
+    try:
+        with session_scope() as session:
+            query = session.query(SavedCharacter).join(SavedItem).filter(SavedCharacter.is_active == True)
+            if item_type is not None:
+                query = query.filter(SavedItem.item_type == item_type)
+            if quality is not None:
+                query = query.filter(SavedItem.quality == quality)
+            if location is not None:
+                query = query.filter(SavedItem.location == location)
+            return query.distinct().all()
+    except SQLAlchemyError as e:
+        say(f"Database error: {e}")
+        return []
+
 def get_all_characters():
     """
     Get all saved characters
@@ -331,11 +1045,98 @@ def get_all_characters():
         List of SavedCharacter objects
     """
     try:
-        return session.query(SavedCharacter).filter_by(is_active=True).all()
+        with session_scope() as session:
+            return _active_characters(session)
+    except SQLAlchemyError as e:
+        say(f"Database error: {e}")
+        return []
+
+def _active_characters(session):
+    """Every active SavedCharacter"""
+    return session.query(SavedCharacter).filter_by(is_active=True).all()
+
+# Orderings accepted by list_characters
+_LIST_ORDERINGS = {
+    'last_saved': (SavedCharacter.last_saved.desc(), SavedCharacter.id.desc()),
+    'name': (SavedCharacter.name, SavedCharacter.id),
+    'level': (SavedCharacter.level.desc(), SavedCharacter.id),
+    'id': (SavedCharacter.id,),
+}
+
+# Listing statements per ordering, with and without a page size
+_LIST_ALL = {
+    order_by: select(
+        SavedCharacter.id,
+        SavedCharacter.name,
+        SavedCharacter.character_class,
+        SavedCharacter.level,
+        SavedCharacter.last_saved
+    ).where(SavedCharacter.is_active == True).order_by(*columns).offset(bindparam('offset'))
+    for order_by, columns in _LIST_ORDERINGS.items()
+}
+_LIST_PAGE = {order_by: statement.limit(bindparam('limit')) for order_by, statement in _LIST_ALL.items()}
+
+def list_characters(limit=None, offset=0, order_by='last_saved'):
+    """
+    List saved characters without loading their items or JSON columns
+    
+    Args:
+        limit: Maximum number of characters to return, None for all
+        offset: Number of characters to skip, for paging
+        order_by: 'last_saved' (newest first), 'name', 'level' (highest first) or 'id'
+    
+    Returns:
+        List of rows with id, name, character_class, level and last_saved
+    """
+    if order_by not in _LIST_ORDERINGS:
+        raise ValueError(f"Unknown ordering: {order_by}")
+        
+    try:
+        with session_scope() as session:
+            statements = _LIST_ALL if limit is None else _LIST_PAGE
+            return session.execute(statements[order_by], {'limit': limit, 'offset': offset or 0}).all()
     except SQLAlchemyError as e:
-        print(f"Database error: {e}")
+        say(f"Database error: {e}")
         return []
 
+def count_characters():
+    """
+    Count active saved characters
+    
+    Returns:
+        Number of active saves
+    """
+    try:
+        with session_scope() as session:
+            return session.query(func.count(SavedCharacter.id)).filter(
+                SavedCharacter.is_active == True
+            ).scalar()
+    except SQLAlchemyError as e:
+        say(f"Database error: {e}")
+        return 0
+
+def character_exists(name, character_class):
+    """
+    Check for an active save with this name and class
+    
+    Args:
+        name: Character name
+        character_class: Class name, e.g. 'Mage'
+    
+    Returns:
+        True if such a save exists, False otherwise
+    """
+    try:
+        with session_scope() as session:
+            return session.query(SavedCharacter.id).filter_by(
+                name=name,
+                character_class=character_class,
+                is_active=True
+            ).first() is not None
+    except SQLAlchemyError as e:
+        say(f"Database error: {e}")
+        return False
+
 def delete_character(character_id):
     """
     Delete character by ID (soft delete)
@@ -347,23 +1148,28 @@ def delete_character(character_id):
         True if successful, False otherwise
     """
     try:
-        saved_character = session.query(SavedCharacter).filter_by(
-            id=character_id
-        ).first()
-        
-        if not saved_character:
-            return False
-        
-        # Soft delete
-        saved_character.is_active = False
-        session.commit()
-        return True
+        with session_scope() as session:
+            deleted = _delete_character(session, character_id)
+        _load_cache.invalidate(character_id)
+        return deleted
     
     except SQLAlchemyError as e:
-        session.rollback()
-        print(f"Database error: {e}")
+        say(f"Database error: {e}")
         return False
     except Exception as e:
-        session.rollback()
-        print(f"Error deleting character: {e}")
-        return False
\ No newline at end of file
+        say(f"Error deleting character: {e}")
+        return False
+
+def _delete_character(session, character_id):
+    """Soft delete a save in an open session, False if there is no such save"""
+    saved_character = session.query(SavedCharacter).filter_by(
+        id=character_id
+    ).first()
+    
+    if not saved_character:
+        return False
+    
+    # Soft delete
+    saved_character.is_active = False
+    forget_character(session, character_id)
+    return True
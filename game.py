@@ -1,7 +1,7 @@
 import random
 import time
 from characters import Barbarian, Archer, Mage, DarkKnight, DarkArcher, DarkMage
-from combat import Combat
+from combat import Combat, play_blocking
 
 class Game:
     """Main game class that manages the RPG game flow"""
@@ -93,7 +93,7 @@ class Game:
         
         combat_ended = False
         while not combat_ended:
-            combat_ended = combat.execute_turn()
+            combat_ended = play_blocking(combat.execute_turn())
             
         return self.player.is_alive()
         
@@ -0,0 +1,297 @@
+"""
+Spread game sessions over several game_server.py worker processes
+
+One game_server.py runs one game step at a time, so it tops out at one
+core. game_cluster.py listens where game_server.py would, starts
+--workers game_server.py processes on local ports and hands every
+connection to one of them:
+
+- Each connection gets a session id and is routed to the live worker
+  that wins a rendezvous hash of that id, where it stays until it ends
+- A worker that exits is restarted. Its sessions move to the surviving
+  workers and carry on from the character's last save or autosave
+  instead of being disconnected. Only new sessions go to the restarted
+  worker, nobody else is moved
+
+Clients speak the same line and json protocols as game_server.py.
+
+    python game_cluster.py --port 4000 --workers 4
+"""
+import os
+import sys
+import json
+import signal
+import asyncio
+import hashlib
+import argparse
+import itertools
+from game_server import IDLE_SECONDS, MAX_LINE, BACKLOG
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "game_server.py")
+RESTART_DELAY = 1.0  # Seconds before restarting a worker that exited
+ROUTE_TIMEOUT = 15.0  # Seconds a session waits for a worker to take it before giving up
+FRAME_LIMIT = 2 ** 20  # Longest reply line read from a worker
+
+def _score(session_id, index):
+    """Rendezvous hash weight of a worker for a session, the same in every process"""
+    return hashlib.blake2b(f"{session_id}/{index}".encode(), digest_size=8).digest()
+
+
+class Worker:
+    """One game_server.py process and the local port it serves on"""
+    
+    def __init__(self, index, port, idle_seconds):
+        self.index = index
+        self.port = port
+        self.idle_seconds = idle_seconds
+        self.process = None
+        self.live = False  # Accepting connections
+        self.restarts = 0
+        self.sessions = 0  # Open sessions routed here
+    
+    async def start(self):
+        """Start the process, returns True once it accepts connections"""
+        # Commands are wrapped in json before they reach the worker, so allow for escaping
+        env = dict(os.environ, SERVER_MAX_LINE=str(MAX_LINE * 6 + 64))
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", SERVER_SCRIPT, "--host", "127.0.0.1", "--port", str(self.port),
+            "--protocol", "json", "--dispatched", "--idle-seconds", str(self.idle_seconds), env=env)
+        while self.process.returncode is None:
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", self.port)
+            except OSError:
+                await asyncio.sleep(0.05)
+                continue
+            writer.close()  # A connection without a header is dropped by the worker
+            self.live = True
+            return True
+        return False
+
+
+class GameCluster:
+    """Accepts players and relays each one's traffic to the worker that owns their session"""
+    
+    def __init__(self, workers, worker_port, idle_seconds=IDLE_SECONDS, protocol='line'):
+        self.workers = [Worker(index, worker_port + index, idle_seconds) for index in range(workers)]
+        self.protocol = protocol
+        self.moved = 0  # Sessions resumed on another worker after theirs exited
+        self._ids = itertools.count(1)
+        self._handlers = set()
+        self._server = None
+        self._supervisors = []
+        self._stopping = False
+        self._stopped = None  # Event set once stop() has finished
+    
+    def route(self, session_id, avoid=()):
+        """
+        The live worker owning a session, or None when no worker is up
+        
+        Args:
+            session_id: The session being placed
+            avoid: Workers that just failed this session, used only if nothing else is live
+        """
+        live = [worker for worker in self.workers if worker.live]
+        candidates = [worker for worker in live if worker not in avoid] or live
+        return max(candidates, key=lambda worker: _score(session_id, worker.index), default=None)
+    
+    async def supervise(self, worker):
+        """Keep a worker running, restarting it whenever it exits"""
+        while not self._stopping:
+            if await worker.start():
+                if self._stopping:
+                    worker.process.terminate()  # Started while stop() was already running
+                print(f"Worker {worker.index} serving on port {worker.port}")
+                await worker.process.wait()
+            worker.live = False
+            if self._stopping:
+                break
+            worker.restarts += 1
+            print(f"Worker {worker.index} exited with code {worker.process.returncode}, restarting")
+            await asyncio.sleep(RESTART_DELAY)
+    
+    async def _connect(self, session_id, avoid):
+        """Open a connection to the session's worker, waiting for one to come up if none is live"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ROUTE_TIMEOUT
+        while not self._stopping and loop.time() < deadline:
+            worker = self.route(session_id, avoid)
+            if worker is not None:
+                try:
+                    reader, writer = await asyncio.open_connection("127.0.0.1", worker.port, limit=FRAME_LIMIT)
+                    return worker, reader, writer
+                except OSError:
+                    avoid.add(worker)
+            await asyncio.sleep(0.1)
+        return None, None, None
+    
+    async def handle_tcp(self, reader, writer):
+        """asyncio.start_server callback, one per player connection"""
+        json_mode = self.protocol == 'json'
+        session_id = next(self._ids)
+        character_id = None  # Last save id the worker reported, used to resume elsewhere
+        notice = None  # Text to put in front of the next reply
+        avoid = set()
+        client_line = None
+        self._handlers.add(asyncio.current_task())
+        
+        async def send(events, prompt):
+            if json_mode:
+                writer.write((json.dumps({'session': session_id, 'events': events, 'prompt': prompt}) + "\n").encode())
+            else:
+                writer.write(("".join(event['text'] for event in events) + (prompt or "")).encode())
+            await writer.drain()
+        
+        try:
+            while True:
+                worker, worker_reader, worker_writer = await self._connect(session_id, avoid)
+                if worker is None:
+                    await send([{'type': 'output', 'text': "\nNo game server is available, please try again later.\n"}], None)
+                    return
+                worker.sessions += 1
+                try:
+                    worker_line = asyncio.ensure_future(worker_reader.readline())
+                    worker_writer.write((json.dumps({'session': session_id, 'character': character_id}) + "\n").encode())
+                    while True:
+                        if client_line is None:
+                            client_line = asyncio.ensure_future(reader.readline())
+                        done, _ = await asyncio.wait({client_line, worker_line}, return_when=asyncio.FIRST_COMPLETED)
+                        
+                        if worker_line in done:
+                            try:
+                                line = worker_line.result()
+                            except (ConnectionError, ValueError):
+                                line = b""
+                            if not line:
+                                break  # Worker went away
+                            frame = json.loads(line)
+                            if frame.get('character') is not None:
+                                character_id = frame['character']
+                            events = frame['events']
+                            if notice:
+                                events.insert(0, {'type': 'output', 'text': notice})
+                                notice = None
+                            await send(events, frame['prompt'])
+                            if frame['prompt'] is None:
+                                return  # Game over, evicted or the worker is shutting down
+                            worker_line = asyncio.ensure_future(worker_reader.readline())
+                        
+                        if client_line in done:
+                            try:
+                                line = client_line.result()
+                            except ValueError:
+                                line = b""  # Longer than MAX_LINE
+                            client_line = None
+                            if not line:
+                                return  # Disconnected, the worker saves the character once it sees EOF
+                            text = line.decode(errors='replace').rstrip("\r\n")
+                            if not json_mode:
+                                text = json.dumps({'command': text}, ensure_ascii=False)
+                            worker_writer.write((text + "\n").encode())
+                            try:
+                                await worker_writer.drain()
+                            except ConnectionError:
+                                pass  # Noticed when the worker's reply never comes
+                finally:
+                    worker.sessions -= 1
+                    worker_line.cancel()
+                    worker_writer.close()
+                
+                if self._stopping:
+                    return
+                if client_line is not None and client_line.done():
+                    # An answer to the lost worker's prompt, the new worker asks again
+                    if not client_line.cancelled():
+                        client_line.exception()  # Retrieved so asyncio doesn't log it
+                    client_line = None
+                avoid = {worker}
+                self.moved += 1
+                notice = ("\n🔁 Your game server restarted. Carrying on from your last save.\n" if character_id is not None
+                          else "\n🔁 Your game server restarted before your character was saved. Starting over.\n")
+        except ConnectionError:
+            pass
+        finally:
+            if client_line is not None:
+                client_line.cancel()
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+    
+    def stats(self):
+        """Open sessions and restarts, per worker"""
+        return {
+            'sessions': sum(worker.sessions for worker in self.workers),
+            'moved': self.moved,
+            'workers': [{'port': worker.port, 'live': worker.live, 'sessions': worker.sessions,
+                         'restarts': worker.restarts} for worker in self.workers],
+        }
+    
+    async def report(self, every):
+        """Print stats() every so many seconds"""
+        while not self._stopping:
+            await asyncio.sleep(every)
+            stats = self.stats()
+            per_worker = ", ".join(f"{worker['sessions']}" + ("" if worker['live'] else " (down)")
+                                   for worker in stats['workers'])
+            print(f"{stats['sessions']} sessions ({per_worker}), {stats['moved']} moved")
+    
+    async def serve(self, host, port, stats_every=None):
+        """Start the workers and accept players until stop() is called"""
+        self._stopped = asyncio.Event()
+        self._supervisors = [asyncio.create_task(self.supervise(worker)) for worker in self.workers]
+        self._server = await asyncio.start_server(self.handle_tcp, host, port, limit=MAX_LINE, backlog=BACKLOG)
+        print(f"Dispatching {self.protocol} protocol on {host}:{port} to {len(self.workers)} workers")
+        reporter = asyncio.create_task(self.report(stats_every)) if stats_every else None
+        await self._stopped.wait()
+        if reporter:
+            reporter.cancel()
+    
+    async def stop(self):
+        """Stop accepting, let every worker save its sessions and exit, then wait for the players to be told"""
+        if self._stopping:
+            return
+        self._stopping = True
+        if self._server:
+            self._server.close()
+        running = [worker.process for worker in self.workers
+                   if worker.process is not None and worker.process.returncode is None]
+        for process in running:
+            try:
+                process.terminate()  # game_server.py saves every session on SIGTERM
+            except ProcessLookupError:
+                pass
+        await asyncio.gather(*(process.wait() for process in running))
+        await asyncio.gather(*self._supervisors, *self._handlers, return_exceptions=True)
+        self._stopped.set()
+
+async def _main(args):
+    """Serve until a signal asks to stop"""
+    cluster = GameCluster(args.workers, args.worker_port or args.port + 1, args.idle_seconds, args.protocol)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, lambda: asyncio.ensure_future(cluster.stop()))
+        except (NotImplementedError, AttributeError):
+            pass  # Windows, Ctrl+C raises KeyboardInterrupt instead
+    await cluster.serve(args.host, args.port, args.stats_every)
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Host games of the RPG on several worker processes")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=4000, help="TCP port (default 4000)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="game_server.py processes to start (default one per core)")
+    parser.add_argument('--worker-port', type=int,
+                        help="First local port for the workers, which use consecutive ports (default --port + 1)")
+    parser.add_argument('--protocol', choices=['line', 'json'], default='line', help="TCP protocol (default line)")
+    parser.add_argument('--idle-seconds', type=float, default=IDLE_SECONDS,
+                        help=f"Save and disconnect players idle this long (default {IDLE_SECONDS:g})")
+    parser.add_argument('--stats-every', type=float, help="Print sessions per worker every so many seconds")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
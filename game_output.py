@@ -0,0 +1,26 @@
+"""
+Where game text goes
+
+Game modules write with say() instead of print(). Outside capture() it
+is print() to the terminal. Inside, which is how Game.step collects a
+step's text, it goes to the capture's buffer, for the current thread
+only: output from other threads never ends up in a player's reply, and
+sys.stdout is left alone.
+"""
+import contextvars
+from contextlib import contextmanager
+
+_sink = contextvars.ContextVar('game_output', default=None)
+
+def say(*values, sep=' ', end='\n', flush=False):
+    """print() for game text, written to the innermost capture() if there is one"""
+    print(*values, sep=sep, end=end, file=_sink.get(), flush=flush)
+
+@contextmanager
+def capture(buffer):
+    """Send this thread's say() output to buffer until the block ends"""
+    token = _sink.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _sink.reset(token)
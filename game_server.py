@@ -0,0 +1,364 @@
+"""
+Host many games in one process over TCP (and optionally WebSocket)
+
+Every connection gets its own new_game.Game, advanced one input at a time
+through Game.step, so an idle player costs a few kilobytes rather than a
+process or a thread. Clients speak one of two protocols:
+
+line  Send one line per answer; the server sends back the game's text
+      followed by the next prompt, like playing in a terminal
+json  Send {"command": "..."} lines; every answer comes back as one
+      {"session": id, "events": [...], "prompt": "..."} line, and prompt
+      is null once the game is over
+
+WebSocket clients always use json messages. Players who disconnect or sit
+idle longer than SERVER_IDLE_SECONDS have their session closed, and a
+character they have saved before is saved again with their progress.
+Characters never saved stay unsaved, and a game the player quit is left
+as they chose to leave it. SIGINT/SIGTERM stop the server gracefully: it
+stops accepting, saves sessions the same way and waits for the save queue.
+
+    python game_server.py --port 4000
+    python game_server.py --port 4000 --protocol json --websocket-port 4001
+"""
+import os
+import sys
+import json
+import time
+import types
+import signal
+import asyncio
+import argparse
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from new_game import Game
+
+IDLE_SECONDS = float(os.environ.get('SERVER_IDLE_SECONDS', 900))
+MAX_LINE = int(os.environ.get('SERVER_MAX_LINE', 1024))
+BACKLOG = int(os.environ.get('SERVER_BACKLOG', 1024))  # Connections waiting to be accepted
+DATABASE_THREADS = int(os.environ.get('SERVER_DATABASE_THREADS', 8))
+
+# Shared, not owned by any one session
+_UNCOUNTED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+def _deep_size(root):
+    """Approximate bytes reachable from root, following instances, containers and suspended generators"""
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _UNCOUNTED):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, types.GeneratorType):
+            if obj.gi_frame is not None:
+                stack.extend(obj.gi_frame.f_locals.values())
+            if obj.gi_yieldfrom is not None:
+                stack.append(obj.gi_yieldfrom)
+        elif hasattr(obj, '__dict__'):
+            stack.append(obj.__dict__)
+    return total
+
+
+class Session:
+    """One connected player and their game"""
+    
+    def __init__(self, session_id, send, close, character_id=None):
+        self.id = session_id
+        self.character_id = character_id  # Saved character to resume with instead of the title screen
+        self.game = Game(delay=0, defer_database=True)
+        self.send = send  # Coroutine function taking (events, prompt)
+        self.close = close  # Function that disconnects the client, the session then ends
+        self.last_active = time.monotonic()
+        self.steps = 0
+        self.waiting = False  # Waiting for the player's next input
+        self.evicted = False
+        self.finished = False  # The player quit the game, saving or not as they chose
+    
+    def memory(self):
+        """Approximate bytes held by this session's game, character and suspended menus"""
+        return _deep_size(self.game)
+
+
+class GameServer:
+    """
+    Runs every session's game on one worker thread, keeping the event loop free for network I/O
+    
+    Steps are short and CPU-bound, so one thread runs them all, one at a
+    time. Games stop at their database calls (Game.defer_database), which
+    run on a separate pool of DATABASE_THREADS, so one slow save or load
+    never holds up everyone else's steps. Server messages go to stderr,
+    apart from what players are sent.
+    """
+    
+    def __init__(self, idle_seconds=IDLE_SECONDS, protocol='line', dispatched=False):
+        self.idle_seconds = idle_seconds
+        self.protocol = protocol
+        self.dispatched = dispatched  # Connections come from game_cluster.py, see handle_tcp
+        self.sessions = {}  # session id -> Session
+        self._ids = itertools.count(1)
+        self._handlers = set()
+        self._servers = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="game-step")
+        self._database = ThreadPoolExecutor(max_workers=DATABASE_THREADS, thread_name_prefix="game-db")
+        self._stopping = False
+        self._stopped = None  # Event set once stop() has finished
+    
+    async def _call(self, func, *args):
+        """Run func on the game thread"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    async def _call_database(self, func, *args):
+        """Run func on a database thread"""
+        return await asyncio.get_running_loop().run_in_executor(self._database, func, *args)
+    
+    async def _step(self, session, *command):
+        """Advance a session's game to its next prompt, making the database calls it stops at on the way"""
+        game = session.game
+        events, prompt = await self._call(game.step, *command)
+        while game.database_call is not None:
+            await self._call_database(game.database_call.run)
+            events, prompt = await self._call(game.step)
+        return events, prompt
+    
+    async def _play(self, session, receive):
+        """Drive a session until the game ends or the client goes away, then save it if it was cut short"""
+        self.sessions[session.id] = session
+        self._handlers.add(asyncio.current_task())
+        try:
+            if session.character_id is not None:
+                await self._call_database(_resume_session, session)
+            events, prompt = await self._step(session)
+            await session.send(events, prompt)
+            while prompt is not None:
+                session.last_active = time.monotonic()  # Idle time only counts while waiting on the player
+                session.waiting = True
+                command = await receive()
+                session.waiting = False
+                if command is None:
+                    break  # Disconnected
+                events, prompt = await self._step(session, command)
+                session.steps += 1
+                await session.send(events, prompt)
+            session.finished = prompt is None
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            print(f"Session {session.id} failed: {e}", file=sys.stderr)
+        finally:
+            del self.sessions[session.id]
+            self._handlers.discard(asyncio.current_task())
+            await self._call(_save_session, session)
+            session.close()
+    
+    async def handle_tcp(self, reader, writer):
+        """
+        asyncio.start_server callback, one per connection
+        
+        When dispatched, each connection starts with a {"session": id, "character": save id or null}
+        header line and every json reply also carries the player's "character" save id, so the
+        dispatcher can resume the session elsewhere from its last save.
+        """
+        json_mode = self.protocol == 'json'
+        session_id, character_id = next(self._ids), None
+        if self.dispatched:
+            try:
+                header = json.loads(await reader.readline())
+                session_id, character_id = header['session'], header.get('character')
+            except (ValueError, TypeError, KeyError):
+                writer.close()
+                return
+        
+        async def send(events, prompt):
+            if json_mode:
+                frame = {'session': session.id, 'events': events, 'prompt': prompt}
+                if self.dispatched:
+                    frame['character'] = getattr(session.game.player, 'save_id', None)
+                writer.write((json.dumps(frame) + "\n").encode())
+            else:
+                writer.write(("".join(event['text'] for event in events) + (prompt or "")).encode())
+            await writer.drain()
+        
+        async def receive():
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    return None  # Longer than MAX_LINE
+                if not line:
+                    return None
+                text = line.decode(errors='replace').rstrip("\r\n")
+                if not json_mode:
+                    return text
+                try:
+                    return str(json.loads(text)['command'])
+                except (ValueError, TypeError, KeyError):
+                    await send([{'type': 'error', 'text': 'Expected {"command": "..."}'}], session.game.prompt)
+        
+        session = Session(session_id, send, writer.close, character_id)
+        await self._play(session, receive)
+    
+    async def handle_websocket(self, websocket):
+        """websockets.serve callback, one per connection; messages are always json"""
+        from websockets.exceptions import ConnectionClosed
+        
+        async def send(events, prompt):
+            try:
+                await websocket.send(json.dumps({'session': session.id, 'events': events, 'prompt': prompt}))
+            except ConnectionClosed as closed:
+                raise ConnectionError(str(closed)) from closed
+        
+        async def receive():
+            while True:
+                try:
+                    message = await websocket.recv()
+                except ConnectionClosed:
+                    return None
+                try:
+                    return str(json.loads(message)['command'])
+                except (ValueError, TypeError, KeyError):
+                    await send([{'type': 'error', 'text': 'Expected {"command": "..."}'}], session.game.prompt)
+        
+        def close():
+            asyncio.ensure_future(websocket.close())
+        
+        session = Session(next(self._ids), send, close)
+        await self._play(session, receive)
+    
+    async def evict_idle(self):
+        """Close sessions idle for longer than idle_seconds, saving characters already saved on the way out"""
+        while not self._stopping:
+            await asyncio.sleep(min(self.idle_seconds / 4, 30))
+            cutoff = time.monotonic() - self.idle_seconds
+            for session in list(self.sessions.values()):
+                if session.waiting and session.last_active < cutoff and not session.evicted:
+                    session.evicted = True
+                    saved = " Your character has been saved." if _keeps_save(session) else ""
+                    await _notify(session, f"\n⏰ You were idle for too long and have been disconnected.{saved}\n")
+                    session.close()
+    
+    def stats(self):
+        """Open sessions, steps played and memory held, in bytes"""
+        sizes = [session.memory() for session in list(self.sessions.values())]
+        return {
+            'sessions': len(sizes),
+            'steps': sum(session.steps for session in list(self.sessions.values())),
+            'memory': sum(sizes),
+            'largest_session': max(sizes, default=0),
+        }
+    
+    async def report(self, every):
+        """Print stats() every so many seconds"""
+        while not self._stopping:
+            await asyncio.sleep(every)
+            stats = self.stats()
+            print(f"{stats['sessions']} sessions, {stats['steps']} steps, {stats['memory'] // 1024} KB "
+                  f"(largest {stats['largest_session'] // 1024} KB)", file=sys.stderr)
+    
+    async def serve(self, host, port, websocket_port=None, stats_every=None):
+        """Accept connections until stop() is called"""
+        self._stopped = asyncio.Event()
+        self._servers.append(await asyncio.start_server(self.handle_tcp, host, port, limit=MAX_LINE,
+                                                              backlog=BACKLOG))
+        print(f"Serving {self.protocol} protocol on {host}:{port}", file=sys.stderr)
+        if websocket_port is not None:
+            try:
+                import websockets
+            except ImportError:
+                print("WebSocket support needs the websockets package: pip install websockets", file=sys.stderr)
+            else:
+                self._servers.append(await websockets.serve(self.handle_websocket, host, websocket_port,
+                                                            max_size=MAX_LINE))
+                print(f"Serving WebSocket on {host}:{websocket_port}", file=sys.stderr)
+        
+        background = [asyncio.create_task(self.evict_idle())]
+        if stats_every:
+            background.append(asyncio.create_task(self.report(stats_every)))
+        await self._stopped.wait()
+        for task in background:
+            task.cancel()
+    
+    async def stop(self):
+        """Stop accepting, save and close every session, then wait for the saves to be written"""
+        from save_queue import flush_saves
+        self._stopping = True
+        for server in self._servers:
+            server.close()
+        stats = self.stats()
+        print(f"Shutting down {stats['sessions']} sessions ({stats['memory'] // 1024} KB)", file=sys.stderr)
+        for session in list(self.sessions.values()):
+            saved = " Your character has been saved." if _keeps_save(session) else ""
+            await _notify(session, f"\n🛑 The server is shutting down.{saved}\n")
+            session.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._call_database(flush_saves, 30)
+        self._executor.shutdown()
+        self._database.shutdown()
+        self._stopped.set()
+
+async def _notify(session, text):
+    """Send a message outside the game, ignoring clients that are already gone"""
+    try:
+        await session.send([{'type': 'output', 'text': text}], None)
+    except (ConnectionError, RuntimeError):
+        pass
+
+def _resume_session(session):
+    """Load a session's character from the save store so its game starts at the main menu"""
+    from db_utils import load_character
+    session.game.player = load_character(session.character_id)
+
+def _keeps_save(session):
+    """Whether a session cut short has a save to bring up to date"""
+    if session.finished:
+        return False  # The player quit and already saved, or chose not to
+    player = session.game.player
+    # Only characters the player saved before, a guest never saved gets no save row
+    return (player is not None and player.save_id is not None
+            and getattr(player, 'save_conflict', None) is None)
+
+def _save_session(session):
+    """Queue a save of a departing session's character, if it was cut short with a save to keep"""
+    if not _keeps_save(session):
+        return
+    from save_queue import get_save_queue
+    get_save_queue().submit(session.game.player, overwrite=True)
+
+async def _main(args):
+    """Serve until a signal asks to stop"""
+    server = GameServer(args.idle_seconds, args.protocol, args.dispatched)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, lambda: asyncio.ensure_future(server.stop()))
+        except (NotImplementedError, AttributeError):
+            pass  # Windows, Ctrl+C raises KeyboardInterrupt instead
+    await server.serve(args.host, args.port, args.websocket_port, args.stats_every)
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Host many games of the RPG in one process")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=4000, help="TCP port (default 4000)")
+    parser.add_argument('--protocol', choices=['line', 'json'], default='line', help="TCP protocol (default line)")
+    parser.add_argument('--websocket-port', type=int, help="Also serve json over WebSocket on this port")
+    parser.add_argument('--idle-seconds', type=float, default=IDLE_SECONDS,
+                        help=f"Save and disconnect players idle this long (default {IDLE_SECONDS:g})")
+    parser.add_argument('--stats-every', type=float, help="Print session count and memory every so many seconds")
+    parser.add_argument('--dispatched', action='store_true', help="Run as a game_cluster.py worker")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
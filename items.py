@@ -1,4 +1,5 @@
 import random
+from game_output import say
 
 class Item:
     """Base class for all items in the game"""
@@ -14,7 +15,7 @@ class Item:
         
     def use(self, character) -> bool:
         """Base use method - to be overridden by subclasses"""
-        print(f"{character.emoji} {character.name} cannot use {self.name}.")
+        say(f"{character.emoji} {character.name} cannot use {self.name}.")
         return False  # Must return False to indicate item was not used
 
 
@@ -28,7 +29,7 @@ class Consumable(Item):
     def use(self, character) -> bool:
         """Use the consumable item - to be defined by subclasses"""
         if self.uses <= 0:
-            print(f"{self.emoji} {self.name} is depleted and cannot be used.")
+            say(f"{self.emoji} {self.name} is depleted and cannot be used.")
             return False
         
         # Reduce uses
@@ -71,7 +72,7 @@ class HealthPotion(Consumable):
         character.hp = min(character.max_hp, character.hp + self.heal_amount)
         actual_heal = character.hp - old_hp
         
-        print(f"{self.emoji} {character.name} drinks {self.name} and recovers {actual_heal} HP! ❤️")
+        say(f"{self.emoji} {character.name} drinks {self.name} and recovers {actual_heal} HP! ❤️")
         return True
 
 
@@ -110,7 +111,7 @@ class ManaPotion(Consumable):
         character.mana = min(character.max_mana, character.mana + self.mana_amount)
         actual_mana = character.mana - old_mana
         
-        print(f"{self.emoji} {character.name} drinks {self.name} and recovers {actual_mana} Mana! 🔮")
+        say(f"{self.emoji} {character.name} drinks {self.name} and recovers {actual_mana} Mana! 🔮")
         return True
 
 
@@ -141,17 +142,28 @@ class StrengthElixir(Consumable):
         character.attack_boost_duration = self.duration
         character.base_attack += self.boost_amount
         
-        print(f"{self.emoji} {character.name} drinks {self.name} and gains +{self.boost_amount} attack for {self.duration} turns! ⚔️")
+        say(f"{self.emoji} {character.name} drinks {self.name} and gains +{self.boost_amount} attack for {self.duration} turns! ⚔️")
         return True
 
 
 class Equipment(Item):
     """Base class for equippable items"""
     
-    def __init__(self, name, description, value, slot, stat_boost):
+    def __init__(self, name, description, value, slot, stat_boost, quality="common"):
         super().__init__(name, description, value)
         self.slot = slot  # Where it's equipped (weapon, head, body, etc)
         self.stat_boost = stat_boost  # Dict of stats to boost
+        self.quality = quality  # common, uncommon or rare
+        
+    def gear_score(self) -> float:
+        """Rough strength of the item, used to compare gear for the same slot"""
+        score = 0
+        for stat, value in self.stat_boost.items():
+            if stat in ('max_hp', 'max_mana'):
+                score += value / 5  # Pool boosts are rolled on a 5x scale
+            else:
+                score += value
+        return score
         
     def equip(self, character) -> bool:
         """Equip the item and apply stat boosts"""
@@ -188,14 +200,16 @@ class Equipment(Item):
                 
         # Equip the item
         character.equipment[self.slot] = self
+        if hasattr(character, 'mark_dirty'):
+            character.mark_dirty('equipment')
         
-        print(f"{self.emoji} {character.name} equipped {self.name}!")
+        say(f"{self.emoji} {character.name} equipped {self.name}!")
         return True
         
     def unequip(self, character) -> bool:
         """Unequip the item and remove stat boosts"""
         if not hasattr(character, 'equipment') or self.slot not in character.equipment:
-            print(f"{character.emoji} {character.name} doesn't have {self.name} equipped.")
+            say(f"{character.emoji} {character.name} doesn't have {self.name} equipped.")
             return False
             
         # Remove stat boosts
@@ -213,34 +227,36 @@ class Equipment(Item):
                 
         # Remove from equipment
         del character.equipment[self.slot]
+        if hasattr(character, 'mark_dirty'):
+            character.mark_dirty('equipment')
         
-        print(f"{self.emoji} {character.name} unequipped {self.name}.")
+        say(f"{self.emoji} {character.name} unequipped {self.name}.")
         return True
 
 
 class Weapon(Equipment):
     """Weapons that boost attack"""
     
-    def __init__(self, name, description, value, attack_boost):
+    def __init__(self, name, description, value, attack_boost, quality="common"):
         stat_boost = {'attack': attack_boost}
-        super().__init__(name, description, value, 'weapon', stat_boost)
+        super().__init__(name, description, value, 'weapon', stat_boost, quality)
         self.emoji = "⚔️"
 
 
 class Armor(Equipment):
     """Armor that boosts defense"""
     
-    def __init__(self, name, description, value, defense_boost):
+    def __init__(self, name, description, value, defense_boost, quality="common"):
         stat_boost = {'defense': defense_boost}
-        super().__init__(name, description, value, 'armor', stat_boost)
+        super().__init__(name, description, value, 'armor', stat_boost, quality)
         self.emoji = "🛡️"
 
 
 class Accessory(Equipment):
     """Accessories with various stat boosts"""
     
-    def __init__(self, name, description, value, stat_boosts):
-        super().__init__(name, description, value, 'accessory', stat_boosts)
+    def __init__(self, name, description, value, stat_boosts, quality="common"):
+        super().__init__(name, description, value, 'accessory', stat_boosts, quality)
         self.emoji = "💍"
 
 
@@ -248,24 +264,60 @@ class Inventory:
     """Manages a character's inventory"""
     
     def __init__(self, max_size=10):
+        self._dirty = None  # Tracked once the owner is saved or loaded
         self.items = []
         self.max_size = max_size
         self.gold = 0
         
+    def __setattr__(self, name, value):
+        """Record changes to gold and the item list"""
+        if name in ('gold', 'items'):
+            dirty = self.__dict__.get('_dirty')
+            if dirty is not None and (name == 'items' or self.__dict__.get(name) != value):
+                dirty.add(name)
+        object.__setattr__(self, name, value)
+        
+    def mark_items_changed(self):
+        """Flag the item list as changed, for changes made to it in place"""
+        if self._dirty is not None:
+            self._dirty.add('items')
+            
+    def mark_clean(self):
+        """Start tracking changes from the current contents"""
+        self._dirty = set()
+        
+    def dirty_fields(self):
+        """'gold'/'items' if changed since the last save or load, None if untracked"""
+        return None if self._dirty is None else set(self._dirty)
+        
     def add_item(self, item) -> bool:
         """Add an item to inventory if space available"""
         if len(self.items) >= self.max_size:
             return False
         self.items.append(item)
+        self.mark_items_changed()
         return True
         
     def remove_item(self, item) -> bool:
         """Remove an item from inventory"""
         if item in self.items:
             self.items.remove(item)
+            self.mark_items_changed()
             return True
         return False
         
+    def remove_items(self, items) -> int:
+        """Remove several items in a single pass, returns how many were removed"""
+        doomed = {id(item) for item in items}
+        kept = [item for item in self.items if id(item) not in doomed]
+        removed = len(self.items) - len(kept)
+        self.items = kept
+        return removed
+        
+    def free_slots(self) -> int:
+        """Number of items that can still be added"""
+        return max(0, self.max_size - len(self.items))
+        
     def get_consumables(self) -> list:
         """Get all consumable items in inventory"""
         return [item for item in self.items if isinstance(item, Consumable)]
@@ -277,14 +329,14 @@ class Inventory:
     def display(self) -> None:
         """Display inventory contents"""
         if not self.items:
-            print("Your inventory is empty.")
+            say("Your inventory is empty.")
             return
             
-        print(f"💰 Gold: {self.gold}")
-        print(f"Inventory ({len(self.items)}/{self.max_size}):")
+        say(f"💰 Gold: {self.gold}")
+        say(f"Inventory ({len(self.items)}/{self.max_size}):")
         
         for i, item in enumerate(self.items, 1):
-            print(f"{i}. {item}")
+            say(f"{i}. {item}")
 
 
 # Item generation functions
@@ -360,7 +412,7 @@ def generate_weapon(level: int, quality: str) -> Weapon:
     name = f"{prefix}{weapon_type}"
     description = f"Increases attack by {attack_boost}"
     
-    return Weapon(name, description, value, attack_boost)
+    return Weapon(name, description, value, attack_boost, quality)
 
 
 def generate_armor(level: int, quality: str) -> Armor:
@@ -392,7 +444,7 @@ def generate_armor(level: int, quality: str) -> Armor:
     name = f"{prefix}{armor_type}"
     description = f"Increases defense by {defense_boost}"
     
-    return Armor(name, description, value, defense_boost)
+    return Armor(name, description, value, defense_boost, quality)
 
 
 def generate_accessory(level: int, quality: str) -> Accessory:
@@ -447,7 +499,7 @@ def generate_accessory(level: int, quality: str) -> Accessory:
             
     description = ", ".join(stat_descriptions)
     
-    return Accessory(name, description, value, stat_boosts)
+    return Accessory(name, description, value, stat_boosts, quality)
 
 
 class Shop:
@@ -510,41 +562,41 @@ class Shop:
     
     def display(self):
         """Display all items in the shop inventory"""
-        print("\n" + "="*60)
-        print("🛒  MERCHANT'S SHOP  🛒")
-        print("="*60)
+        say("\n" + "="*60)
+        say("🛒  MERCHANT'S SHOP  🛒")
+        say("="*60)
         
         if not self.inventory:
-            print("The shop is empty! Come back later.")
+            say("The shop is empty! Come back later.")
             return
             
-        print(f"Gold is required to purchase these items.")
-        print("-"*60)
+        say(f"Gold is required to purchase these items.")
+        say("-"*60)
         
         for i, item in enumerate(self.inventory, 1):
             quality_marker = ""
-            if hasattr(item, 'description') and 'rare' in item.description.lower():
+            if getattr(item, 'quality', None) == "rare":
                 quality_marker = "🌟"
-            elif hasattr(item, 'description') and 'uncommon' in item.description.lower():
+            elif getattr(item, 'quality', None) == "uncommon":
                 quality_marker = "✨"
                 
-            print(f"{i}. {item.emoji if hasattr(item, 'emoji') else '📦'} {item.name} {quality_marker}- {item.value} gold")
+            say(f"{i}. {item.emoji if hasattr(item, 'emoji') else '📦'} {item.name} {quality_marker}- {item.value} gold")
             if hasattr(item, 'description'):
-                print(f"   {item.description}")
+                say(f"   {item.description}")
         
-        print("="*60)
+        say("="*60)
         
     def buy_item(self, player, item_index):
         """Let player buy an item from the shop"""
         if item_index < 0 or item_index >= len(self.inventory):
-            print("Invalid item selection!")
+            say("Invalid item selection!")
             return False
             
         item = self.inventory[item_index]
         
         # Check if player has enough gold
         if not hasattr(player, 'inventory') or not hasattr(player.inventory, 'gold') or player.inventory.gold < item.value:
-            print(f"{player.emoji if hasattr(player, 'emoji') else '👤'} {player.name} doesn't have enough gold! Need {item.value} gold.")
+            say(f"{player.emoji if hasattr(player, 'emoji') else '👤'} {player.name} doesn't have enough gold! Need {item.value} gold.")
             return False
             
         # Try to add to player's inventory
@@ -553,16 +605,16 @@ class Shop:
             player.inventory.gold -= item.value
             # Remove from shop
             self.inventory.pop(item_index)
-            print(f"{player.emoji if hasattr(player, 'emoji') else '👤'} {player.name} purchased {item.emoji if hasattr(item, 'emoji') else '📦'} {item.name} for {item.value} gold!")
+            say(f"{player.emoji if hasattr(player, 'emoji') else '👤'} {player.name} purchased {item.emoji if hasattr(item, 'emoji') else '📦'} {item.name} for {item.value} gold!")
             return True
         else:
-            print(f"{player.emoji if hasattr(player, 'emoji') else '👤'} {player.name}'s inventory is full!")
+            say(f"{player.emoji if hasattr(player, 'emoji') else '👤'} {player.name}'s inventory is full!")
             return False
             
     def sell_item(self, player, item_index):
         """Let player sell an item to the shop"""
         if not hasattr(player, 'inventory') or not hasattr(player.inventory, 'items') or item_index < 0 or item_index >= len(player.inventory.items):
-            print("Invalid item selection!")
+            say("Invalid item selection!")
             return False
             
         item = player.inventory.items[item_index]
@@ -576,4 +628,103 @@ class Shop:
         # Remove item from inventory
         player.inventory.remove_item(item)
         
-        print(f"{player.emoji if hasattr(player, 'emoji') else '👤'} {player.name} sold {item.emoji if hasattr(item, 'emoji') else '📦'} {item.name} for {sell_value} gold!")
\ No newline at end of file
+        say(f"{player.emoji if hasattr(player, 'emoji') else '👤'} {player.name} sold {item.emoji if hasattr(item, 'emoji') else '📦'} {item.name} for {sell_value} gold!")
+        return True
+        
+    @staticmethod
+    def sell_value(item) -> int:
+        """Gold the shop pays for an item (50% of buy value)"""
+        return max(1, item.value // 2)
+        
+    def buy_items(self, player, item_indices):
+        """Let player buy several shop items at once, all or nothing"""
+        indices = sorted(set(item_indices))
+        if not indices or indices[0] < 0 or indices[-1] >= len(self.inventory):
+            say("Invalid item selection!")
+            return False
+            
+        items = [self.inventory[i] for i in indices]
+        total_cost = sum(item.value for item in items)
+        player_emoji = player.emoji if hasattr(player, 'emoji') else '👤'
+        
+        # Validate the whole order before touching gold or inventory
+        if not hasattr(player, 'inventory') or not hasattr(player.inventory, 'gold') or player.inventory.gold < total_cost:
+            say(f"{player_emoji} {player.name} doesn't have enough gold! Need {total_cost} gold.")
+            return False
+            
+        if player.inventory.free_slots() < len(items):
+            say(f"{player_emoji} {player.name}'s inventory doesn't have room for {len(items)} items!")
+            return False
+            
+        # Apply the whole order as one update
+        player.inventory.items.extend(items)
+        player.inventory.mark_items_changed()
+        player.inventory.gold -= total_cost
+        bought = set(indices)
+        self.inventory = [item for i, item in enumerate(self.inventory) if i not in bought]
+        
+        for item in items:
+            say(f"{player_emoji} {player.name} purchased {item.emoji if hasattr(item, 'emoji') else '📦'} {item.name} for {item.value} gold!")
+        if len(items) > 1:
+            say(f"💰 Total spent: {total_cost} gold")
+        return True
+        
+    def sell_items(self, player, items):
+        """Let player sell several items at once, returns the gold earned"""
+        if not hasattr(player, 'inventory') or not hasattr(player.inventory, 'items'):
+            say("Invalid item selection!")
+            return 0
+            
+        # Only sell items the player actually carries, each one once
+        owned = {id(item) for item in player.inventory.items}
+        to_sell = list({id(item): item for item in items if id(item) in owned}.values())
+        if not to_sell:
+            say("Nothing to sell!")
+            return 0
+            
+        total_value = sum(self.sell_value(item) for item in to_sell)
+        
+        # Apply gold and inventory changes together
+        player.inventory.remove_items(to_sell)
+        player.inventory.gold += total_value
+        
+        player_emoji = player.emoji if hasattr(player, 'emoji') else '👤'
+        for item in to_sell:
+            say(f"{player_emoji} {player.name} sold {item.emoji if hasattr(item, 'emoji') else '📦'} {item.name} for {self.sell_value(item)} gold!")
+        if len(to_sell) > 1:
+            say(f"💰 Total earned: {total_value} gold")
+        return total_value
+        
+    def find_junk(self, player, max_value=None, common_only=False, not_better_than_equipped=False):
+        """Select inventory items matching every given junk filter"""
+        if not hasattr(player, 'inventory'):
+            return []
+            
+        equipment = getattr(player, 'equipment', {})
+        junk = []
+        for item in player.inventory.items:
+            if max_value is not None and item.value >= max_value:
+                continue
+            if common_only and not (isinstance(item, Equipment) and item.quality == "common"):
+                continue
+            if not_better_than_equipped:
+                if not isinstance(item, Equipment):
+                    continue
+                if any(item is worn or (type(item) is type(worn) and vars(item) == vars(worn))
+                       for worn in equipment.values()):
+                    # Equipping leaves the item in the bag, and loading a save turns it into
+                    # an equal copy there, so never sell what is worn or a copy of it
+                    continue
+                equipped = equipment.get(item.slot)
+                if equipped is None or item.gear_score() > equipped.gear_score():
+                    continue
+            junk.append(item)
+        return junk
+        
+    def sell_junk(self, player, max_value=None, common_only=False, not_better_than_equipped=False):
+        """Sell every item matching the junk filters in one transaction"""
+        junk = self.find_junk(player, max_value, common_only, not_better_than_equipped)
+        if not junk:
+            say("No items match that filter.")
+            return 0
+        return self.sell_items(player, junk)
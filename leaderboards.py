@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Leaderboards kept up to date by saves
+
+Every full save updates the saving character's rows in leaderboard_entries
+in the same transaction, so rankings are read from the (board, score) index
+and never scan saved_characters. The best LEADERBOARD_TOP_K entries of each
+board are also kept in memory, so showing a top ten is usually free.
+
+    python leaderboards.py show level --top 10
+    python leaderboards.py rank gold 42
+    python leaderboards.py export leaderboards.csv
+    python leaderboards.py rebuild
+"""
+import os
+import sys
+import csv
+import json
+import time
+import heapq
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import bindparam, event, func, insert, literal, select, true
+from sqlalchemy.exc import SQLAlchemyError
+from db_models import Session, session_scope, SavedCharacter, LeaderboardEntry
+from game_output import say
+
+TIER_NAMES = ['Base', 'Apprentice', 'Adept', 'Master', 'Grand', 'Elder', 'Celestial']
+
+# Board -> (title, True if a higher score ranks higher)
+BOARDS = {
+    'level': ("Highest level", True),
+    'gold': ("Most gold", True),
+}
+for _tier in range(1, len(TIER_NAMES)):
+    BOARDS[f'tier_{_tier}'] = (f"Fastest to tier {_tier} ({TIER_NAMES[_tier]})", False)
+
+# Saved fields that can change a score
+_SCORED_FIELDS = {'level', 'gold', 'class_tier', 'tier_times'}
+
+_ENTRY_COLUMNS = (LeaderboardEntry.board, LeaderboardEntry.character_id, LeaderboardEntry.name,
+                  LeaderboardEntry.character_class, LeaderboardEntry.score, LeaderboardEntry.recorded_at)
+
+def _entry(board, character_id, name, character_class, score, recorded_at):
+    """Plain dict for one leaderboard row, safe to keep after the session closes"""
+    return {
+        'board': board,
+        'character_id': character_id,
+        'name': name,
+        'character_class': character_class,
+        'score': score,
+        'recorded_at': recorded_at,
+    }
+
+def _sort_key(entry):
+    """Smaller is better: score, then whoever got there first"""
+    score = -entry['score'] if BOARDS[entry['board']][1] else entry['score']
+    recorded = entry['recorded_at'].timestamp() if entry['recorded_at'] else 0.0
+    return (score, recorded, entry['character_id'])
+
+def _ordering(board):
+    """ORDER BY matching _sort_key, served by ix_leaderboard_board_score"""
+    score = LeaderboardEntry.score.desc() if BOARDS[board][1] else LeaderboardEntry.score.asc()
+    return (score, LeaderboardEntry.recorded_at.asc(), LeaderboardEntry.character_id.asc())
+
+def format_score(board, score):
+    """Score as shown to players, tier boards are durations"""
+    if board.startswith('tier_'):
+        return str(timedelta(seconds=score))
+    return str(score)
+
+
+class TopScores:
+    """
+    The best k entries of each board, for hot reads
+    
+    A board is loaded from the database on its first read and afterwards
+    updated in place by this process's saves, with a min-heap on the
+    worst cached entry so an update costs O(log k). Boards are dropped
+    after max_age seconds to pick up other processes' saves, and whenever
+    an update could let an entry the cache never saw into the top k.
+    """
+    
+    def __init__(self, k=100, max_age=30):
+        self.k = k  # 0 turns the cache off
+        self.max_age = max_age
+        self._boards = {}  # board -> (heap of negated sort keys, {character_id: (key, entry)}, complete, loaded_at)
+        self._lock = threading.Lock()
+    
+    def _fresh(self, board):
+        """Cached state of a board, None if missing or expired"""
+        state = self._boards.get(board)
+        if state is not None and time.monotonic() - state[3] > self.max_age:
+            del self._boards[board]
+            return None
+        return state
+    
+    def get(self, board, n):
+        """Best n entries best first, None if the cache cannot answer"""
+        with self._lock:
+            state = self._fresh(board)
+            if state is None or (n > len(state[1]) and not state[2]):
+                return None
+            return [entry for _, entry in sorted(state[1].values(), key=lambda pair: pair[0])[:n]]
+    
+    def rank(self, board, character_id):
+        """(rank, entry) for a cached character, None if it is not cached"""
+        with self._lock:
+            state = self._fresh(board)
+            if state is None or character_id not in state[1]:
+                return None
+            key, entry = state[1][character_id]
+            return sum(1 for other, _ in state[1].values() if other < key) + 1, entry
+    
+    def load(self, board, entries, complete):
+        """Cache a board's best entries, complete if they are all of them"""
+        if self.k <= 0:
+            return
+        members = {entry['character_id']: (_sort_key(entry), entry) for entry in entries[:self.k]}
+        heap = [(tuple(-part for part in key), character_id) for character_id, (key, _) in members.items()]
+        heapq.heapify(heap)
+        with self._lock:
+            self._boards[board] = (heap, members, complete and len(entries) <= self.k, time.monotonic())
+    
+    def offer(self, entry):
+        """Apply a committed score change to its board, if cached"""
+        board = entry['board']
+        character_id = entry['character_id']
+        key = _sort_key(entry)
+        with self._lock:
+            state = self._fresh(board)
+            if state is None:
+                return
+            heap, members, complete, loaded_at = state
+            
+            if character_id in members:
+                old_key = members.pop(character_id)[0]
+                heap[:] = [item for item in heap if item[1] != character_id]
+                heapq.heapify(heap)
+                if key > old_key and not complete:
+                    # Worse than before, an uncached entry may now beat it
+                    del self._boards[board]
+                    return
+            
+            negated = tuple(-part for part in key)
+            if len(members) < self.k:
+                heapq.heappush(heap, (negated, character_id))
+                members[character_id] = (key, entry)
+            elif negated > heap[0][0]:
+                _, evicted = heapq.heapreplace(heap, (negated, character_id))
+                del members[evicted]
+                members[character_id] = (key, entry)
+                complete = False
+            else:
+                complete = False
+            self._boards[board] = (heap, members, complete, loaded_at)
+    
+    def discard(self, character_id):
+        """Remove a deleted character from every cached board"""
+        with self._lock:
+            for board, (heap, members, complete, loaded_at) in list(self._boards.items()):
+                if character_id not in members:
+                    continue
+                if not complete:
+                    del self._boards[board]  # The next entry down is not cached
+                    continue
+                del members[character_id]
+                heap[:] = [item for item in heap if item[1] != character_id]
+                heapq.heapify(heap)
+    
+    def clear(self):
+        """Drop every cached board"""
+        with self._lock:
+            self._boards.clear()
+
+
+_top_scores = TopScores(int(os.environ.get('LEADERBOARD_TOP_K', 100)),
+                        int(os.environ.get('LEADERBOARD_CACHE_SECONDS', 30)))
+
+@event.listens_for(Session, 'after_commit')
+def _publish(session):
+    """Apply a transaction's leaderboard changes to the in-memory boards once it commits"""
+    for entry in session.info.pop('leaderboard_changes', ()):
+        _top_scores.offer(entry)
+    for character_id in session.info.pop('leaderboard_discards', ()):
+        _top_scores.discard(character_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    """Forget leaderboard changes from a transaction that rolled back"""
+    session.info.pop('leaderboard_changes', None)
+    session.info.pop('leaderboard_discards', None)
+
+def _tier_seconds(started_at, created_at, tier_times, class_tier, now):
+    """{tier: seconds from creation to reaching it}, tiers reached before times were kept count up to now"""
+    if started_at is None:
+        started_at = created_at.replace(tzinfo=timezone.utc).timestamp()  # created_at is UTC
+    seconds = {}
+    for tier in range(1, (class_tier or 0) + 1):
+        reached = tier_times[tier - 1] if tier <= len(tier_times) else now
+        seconds[tier] = max(0, int(reached - started_at))
+    return seconds
+
+# Built once, every save that touches a scored field runs it
+_SELECT_ENTRIES = select(LeaderboardEntry).where(LeaderboardEntry.character_id == bindparam('character_id'))
+
+def record_scores(session, saved_character, dirty=None):
+    """
+    Bring a save's leaderboard entries up to date in an open session
+    
+    Level and gold entries follow the save. A tier entry is written by the
+    first save at that tier and never changes, its score being the seconds
+    from the character's creation (its first save, for saves made before
+    characters kept started_at) to when evolve_class reached the tier. Tiers
+    reached before characters kept tier_times are timed up to this save.
+    
+    Args:
+        session: Session the save is being written in
+        saved_character: SavedCharacter with the new values set
+        dirty: Fields changed since the last save, None if unknown
+    """
+    if dirty is not None and _SCORED_FIELDS.isdisjoint(dirty):
+        return
+    if saved_character.id is None or saved_character.created_at is None:
+        session.flush()  # New saves need their id and created_at
+    
+    now = datetime.utcnow()
+    tier_seconds = _tier_seconds(saved_character.started_at, saved_character.created_at,
+                                 json.loads(saved_character.tier_times or '[]'), saved_character.class_tier,
+                                 time.time())
+    entries = {
+        entry.board: entry
+        for entry in session.scalars(_SELECT_ENTRIES, {'character_id': saved_character.id})
+    }
+    scores = {'level': saved_character.level or 1, 'gold': saved_character.gold or 0}
+    for tier, seconds in tier_seconds.items():
+        if f'tier_{tier}' not in entries:
+            scores[f'tier_{tier}'] = seconds
+    
+    changes = session.info.setdefault('leaderboard_changes', [])
+    for board, score in scores.items():
+        entry = entries.get(board)
+        if entry is None:
+            entry = LeaderboardEntry(board=board, character_id=saved_character.id)
+            session.add(entry)
+        elif entry.score == score and entry.name == saved_character.name:
+            continue
+        entry.name = saved_character.name
+        entry.character_class = saved_character.character_class
+        if entry.score != score:
+            entry.score = score
+            entry.recorded_at = now
+        changes.append(_entry(board, saved_character.id, entry.name, entry.character_class,
+                              entry.score, entry.recorded_at))
+
+def forget_character(session, character_id):
+    """Remove a character from every leaderboard in an open session"""
+    session.query(LeaderboardEntry).filter_by(character_id=character_id).delete(synchronize_session=False)
+    session.info.setdefault('leaderboard_discards', []).append(character_id)
+
+def top_n(board, n=10):
+    """
+    Best entries of a board
+    
+    Args:
+        board: Key of BOARDS
+        n: Number of entries
+    
+    Returns:
+        List of entry dicts best first, each with its rank
+    """
+    if board not in BOARDS:
+        raise ValueError(f"Unknown leaderboard: {board}")
+    
+    entries = _top_scores.get(board, n)
+    if entries is None:
+        fetch = max(n, _top_scores.k)
+        try:
+            with session_scope() as session:
+                rows = session.query(*_ENTRY_COLUMNS).filter(
+                    LeaderboardEntry.board == board
+                ).order_by(*_ordering(board)).limit(fetch).all()
+        except SQLAlchemyError as e:
+            say(f"Database error: {e}")
+            return []
+        entries = [_entry(*row) for row in rows]
+        _top_scores.load(board, entries, complete=len(entries) < fetch)
+    
+    return [dict(entry, rank=rank) for rank, entry in enumerate(entries[:n], 1)]
+
+def my_rank(board, character_id):
+    """
+    A character's place on a board
+    
+    Ranks outside the cached top k are two index range counts: entries
+    with a better score, and entries with the same score reached earlier.
+    
+    Returns:
+        Entry dict with its rank, or None if the character is not on the board
+    """
+    if board not in BOARDS:
+        raise ValueError(f"Unknown leaderboard: {board}")
+    
+    cached = _top_scores.rank(board, character_id)
+    if cached is not None:
+        rank, entry = cached
+        return dict(entry, rank=rank)
+    
+    try:
+        with session_scope() as session:
+            row = session.query(*_ENTRY_COLUMNS).filter_by(board=board, character_id=character_id).first()
+            if row is None:
+                return None
+            entry = _entry(*row)
+            
+            on_board = session.query(func.count(LeaderboardEntry.id)).filter(LeaderboardEntry.board == board)
+            if BOARDS[board][1]:
+                better = on_board.filter(LeaderboardEntry.score > entry['score']).scalar()
+            else:
+                better = on_board.filter(LeaderboardEntry.score < entry['score']).scalar()
+            earlier = on_board.filter(
+                LeaderboardEntry.score == entry['score'],
+                LeaderboardEntry.recorded_at < entry['recorded_at']
+            ).scalar()
+    except SQLAlchemyError as e:
+        say(f"Database error: {e}")
+        return None
+    return dict(entry, rank=better + earlier + 1)
+
+def _rank(conn, chosen):
+    """Insert level, gold and kept tier time entries for the active saves matching a where clause"""
+    characters = SavedCharacter.__table__
+    entries = LeaderboardEntry.__table__
+    chosen = (characters.c.is_active == True) & chosen
+    for board, score in (('level', characters.c.level), ('gold', characters.c.gold)):
+        conn.execute(insert(entries).from_select(
+            ['board', 'character_id', 'name', 'character_class', 'score', 'recorded_at'],
+            select(literal(board), characters.c.id, characters.c.name, characters.c.character_class,
+                   func.coalesce(score, 0), characters.c.last_saved).where(chosen)
+        ))
+    
+    tiered = conn.execute(select(
+        characters.c.id, characters.c.name, characters.c.character_class, characters.c.started_at,
+        characters.c.created_at, characters.c.tier_times
+    ).where(chosen, characters.c.tier_times.is_not(None), characters.c.tier_times != '[]')).all()
+    for row in tiered:
+        tier_times = json.loads(row.tier_times)
+        seconds = _tier_seconds(row.started_at, row.created_at, tier_times, len(tier_times), None)
+        boards = [f'tier_{tier}' for tier in seconds]
+        conn.execute(entries.delete().where(entries.c.character_id == row.id, entries.c.board.in_(boards)))
+        conn.execute(insert(entries), [
+            {'board': f'tier_{tier}', 'character_id': row.id, 'name': row.name,
+             'character_class': row.character_class, 'score': score,
+             'recorded_at': datetime.utcfromtimestamp(tier_times[tier - 1])}
+            for tier, score in seconds.items()
+        ])
+
+def rank_characters(conn, character_ids):
+    """
+    Add newly inserted saves to the leaderboards in an open transaction
+    
+    For saves written without save_character, such as save_transfer
+    imports and archive restores. Scores are computed as rebuild does.
+    
+    Args:
+        conn: Connection inside the transaction that inserted the saves
+        character_ids: saved_characters ids with no leaderboard entries yet
+    """
+    if character_ids:
+        _rank(conn, SavedCharacter.__table__.c.id.in_(character_ids))
+        _top_scores.clear()
+
+def rebuild():
+    """
+    Recompute the level and gold boards, and tier times, from saved_characters
+    
+    For databases that had saves before leaderboards existed. Tier entries
+    are recomputed from the times kept in tier_times; tiers reached before
+    those were kept are left as they are, to fill in as characters are saved.
+    
+    Returns:
+        Number of active saves ranked
+    """
+    characters = SavedCharacter.__table__
+    entries = LeaderboardEntry.__table__
+    with session_scope() as session:
+        session.execute(entries.delete().where(
+            entries.c.board.in_(['level', 'gold']) | entries.c.character_id.in_(
+                select(characters.c.id).where(characters.c.is_active == False)
+            )
+        ))
+        _rank(session, true())
+        count = session.query(func.count(SavedCharacter.id)).filter(SavedCharacter.is_active == True).scalar()
+    _top_scores.clear()
+    return count
+
+def export_csv(path, boards=None, n=100):
+    """Write the top n of each board to a CSV file, '-' for stdout"""
+    out = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+    try:
+        writer = csv.writer(out)
+        writer.writerow(['board', 'rank', 'name', 'character_class', 'score', 'recorded_at'])
+        for board in boards or BOARDS:
+            for entry in top_n(board, n):
+                writer.writerow([board, entry['rank'], entry['name'], entry['character_class'], entry['score'],
+                                 entry['recorded_at'].isoformat() if entry['recorded_at'] else ''])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+def print_board(board, n=10, character_id=None):
+    """Print a board's top n, and the character's own place if given"""
+    say(f"\n🏆 {BOARDS[board][0]}")
+    entries = top_n(board, n)
+    if not entries:
+        say("  No entries yet.")
+    for entry in entries:
+        marker = " ◀" if entry['character_id'] == character_id else ""
+        say(f"  {entry['rank']:>3}. {entry['name']:<20} {entry['character_class']:<10} "
+              f"{format_score(board, entry['score']):>10}{marker}")
+    
+    if character_id is not None and all(entry['character_id'] != character_id for entry in entries):
+        mine = my_rank(board, character_id)
+        if mine:
+            say(f"  ...\n  {mine['rank']:>3}. {mine['name']:<20} {mine['character_class']:<10} "
+                  f"{format_score(board, mine['score']):>10} ◀")
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Show, export or rebuild leaderboards")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    show_parser = commands.add_parser('show', help="Print a board")
+    show_parser.add_argument('board', choices=list(BOARDS))
+    show_parser.add_argument('--top', type=int, default=10, help="Entries to show")
+    
+    rank_parser = commands.add_parser('rank', help="Print a character's place on a board")
+    rank_parser.add_argument('board', choices=list(BOARDS))
+    rank_parser.add_argument('character_id', type=int, help="saved_characters id")
+    
+    export_parser = commands.add_parser('export', help="Write boards to a CSV file")
+    export_parser.add_argument('path', help="CSV file, '-' for stdout")
+    export_parser.add_argument('--board', action='append', choices=list(BOARDS), help="Board to export, repeatable")
+    export_parser.add_argument('--top', type=int, default=100, help="Entries per board")
+    
+    commands.add_parser('rebuild', help="Recompute the level, gold and tier boards from existing saves")
+    
+    args = parser.parse_args(argv)
+    if args.command == 'show':
+        print_board(args.board, args.top)
+    elif args.command == 'rank':
+        entry = my_rank(args.board, args.character_id)
+        if entry is None:
+            print(f"Character {args.character_id} is not on the {args.board} board")
+            return 1
+        print(f"#{entry['rank']} {entry['name']} ({entry['character_class']}) "
+              f"{format_score(args.board, entry['score'])}")
+    elif args.command == 'export':
+        export_csv(args.path, args.board, args.top)
+    else:
+        print(f"Ranked {rebuild()} saved characters")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Database maintenance for saved characters
+
+Deleting a character only marks it inactive. compact moves inactive saves
+older than the retention window into the archived_characters table (or a
+JSON lines file), hard-deletes them with their items and journal, then
+reclaims space and refreshes planner statistics.
+
+    python maintenance.py compact --retention-days 30
+    python maintenance.py compact --to-file deleted.jsonl.gz
+    python maintenance.py restore 12
+"""
+import os
+import sys
+import json
+import zlib
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete, func
+from db_models import (get_engine, ensure_schema, SavedCharacter, SavedItem, SaveJournalEntry,
+                       ArchivedCharacter, LeaderboardEntry)
+from save_transfer import dump_characters, import_records, _open
+
+_characters = SavedCharacter.__table__
+_items = SavedItem.__table__
+_journal = SaveJournalEntry.__table__
+_archive = ArchivedCharacter.__table__
+_leaderboard = LeaderboardEntry.__table__
+
+def table_counts(conn):
+    """Row counts of the save tables"""
+    return {
+        table.name: conn.execute(select(func.count()).select_from(table)).scalar()
+        for table in (_characters, _items, _journal, _archive)
+    }
+
+def _archive_batch(conn, rows, out):
+    """Copy a batch of rows into the archive table, or to out if given"""
+    records = dump_characters(conn, rows)
+    if out is not None:
+        for record in records:
+            out.write(json.dumps(record) + "\n")
+        return
+    
+    conn.execute(insert(_archive), [
+        {
+            'original_id': row.id,
+            'name': row.name,
+            'character_class': row.character_class,
+            'deleted_at': row.last_saved,
+            'archived_at': datetime.utcnow(),
+            'payload': zlib.compress(json.dumps(record).encode('utf-8')),
+        }
+        for row, record in zip(rows, records)
+    ])
+
+def _sync(out):
+    """Get archived records onto disk before the saves they copy are deleted, raises if they can't be"""
+    out.flush()
+    if out is not sys.stdout:
+        os.fsync(out.fileno())
+
+def compact(retention_days=30, batch_size=500, to_file=None, dry_run=False):
+    """
+    Archive and hard-delete inactive saves last touched before the retention window
+    
+    Each batch is archived and deleted in one transaction, so an
+    interrupted run loses nothing and can simply be started again. With
+    to_file, each batch is written and synced to disk before its delete
+    commits, and a failed write rolls the delete back; an interrupted run
+    may at worst leave a batch in the file twice.
+    
+    Args:
+        retention_days: Keep deleted saves at least this many days
+        batch_size: Saves archived per transaction
+        to_file: JSON lines file to archive into instead of archived_characters
+        dry_run: Only count what would be archived
+    
+    Returns:
+        Number of saves archived (or that would be)
+    """
+    ensure_schema()
+    engine = get_engine()
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    expired = (_characters.c.is_active == False) & (_characters.c.last_saved < cutoff)
+    
+    if dry_run:
+        with engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(_characters).where(expired)).scalar()
+    
+    archived = 0
+    out = _open(to_file, 'a') if to_file else None
+    try:
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    select(_characters).where(expired).order_by(_characters.c.id).limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                
+                _archive_batch(conn, rows, out)
+                ids = [row.id for row in rows]
+                conn.execute(delete(_journal).where(_journal.c.character_id.in_(ids)))
+                conn.execute(delete(_items).where(_items.c.character_id.in_(ids)))
+                conn.execute(delete(_leaderboard).where(_leaderboard.c.character_id.in_(ids)))
+                conn.execute(delete(_characters).where(_characters.c.id.in_(ids)))
+                if out is not None:
+                    _sync(out)
+            archived += len(rows)
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+    return archived
+
+def reclaim_space():
+    """
+    Return freed pages to the filesystem and refresh planner statistics
+    
+    Returns:
+        True if the database supports it, False otherwise
+    """
+    engine = get_engine()
+    dialect = engine.dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        return False
+    
+    # VACUUM cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if dialect == 'sqlite':
+            conn.exec_driver_sql("VACUUM")
+            conn.exec_driver_sql("ANALYZE")
+        else:
+            for table in (_characters, _items, _journal, _archive):
+                conn.exec_driver_sql(f"VACUUM ANALYZE {table.name}")
+    return True
+
+def restore(archive_id):
+    """
+    Bring an archived save back as an active character
+    
+    Args:
+        archive_id: archived_characters id
+    
+    Returns:
+        New saved_characters id, or None if there is no such archive
+        or an active save already uses its name and class
+    """
+    ensure_schema()
+    with get_engine().begin() as conn:
+        archived = conn.execute(select(_archive).where(_archive.c.id == archive_id)).first()
+        if archived is None:
+            return None
+        record = json.loads(zlib.decompress(archived.payload).decode('utf-8'))
+        imported, _ = import_records(conn, [record])
+        if not imported:
+            return None
+        conn.execute(delete(_archive).where(_archive.c.id == archive_id))
+        return conn.execute(
+            select(func.max(_characters.c.id)).where(
+                _characters.c.name == record['name'],
+                _characters.c.character_class == record['character_class'],
+                _characters.c.is_active == True
+            )
+        ).scalar()
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Maintenance tasks for the save database")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    compact_parser = commands.add_parser('compact', help="Archive and remove old deleted saves")
+    compact_parser.add_argument('--retention-days', type=int, default=30,
+                                help="Keep deleted saves at least this many days (default 30)")
+    compact_parser.add_argument('--batch-size', type=int, default=500, help="Saves archived per transaction")
+    compact_parser.add_argument('--to-file', help="Append archived saves to this JSON lines file (.gz to compress) "
+                                                  "instead of the archived_characters table")
+    compact_parser.add_argument('--no-vacuum', action='store_true', help="Skip VACUUM/ANALYZE afterwards")
+    compact_parser.add_argument('--dry-run', action='store_true', help="Only report how many saves would be archived")
+    
+    restore_parser = commands.add_parser('restore', help="Bring an archived save back")
+    restore_parser.add_argument('archive_id', type=int, help="archived_characters id")
+    
+    args = parser.parse_args(argv)
+    if args.command == 'restore':
+        character_id = restore(args.archive_id)
+        if character_id is None:
+            print(f"Could not restore archive {args.archive_id}")
+            return 1
+        print(f"Restored as character {character_id}")
+        return 0
+    
+    if args.dry_run:
+        count = compact(args.retention_days, dry_run=True)
+        print(f"{count} deleted saves are older than {args.retention_days} days")
+        return 0
+    
+    with get_engine().connect() as conn:
+        before = table_counts(conn)
+    archived = compact(args.retention_days, args.batch_size, args.to_file)
+    vacuumed = not args.no_vacuum and archived and reclaim_space()
+    with get_engine().connect() as conn:
+        after = table_counts(conn)
+    
+    print(f"Archived {archived} deleted saves" + (" and reclaimed space" if vacuumed else ""))
+    for table, count in before.items():
+        print(f"  {table}: {count} -> {after[table]} rows")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 import random
 from characters import Character, Villain
+from game_output import say
 
 class Monster(Character):
     """Base class for monsters that can be encountered during hunting"""
@@ -38,7 +39,7 @@ class Monster(Character):
         if self.mana < mana_cost:
             return super().attack(target)  # Fallback to regular attack
             
-        print(f"{self.emoji} {self.name} uses a special attack!")
+        say(f"{self.emoji} {self.name} uses a special attack!")
         self.mana -= mana_cost
         
         # Special attack has higher base damage
@@ -49,7 +50,7 @@ class Monster(Character):
         effective_defense = target.defense
         if target.is_blocking:
             effective_defense *= 2
-            print(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
+            say(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
             
         damage = max(0, attack_value - effective_defense)
         target.hp = max(0, target.hp - damage)
@@ -80,7 +81,7 @@ class Slime(Monster):
         if self.mana < mana_cost:
             return super().attack(target)
             
-        print(f"{self.emoji} {self.name} splits and attacks multiple times!")
+        say(f"{self.emoji} {self.name} splits and attacks multiple times!")
         self.mana -= mana_cost
         
         # Multiple small attacks
@@ -100,7 +101,7 @@ class Slime(Monster):
             target.hp = max(0, target.hp - damage)
             total_damage += damage
             
-            print(f"{self.emoji} Hit {i+1} deals {damage} damage!")
+            say(f"{self.emoji} Hit {i+1} deals {damage} damage!")
             
         return total_damage
 
@@ -129,7 +130,7 @@ class Goblin(Monster):
         if self.mana < mana_cost:
             return super().attack(target)
             
-        print(f"{self.emoji} {self.name} performs a sneaky strike!")
+        say(f"{self.emoji} {self.name} performs a sneaky strike!")
         self.mana -= mana_cost
         
         # Defense reduction
@@ -167,7 +168,7 @@ class Skeleton(Monster):
         reduced_amount = int(amount * 0.75)
         self.hp = max(0, self.hp - reduced_amount)
         if reduced_amount < amount:
-            print(f"{self.emoji} {self.name}'s bones absorb some of the damage!")
+            say(f"{self.emoji} {self.name}'s bones absorb some of the damage!")
         return reduced_amount
         
     def special_attack(self, target):
@@ -180,7 +181,7 @@ class Skeleton(Monster):
         if self.mana < mana_cost:
             return super().attack(target)
             
-        print(f"{self.emoji} {self.name} throws a volley of bones!")
+        say(f"{self.emoji} {self.name} throws a volley of bones!")
         self.mana -= mana_cost
         
         attack_value = int(self.base_attack * 1.5) + random.randint(-2, 12)
@@ -190,7 +191,7 @@ class Skeleton(Monster):
         effective_defense = target.defense
         if target.is_blocking:
             effective_defense *= 2
-            print(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
+            say(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
             
         damage = max(0, attack_value - effective_defense)
         target.hp = max(0, target.hp - damage)
@@ -222,7 +223,7 @@ class Dragon(Monster):
         if self.mana < mana_cost:
             return super().attack(target)
             
-        print(f"{self.emoji} {self.name} unleashes a devastating fire breath! 🔥")
+        say(f"{self.emoji} {self.name} unleashes a devastating fire breath! 🔥")
         self.mana -= mana_cost
         
         # High damage attack that ignores defense
@@ -232,7 +233,7 @@ class Dragon(Monster):
         effective_defense = int(target.defense * 0.5)
         if target.is_blocking:
             effective_defense = target.defense  # Only normal defense when blocking
-            print(f"{target.emoji} {target.name}'s block is partially effective against the flames! 🛡️🔥")
+            say(f"{target.emoji} {target.name}'s block is partially effective against the flames! 🛡️🔥")
             
         damage = max(0, attack_value - effective_defense)
         target.hp = max(0, target.hp - damage)
@@ -256,7 +257,7 @@ class Vampire(Monster):
         lifesteal = int(damage * 0.2)
         if lifesteal > 0:
             self.hp = min(self.max_hp, self.hp + lifesteal)
-            print(f"{self.emoji} {self.name} drains {lifesteal} health! 💉")
+            say(f"{self.emoji} {self.name} drains {lifesteal} health! 💉")
             
         return damage
         
@@ -270,7 +271,7 @@ class Vampire(Monster):
         if self.mana < mana_cost:
             return super().attack(target)
             
-        print(f"{self.emoji} {self.name} performs a powerful blood drain! 💉")
+        say(f"{self.emoji} {self.name} performs a powerful blood drain! 💉")
         self.mana -= mana_cost
         
         attack_value = int(self.base_attack * 1.6) + random.randint(-3, 10)
@@ -280,7 +281,7 @@ class Vampire(Monster):
         effective_defense = target.defense
         if target.is_blocking:
             effective_defense *= 2
-            print(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
+            say(f"{target.emoji} {target.name} blocked and reduced damage! 🛡️")
             
         damage = max(0, attack_value - effective_defense)
         target.hp = max(0, target.hp - damage)
@@ -289,7 +290,7 @@ class Vampire(Monster):
         lifesteal = int(damage * 0.4)
         if lifesteal > 0:
             self.hp = min(self.max_hp, self.hp + lifesteal)
-            print(f"{self.emoji} {self.name} drains {lifesteal} health! 💉")
+            say(f"{self.emoji} {self.name} drains {lifesteal} health! 💉")
             
         return damage
 
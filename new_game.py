@@ -1,63 +1,358 @@
+import io
+import re
+import sys
+import json
 import random
 import time
 import os
+import contextvars
+from contextlib import nullcontext
 from characters import Barbarian, Archer, Mage, DarkKnight, DarkArcher, DarkMage
 from combat import Combat
 from monsters import get_monster_by_level
 from items import Inventory, generate_random_item, HealthPotion, ManaPotion, Shop
-from db_utils import save_character, load_character, get_all_characters, delete_character
+import db_metrics
+from game_output import say, capture
+
+# Menu choices as they are named in DB_METRICS reports
+MAIN_MENU_ACTIONS = {
+    "1": "Hunt Monsters", "2": "Face a Villain", "3": "Challenge Boss", "4": "Manage Inventory",
+    "5": "Visit Shop", "6": "Character Status", "7": "Rest and Recover", "8": "Save Character",
+    "9": "Change Character", "10": "Exit Game",
+}
+CHARACTER_MENU_ACTIONS = {
+    "1": "Create New Character", "2": "Load Saved Character", "3": "Save Current Character",
+    "4": "Delete Saved Character", "5": "Leaderboards", "6": "Return to Title Screen",
+}
+
+# Menus a game can be waiting in, by generator method, as named in --machine frames
+MENU_STATES = {
+    "manage_saved_characters": "character_management", "create_player": "character_creation",
+    "show_leaderboards": "leaderboards", "hunt_monsters": "hunting", "choose_hunting_area": "hunting",
+    "face_boss": "boss", "start_combat": "combat", "manage_inventory": "inventory", "visit_shop": "shop",
+    "show_character_status": "status",
+}
+
+def parse_choice_list(text):
+    """Parse '1,3 4' style menu input into zero-based indices"""
+    return [int(part) - 1 for part in text.replace(",", " ").split()]
+
+def parse_prompt_choices(prompt):
+    """Answers a prompt lists, e.g. '(1-5, or 0 to cancel)' or '(y/n)', None when it takes any text"""
+    if prompt is None:
+        return None
+    if "Press Enter" in prompt:
+        return [""]
+    numbers = re.search(r"\((\d+)-(\d+)", prompt)
+    if numbers:
+        choices = [str(number) for number in range(int(numbers.group(1)), int(numbers.group(2)) + 1)]
+        if "0 to cancel" in prompt:
+            choices.insert(0, "0")
+        return choices
+    letters = re.search(r"\((\w(?:/\w)+)\)", prompt)
+    return letters.group(1).split("/") if letters else None
+
+def character_stats(character, player=False):
+    """A character's stats as plain values, None for no character"""
+    if character is None:
+        return None
+    stats = {
+        'name': character.name,
+        'class': character.__class__.__name__,
+        'level': character.level,
+        'hp': character.hp,
+        'max_hp': character.max_hp,
+        'mana': character.mana,
+        'max_mana': character.max_mana,
+        'attack': character.base_attack,
+        'defense': character.defense,
+        'blocking': character.is_blocking,
+        'dodging': getattr(character, 'is_dodging', False),
+    }
+    if player:
+        stats.update(title=character.class_title, xp=character.xp, xp_to_level=character.xp_to_level,
+                     gold=character.inventory.gold)
+    else:
+        stats['boss'] = getattr(character, 'is_boss', False)
+    return stats
+
+def _wait_for_tickets(tickets):
+    """Block until every save ticket is resolved"""
+    for ticket in tickets:
+        ticket.wait()
+
+
+class DatabaseCall:
+    """A blocking database call a game is waiting on, see Game.call_database"""
+    
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.context = contextvars.copy_context()  # Keeps DB_METRICS counting it under the player's action
+        self.result = None
+        self.error = None
+        self.output = ""  # What the call said for the player
+        
+    def run(self):
+        """Make the call on the current thread, keeping its result or exception for the game"""
+        self.context.run(self._run)
+        
+    def _run(self):
+        buffer = io.StringIO()
+        with capture(buffer):
+            try:
+                self.result = self.func(*self.args)
+            except Exception as e:
+                self.error = e
+        self.output = buffer.getvalue()
+
 
 class Game:
-    """Main game class that manages the RPG game flow with enhanced features"""
+    """
+    Main game class that manages the RPG game flow with enhanced features
+    
+    The menus are generators that yield a prompt wherever they need input,
+    so a game is a plain object driven by step() and needs no thread of
+    its own. play() drives one from the terminal. Database calls are
+    yielded too (see call_database) so a server can make them elsewhere.
+    """
     
-    def __init__(self):
+    def __init__(self, delay=1.0, capture=True, snapshots=False, defer_database=False):
         self.player = None
         self.villain = None
+        self.combat = None  # Combat in progress
+        self.delay = delay  # Seconds of pause between dramatic beats, 0 for none
+        self.capture = capture  # Return printed text from step() instead of printing it
+        self.prompt = None  # Prompt waiting for input, None before the game starts and after it ends
+        self.snapshots = snapshots  # Keep what session_snapshot needs: checkpoints, input since and own random state
+        self.replaying = False  # Being rebuilt from a snapshot, autosaves are skipped
+        self.resume_hunt = None  # (area, difficulty) run() goes straight back to, when restoring a snapshot
+        self.rng_state = None  # This game's random state between steps, when snapshots are on
+        self.checkpoint_state = None  # Last checkpoint(), see session_snapshot
+        self.replay_inputs = None  # Input since that checkpoint, None when it can't be replayed
+        self.next_seed = None  # Seed the next checkpoint uses instead of drawing one, when restoring
+        self.defer_database = defer_database  # Stop at database calls instead of making them, see step()
+        self.database_call = None  # DatabaseCall the game is stopped at
+        self._held_output = ""  # Text from before database_call, returned when the step finishes
+        self.save_tickets = []  # Saves this game queued, see wait_for_saves
+        self._steps = None
+        
+    def pause(self):
+        """Wait between dramatic beats"""
+        if self.delay:
+            time.sleep(self.delay)
+            
+    def step(self, command=None):
+        """
+        Feed the game one line of input and run it until it needs the next
+        
+        The first call starts the game and ignores command.
+        
+        With defer_database on, a step that reaches a database call stops
+        there with database_call set, returning no events and a None
+        prompt. Call database_call.run() on any thread, then step() again,
+        without a command, to carry on. The text is all returned once the
+        step reaches its prompt.
+        
+        Args:
+            command: The player's input for the current prompt
+            
+        Returns:
+            (events, prompt): events is a list of {'type': 'output', 'text': ...}
+            dicts with whatever the game printed, empty when capture is off.
+            prompt is the text asking for the next input, None once the game is over
+        """
+        buffer = io.StringIO()
+        if self.snapshots and self.rng_state is not None:
+            random.setstate(self.rng_state)  # Games sharing a process each keep their own
+        with capture(buffer) if self.capture else nullcontext():
+            try:
+                if self._steps is None:
+                    self._steps = self.run()
+                    self.prompt = self._advance(next(self._steps))
+                elif self.database_call is not None:
+                    call, self.database_call = self.database_call, None
+                    self.prompt = self._advance(self._finish_call(call))
+                elif self.prompt is not None:
+                    command = '' if command is None else str(command)
+                    if self.replay_inputs is not None:
+                        self.replay_inputs.append(command)
+                    self.prompt = self._advance(self._steps.send(command))
+            except StopIteration:
+                self.prompt = None
+        if self.snapshots:
+            self.rng_state = random.getstate()
+                
+        text = self._held_output + buffer.getvalue()
+        if self.database_call is not None:
+            self._held_output = text
+            return [], None
+        self._held_output = ""
+        return ([{'type': 'output', 'text': text}] if text else []), self.prompt
+        
+    def _advance(self, value):
+        """Carry a step on through the database calls it yields, returns the prompt it stops at"""
+        while isinstance(value, DatabaseCall):
+            if self.defer_database:
+                self.database_call = value
+                return None
+            value.run()
+            value = self._finish_call(value)
+        return value
+        
+    def _finish_call(self, call):
+        """Hand a finished database call's result back to the game, returns what it yields next"""
+        say(call.output, end='')
+        if call.error is not None:
+            return self._steps.throw(call.error)
+        return self._steps.send(call.result)
+        
+    def call_database(self, func, *args):
+        """Make a blocking database call, returns its result; use with yield from"""
+        return (yield DatabaseCall(func, args))
+        
+    def queue_save(self, overwrite):
+        """Queue a save of the current character, returns its ticket"""
+        from save_queue import get_save_queue
+        ticket = get_save_queue().submit(self.player, overwrite)
+        self.save_tickets = [pending for pending in self.save_tickets if not pending.done()] + [ticket]
+        return ticket
+        
+    def wait_for_saves(self):
+        """Wait until the saves this game queued are written, not everyone else's; use with yield from"""
+        self.save_tickets = [ticket for ticket in self.save_tickets if not ticket.done()]
+        if self.save_tickets:
+            yield from self.call_database(_wait_for_tickets, list(self.save_tickets))
+            
+    def play(self):
+        """Run the game in the terminal"""
+        self.capture = False
+        _, prompt = self.step()
+        while prompt is not None:
+            _, prompt = self.step(input(prompt))
+            
+    def play_machine(self, stdin=None, stdout=None):
+        """
+        Run the game for a front end: one JSON frame per line out, one line of input per frame in
+        
+        See frame() for what each frame holds. The last frame has a null prompt.
+        """
+        stdin = stdin or sys.stdin
+        stdout = stdout or sys.stdout
+        self.capture = True
+        events, prompt = self.step()
+        while True:
+            stdout.write(json.dumps(self.frame(events)) + "\n")
+            stdout.flush()
+            if prompt is None:
+                break
+            line = stdin.readline()
+            if not line:
+                break
+            events, prompt = self.step(line.rstrip("\r\n"))
+            
+    def checkpoint(self, position, *args):
+        """
+        Mark a point session_snapshot can rebuild the game from by replaying the input since
+        
+        Reseeds the random numbers so the snapshot only needs the seed.
+        
+        Args:
+            position: 'main_menu', 'hunting' (args are the area and difficulty), or None
+                when what follows reads or writes saves and can't be replayed
+        """
+        if not self.snapshots:
+            return
+        from session_snapshot import character_state
+        seed, self.next_seed = self.next_seed, None
+        if seed is None:
+            seed = random.getrandbits(64)
+        random.seed(seed)
+        self.checkpoint_state = {
+            'position': position,
+            'args': list(args),
+            'seed': seed,
+            'player': character_state(self.player) if position else None,
+        }
+        self.replay_inputs = [] if position else None
+        
+    def menu_state(self):
+        """Name of the innermost menu waiting for input, see MENU_STATES"""
+        if self.prompt is None:
+            return "title" if self._steps is None else "game_over"
+        state = "main_menu"
+        steps = self._steps
+        while steps is not None:
+            state = MENU_STATES.get(steps.gi_code.co_name, state)
+            steps = steps.gi_yieldfrom
+        return state
+        
+    def frame(self, events):
+        """
+        The game after a step, as a dict for machine-readable output
+        
+        Args:
+            events: Events returned by step()
+        
+        Returns:
+            {'state', 'player', 'enemy', 'prompt', 'choices', 'log'}: state is
+            menu_state(), player and enemy are character_stats() dicts or None,
+            choices lists the answers the prompt accepts (None for free text)
+            and log is the text printed during the step
+        """
+        return {
+            'state': self.menu_state(),
+            'player': character_stats(self.player, player=True),
+            'enemy': character_stats(self.combat.villain) if self.combat else None,
+            'prompt': self.prompt,
+            'choices': parse_prompt_choices(self.prompt),
+            'log': "".join(event['text'] for event in events),
+        }
         
     def display_intro(self):
         """Display game introduction"""
-        print("\n" + "="*60)
-        print("🎮  WELCOME TO THE ENHANCED RPG ADVENTURE  🎮")
-        print("="*60)
-        print("Embark on an epic journey as a brave adventurer!")
-        print("Face dangerous monsters, collect items, and become stronger.")
-        print("-"*60)
-        print("• Hunt monsters to gain XP and items")
-        print("• Use your inventory to equip gear and use potions")
-        print("• Level up to become more powerful")
-        print("• Face boss monsters for rare rewards")
-        print("="*60 + "\n")
+        say("\n" + "="*60)
+        say("🎮  WELCOME TO THE ENHANCED RPG ADVENTURE  🎮")
+        say("="*60)
+        say("Embark on an epic journey as a brave adventurer!")
+        say("Face dangerous monsters, collect items, and become stronger.")
+        say("-"*60)
+        say("• Hunt monsters to gain XP and items")
+        say("• Use your inventory to equip gear and use potions")
+        say("• Level up to become more powerful")
+        say("• Face boss monsters for rare rewards")
+        say("="*60 + "\n")
         
     def create_player(self):
         """Let the player choose their character class"""
-        print("Choose your character class:")
-        print("1. Barbarian 🪓 - High HP and attack, but low defense and mana")
-        print("   Special: Rage Attack - Powerful but costly attack")
-        print()
-        print("2. Archer 🏹 - Balanced stats with consistent damage")
-        print("   Special: Precision Shot - Can sometimes ignore target's defense")
-        print()
-        print("3. Mage 🧙 - High mana and special attack, but low HP and defense")
-        print("   Special: Fireball - High damage spell")
-        print("   Unique: Healing spell to restore HP")
+        say("Choose your character class:")
+        say("1. Barbarian 🪓 - High HP and attack, but low defense and mana")
+        say("   Special: Rage Attack - Powerful but costly attack")
+        say()
+        say("2. Archer 🏹 - Balanced stats with consistent damage")
+        say("   Special: Precision Shot - Can sometimes ignore target's defense")
+        say()
+        say("3. Mage 🧙 - High mana and special attack, but low HP and defense")
+        say("   Special: Fireball - High damage spell")
+        say("   Unique: Healing spell to restore HP")
         
         while True:
-            choice = input("\nEnter your choice (1-3): ")
+            choice = (yield "\nEnter your choice (1-3): ")
             
             if choice == "1":
-                name = input("Enter your Barbarian's name: ")
+                name = (yield "Enter your Barbarian's name: ")
                 self.player = Barbarian(name)
                 break
             elif choice == "2":
-                name = input("Enter your Archer's name: ")
+                name = (yield "Enter your Archer's name: ")
                 self.player = Archer(name)
                 break
             elif choice == "3":
-                name = input("Enter your Mage's name: ")
+                name = (yield "Enter your Mage's name: ")
                 self.player = Mage(name)
                 break
             else:
-                print("Invalid choice. Please try again.")
+                say("Invalid choice. Please try again.")
                 
         # Character already has inventory initialized in the Character class
         # Just add starter items
@@ -65,9 +360,9 @@ class Game:
         self.player.inventory.add_item(ManaPotion("small"))
         self.player.inventory.gold = 50
         
-        print(f"\nWelcome, {self.player.emoji} {self.player.name} the {self.player.__class__.__name__}!")
-        print(self.player.status())
-        print("You've received some starter items and 50 gold coins.")
+        say(f"\nWelcome, {self.player.emoji} {self.player.name} the {self.player.__class__.__name__}!")
+        say(self.player.status())
+        say("You've received some starter items and 50 gold coins.")
         
     def create_villain(self):
         """Create a random villain for the player to face"""
@@ -94,27 +389,29 @@ class Game:
         
         # Map villain class to player class for more interesting combat
         if villain_class == DarkKnight and isinstance(self.player, Barbarian):
-            print(f"\nA dark warrior approaches, drawn to your battle prowess...")
+            say(f"\nA dark warrior approaches, drawn to your battle prowess...")
         elif villain_class == DarkArcher and isinstance(self.player, Archer):
-            print(f"\nA shadowy figure with a bow steps out, challenging your archery...")
+            say(f"\nA shadowy figure with a bow steps out, challenging your archery...")
         elif villain_class == DarkMage and isinstance(self.player, Mage):
-            print(f"\nA corrupted spellcaster seeks to test their dark magic against yours...")
+            say(f"\nA corrupted spellcaster seeks to test their dark magic against yours...")
         else:
-            print(f"\nA fearsome enemy appears before you...")
+            say(f"\nA fearsome enemy appears before you...")
             
-        time.sleep(1)
-        print(f"You face {self.villain.emoji} {self.villain.name} the {self.villain.__class__.__name__}!")
-        print(self.villain.status())
+        self.pause()
+        say(f"You face {self.villain.emoji} {self.villain.name} the {self.villain.__class__.__name__}!")
+        say(self.villain.status())
         
     def start_combat(self, monster=None):
         """Begin combat between player and opponent (villain or monster)"""
         opponent = monster if monster else self.villain
-        combat = Combat(self.player, opponent)
+        combat = Combat(self.player, opponent, self.delay)
+        self.combat = combat
         combat.start_combat()
         
         combat_ended = False
         while not combat_ended:
-            combat_ended = combat.execute_turn()
+            combat_ended = yield from combat.execute_turn()
+        self.combat = None
             
         victory = self.player.is_alive()
         
@@ -129,75 +426,36 @@ class Game:
             
             # Add gold
             self.player.inventory.gold += monster.gold_reward
-            print(f"💰 You received {monster.gold_reward} gold!")
+            say(f"💰 You received {monster.gold_reward} gold!")
             
             # Chance to get item drops
             if random.random() < 0.6 or monster.is_boss:  # 60% chance, always for bosses
                 item = generate_random_item(self.player.level, monster.is_boss)
                 if self.player.inventory.add_item(item):
-                    print(f"🎁 You found {item.emoji} {item.name}!")
+                    say(f"🎁 You found {item.emoji} {item.name}!")
                 else:
-                    print("🎒 Your inventory is full! You couldn't pick up the item.")
+                    say("🎒 Your inventory is full! You couldn't pick up the item.")
+                    
+        if victory:
+            yield from self.autosave()
         
         return victory
         
-    def hunt_monsters(self):
-        """Hunt for monsters to gain XP and items"""
-        print("\n" + "="*50)
-        print("🏕️  HUNTING GROUNDS  🏕️")
-        print("="*50)
-        
-        # Offer different hunting areas based on player level
-        print("Choose a hunting area:")
-        
-        hunting_areas = []
-        
-        # Always available
-        hunting_areas.append(("Forest Outskirts", "Easy monsters for beginners", 1))
-        
-        # Unlock at level 3
-        if self.player.level >= 3:
-            hunting_areas.append(("Deep Woods", "Moderate challenge with better rewards", 3))
-            
-        # Unlock at level 5
-        if self.player.level >= 5:
-            hunting_areas.append(("Ancient Ruins", "Difficult monsters with good rewards", 5))
-            
-        # Unlock at level 8
-        if self.player.level >= 8:
-            hunting_areas.append(("Dark Caverns", "Very challenging with excellent rewards", 8))
-            
-        # Special boss area
-        if self.player.level >= 5:
-            hunting_areas.append(("Dragon's Lair", "⚠️ BOSS FIGHT - Extremely Difficult ⚠️", 10))
-        
-        for i, (area, desc, _) in enumerate(hunting_areas, 1):
-            print(f"{i}. {area} - {desc}")
-            
-        print(f"0. Return to Main Menu")
-        
-        while True:
-            choice = input("\nEnter your choice: ")
-            
-            try:
-                choice_idx = int(choice)
-                if choice_idx == 0:
-                    return
-                    
-                if 1 <= choice_idx <= len(hunting_areas):
-                    area_name, _, difficulty = hunting_areas[choice_idx - 1]
-                    break
-                else:
-                    print("Invalid choice. Try again.")
-            except ValueError:
-                print("Please enter a number.")
+    def hunt_monsters(self, area=None):
+        """Hunt for monsters to gain XP and items, in area (name, difficulty) if given instead of asking"""
+        if area is None:
+            area = yield from self.choose_hunting_area()
+            if area is None:
+                return
+        area_name, difficulty = area
         
         # Now enter a continuous hunting loop until player decides to return home
         continue_hunting = True
         
         while continue_hunting and self.player.is_alive():
-            print(f"\nYou venture deeper into the {area_name}...")
-            time.sleep(1)
+            self.checkpoint('hunting', area_name, difficulty)
+            say(f"\nYou venture deeper into the {area_name}...")
+            self.pause()
             
             # Force boss for Dragon's Lair
             force_boss = (area_name == "Dragon's Lair")
@@ -205,13 +463,13 @@ class Game:
             # Generate appropriate monster
             monster = get_monster_by_level(difficulty, force_boss)
             
-            print(f"You encounter {monster.emoji} {monster.name}!")
+            say(f"You encounter {monster.emoji} {monster.name}!")
             
             # Ask if player wants to fight or run
             while True:
-                action = input("\nDo you want to (f)ight, (r)un, or return (g)o home? (f/r/g): ").lower()
+                action = (yield "\nDo you want to (f)ight, (r)un, or return (g)o home? (f/r/g): ").lower()
                 if action == 'f':
-                    victory = self.start_combat(monster)
+                    victory = yield from self.start_combat(monster)
                     
                     # If player died in combat, exit the hunting loop
                     if not victory:
@@ -221,10 +479,10 @@ class Game:
                 elif action == 'r':
                     escape_chance = 0.7  # 70% chance to escape
                     if random.random() < escape_chance:
-                        print("You managed to escape!")
+                        say("You managed to escape!")
                     else:
-                        print("You couldn't escape! The monster attacks!")
-                        victory = self.start_combat(monster)
+                        say("You couldn't escape! The monster attacks!")
+                        victory = yield from self.start_combat(monster)
                         
                         # If player died in combat, exit the hunting loop
                         if not victory:
@@ -232,67 +490,120 @@ class Game:
                     
                     break
                 elif action == 'g':
-                    print("You decide to head back to safety.")
+                    say("You decide to head back to safety.")
                     continue_hunting = False
                     break
                 else:
-                    print("Invalid choice. Enter 'f' to fight, 'r' to run, or 'g' to go home.")
+                    say("Invalid choice. Enter 'f' to fight, 'r' to run, or 'g' to go home.")
             
             # Show post-combat options if player is still hunting
             if continue_hunting and self.player.is_alive():
-                input("\nPress Enter to continue hunting...")
+                yield "\nPress Enter to continue hunting..."
         
         # Final return to main menu
         if self.player.is_alive():
-            input("\nPress Enter to return to main menu...")
+            yield "\nPress Enter to return to main menu..."
+            
+    def choose_hunting_area(self):
+        """Ask where to hunt, returns (area name, difficulty) or None to go back"""
+        say("\n" + "="*50)
+        say("🏕️  HUNTING GROUNDS  🏕️")
+        say("="*50)
+        
+        # Offer different hunting areas based on player level
+        say("Choose a hunting area:")
+        
+        hunting_areas = []
+        
+        # Always available
+        hunting_areas.append(("Forest Outskirts", "Easy monsters for beginners", 1))
+        
+        # Unlock at level 3
+        if self.player.level >= 3:
+            hunting_areas.append(("Deep Woods", "Moderate challenge with better rewards", 3))
+            
+        # Unlock at level 5
+        if self.player.level >= 5:
+            hunting_areas.append(("Ancient Ruins", "Difficult monsters with good rewards", 5))
+            
+        # Unlock at level 8
+        if self.player.level >= 8:
+            hunting_areas.append(("Dark Caverns", "Very challenging with excellent rewards", 8))
+            
+        # Special boss area
+        if self.player.level >= 5:
+            hunting_areas.append(("Dragon's Lair", "⚠️ BOSS FIGHT - Extremely Difficult ⚠️", 10))
+        
+        for i, (area, desc, _) in enumerate(hunting_areas, 1):
+            say(f"{i}. {area} - {desc}")
+            
+        say(f"0. Return to Main Menu")
+        
+        while True:
+            choice = (yield f"\nEnter your choice (1-{len(hunting_areas)}, or 0 to cancel): ")
+            
+            try:
+                choice_idx = int(choice)
+                if choice_idx == 0:
+                    return
+                    
+                if 1 <= choice_idx <= len(hunting_areas):
+                    area_name, _, difficulty = hunting_areas[choice_idx - 1]
+                    break
+                else:
+                    say("Invalid choice. Try again.")
+            except ValueError:
+                say("Please enter a number.")
+        
+        return area_name, difficulty
                 
     def manage_inventory(self):
         """Manage player's inventory, equipment, and items"""
         while True:
-            print("\n" + "="*50)
-            print("🎒  INVENTORY MANAGEMENT  🎒")
-            print("="*50)
+            say("\n" + "="*50)
+            say("🎒  INVENTORY MANAGEMENT  🎒")
+            say("="*50)
             
             # Display gold
-            print(f"💰 Gold: {self.player.inventory.gold}")
+            say(f"💰 Gold: {self.player.inventory.gold}")
             
             # Display current equipment if any
-            print("\nEquipped Items:")
+            say("\nEquipped Items:")
             if hasattr(self.player, 'equipment') and self.player.equipment:
                 for slot, item in self.player.equipment.items():
-                    print(f"{slot.capitalize()}: {item.emoji} {item.name} ({item.description})")
+                    say(f"{slot.capitalize()}: {item.emoji} {item.name} ({item.description})")
             else:
-                print("No items equipped.")
+                say("No items equipped.")
                 
             # Inventory menu options
-            print("\nInventory Options:")
-            print("1. View All Items")
-            print("2. Use Item")
-            print("3. Equip Item")
-            print("4. Unequip Item")
-            print("5. Return to Main Menu")
+            say("\nInventory Options:")
+            say("1. View All Items")
+            say("2. Use Item")
+            say("3. Equip Item")
+            say("4. Unequip Item")
+            say("5. Return to Main Menu")
             
-            choice = input("\nEnter your choice (1-5): ")
+            choice = (yield "\nEnter your choice (1-5): ")
             
             if choice == "1":  # View items
                 if not self.player.inventory.items:
-                    print("Your inventory is empty.")
+                    say("Your inventory is empty.")
                 else:
-                    print("\nInventory Items:")
+                    say("\nInventory Items:")
                     self.player.inventory.display()
                     
             elif choice == "2":  # Use item
                 consumables = self.player.inventory.get_consumables()
                 if not consumables:
-                    print("You don't have any usable items.")
+                    say("You don't have any usable items.")
                     continue
                     
-                print("\nChoose an item to use:")
+                say("\nChoose an item to use:")
                 for i, item in enumerate(consumables, 1):
-                    print(f"{i}. {item}")
+                    say(f"{i}. {item}")
                     
                 try:
-                    item_choice = input(f"Enter your choice (1-{len(consumables)}, or 0 to cancel): ")
+                    item_choice = (yield f"Enter your choice (1-{len(consumables)}, or 0 to cancel): ")
                     if item_choice == "0":
                         continue
                         
@@ -302,22 +613,22 @@ class Game:
                         if item.use(self.player):
                             self.player.inventory.remove_item(item)
                     else:
-                        print("Invalid choice.")
+                        say("Invalid choice.")
                 except ValueError:
-                    print("Please enter a number.")
+                    say("Please enter a number.")
                     
             elif choice == "3":  # Equip item
                 equipment = self.player.inventory.get_equipment()
                 if not equipment:
-                    print("You don't have any equipment to equip.")
+                    say("You don't have any equipment to equip.")
                     continue
                     
-                print("\nChoose an item to equip:")
+                say("\nChoose an item to equip:")
                 for i, item in enumerate(equipment, 1):
-                    print(f"{i}. {item}")
+                    say(f"{i}. {item}")
                     
                 try:
-                    equip_choice = input(f"Enter your choice (1-{len(equipment)}, or 0 to cancel): ")
+                    equip_choice = (yield f"Enter your choice (1-{len(equipment)}, or 0 to cancel): ")
                     if equip_choice == "0":
                         continue
                         
@@ -326,22 +637,22 @@ class Game:
                         item = equipment[equip_idx]
                         item.equip(self.player)
                     else:
-                        print("Invalid choice.")
+                        say("Invalid choice.")
                 except ValueError:
-                    print("Please enter a number.")
+                    say("Please enter a number.")
                     
             elif choice == "4":  # Unequip item
                 if not hasattr(self.player, 'equipment') or not self.player.equipment:
-                    print("You don't have any equipment to unequip.")
+                    say("You don't have any equipment to unequip.")
                     continue
                     
-                print("\nChoose an item to unequip:")
+                say("\nChoose an item to unequip:")
                 equipment_list = list(self.player.equipment.values())
                 for i, item in enumerate(equipment_list, 1):
-                    print(f"{i}. {item.emoji} {item.name} ({item.slot})")
+                    say(f"{i}. {item.emoji} {item.name} ({item.slot})")
                     
                 try:
-                    unequip_choice = input(f"Enter your choice (1-{len(equipment_list)}, or 0 to cancel): ")
+                    unequip_choice = (yield f"Enter your choice (1-{len(equipment_list)}, or 0 to cancel): ")
                     if unequip_choice == "0":
                         continue
                         
@@ -351,93 +662,94 @@ class Game:
                         item.unequip(self.player)
                         self.player.inventory.add_item(item)
                     else:
-                        print("Invalid choice.")
+                        say("Invalid choice.")
                 except ValueError:
-                    print("Please enter a number.")
+                    say("Please enter a number.")
                     
             elif choice == "5":  # Return to main menu
                 break
                 
     def show_character_status(self):
         """Display detailed character status"""
-        print("\n" + "="*50)
-        print(f"👤  CHARACTER PROFILE: {self.player.emoji} {self.player.name}  👤")
-        print("="*50)
+        say("\n" + "="*50)
+        say(f"👤  CHARACTER PROFILE: {self.player.emoji} {self.player.name}  👤")
+        say("="*50)
         
         # Basic stats
-        print(f"Class: {self.player.__class__.__name__}")
-        print(f"Level: {self.player.level}")
-        print(f"XP: {self.player.xp}/{self.player.xp_to_level}")
-        print(f"HP: {self.player.hp}/{self.player.max_hp} ❤️")
-        print(f"Mana: {self.player.mana}/{self.player.max_mana} 🔮")
-        print(f"Attack: {self.player.base_attack} ⚔️")
-        print(f"Defense: {self.player.defense} 🛡️")
-        print(f"Luck: {self.player.luck} ⭐")
+        say(f"Class: {self.player.__class__.__name__}")
+        say(f"Level: {self.player.level}")
+        say(f"XP: {self.player.xp}/{self.player.xp_to_level}")
+        say(f"HP: {self.player.hp}/{self.player.max_hp} ❤️")
+        say(f"Mana: {self.player.mana}/{self.player.max_mana} 🔮")
+        say(f"Attack: {self.player.base_attack} ⚔️")
+        say(f"Defense: {self.player.defense} 🛡️")
+        say(f"Luck: {self.player.luck} ⭐")
         
         # Equipment
-        print("\nEquipment:")
+        say("\nEquipment:")
         if hasattr(self.player, 'equipment') and self.player.equipment:
             for slot, item in self.player.equipment.items():
-                print(f"  {slot.capitalize()}: {item.emoji} {item.name}")
+                say(f"  {slot.capitalize()}: {item.emoji} {item.name}")
         else:
-            print("  No equipment")
+            say("  No equipment")
             
         # Inventory summary
-        print("\nInventory:")
-        print(f"  Gold: {self.player.inventory.gold} 💰")
-        print(f"  Items: {len(self.player.inventory.items)}/{self.player.inventory.max_size}")
+        say("\nInventory:")
+        say(f"  Gold: {self.player.inventory.gold} 💰")
+        say(f"  Items: {len(self.player.inventory.items)}/{self.player.inventory.max_size}")
         
-        input("\nPress Enter to continue...")
+        yield "\nPress Enter to continue..."
         
     def face_boss(self):
         """Face a challenging boss appropriate for player's level"""
-        print("\n" + "="*50)
-        print("⚠️  BOSS CHALLENGE  ⚠️")
-        print("="*50)
+        say("\n" + "="*50)
+        say("⚠️  BOSS CHALLENGE  ⚠️")
+        say("="*50)
         
-        print("You've decided to face a powerful boss!")
-        print("These challenging enemies drop better rewards but are much stronger.")
-        print("Make sure you're prepared before continuing.")
+        say("You've decided to face a powerful boss!")
+        say("These challenging enemies drop better rewards but are much stronger.")
+        say("Make sure you're prepared before continuing.")
         
-        proceed = input("\nDo you want to proceed? (y/n): ").lower()
+        proceed = (yield "\nDo you want to proceed? (y/n): ").lower()
         if proceed != 'y':
             return
             
         # Create a boss based on player level
         boss = get_monster_by_level(self.player.level, True)
         
-        print(f"\nYou approach {boss.emoji} {boss.name}...")
-        time.sleep(1)
-        print(f"The powerful {boss.emoji} {boss.name} stands before you!")
-        print(boss.status())
+        say(f"\nYou approach {boss.emoji} {boss.name}...")
+        self.pause()
+        say(f"The powerful {boss.emoji} {boss.name} stands before you!")
+        say(boss.status())
         
-        proceed = input("\nDo you still want to fight? (y/n): ").lower()
+        proceed = (yield "\nDo you still want to fight? (y/n): ").lower()
         if proceed != 'y':
-            print("You decide to retreat and prepare more...")
+            say("You decide to retreat and prepare more...")
             return
             
         # Start boss combat
-        victory = self.start_combat(boss)
+        victory = yield from self.start_combat(boss)
         
         if victory:
             # Extra rewards for boss victory
             extra_gold = random.randint(50, 100) * self.player.level
             self.player.inventory.gold += extra_gold
-            print(f"💰 You found an additional {extra_gold} gold!")
+            say(f"💰 You found an additional {extra_gold} gold!")
             
             # Guaranteed rare item
             rare_item = generate_random_item(self.player.level + 2, True)
             if self.player.inventory.add_item(rare_item):
-                print(f"🎁 You found a rare item: {rare_item.emoji} {rare_item.name}!")
+                say(f"🎁 You found a rare item: {rare_item.emoji} {rare_item.name}!")
             else:
-                print("🎒 Your inventory is full! You couldn't pick up the rare item.")
+                say("🎒 Your inventory is full! You couldn't pick up the rare item.")
                 
             # Increase player's luck after defeating a boss
             luck_gain = random.randint(2, 5)
             self.player.luck += luck_gain
-            print(f"⭐ Your fortune increases! (+{luck_gain} Luck)")
+            say(f"⭐ Your fortune increases! (+{luck_gain} Luck)")
+            yield from self.autosave()
                 
-        input("\nPress Enter to continue...")
+        yield "\nPress Enter to continue..."
         
     def visit_shop(self):
         """Visit the shop to buy and sell items"""
@@ -448,20 +760,21 @@ class Game:
         
         shop = Shop(level=self.player.level, luck=luck)
         
-        print("\n" + "="*60)
-        print("🛒  MERCHANT'S SHOP  🛒")
-        print("="*60)
-        print(f"Welcome, {self.player.emoji} {self.player.name}! What would you like to do?")
-        print(f"You have {self.player.inventory.gold} gold coins. 💰")
+        say("\n" + "="*60)
+        say("🛒  MERCHANT'S SHOP  🛒")
+        say("="*60)
+        say(f"Welcome, {self.player.emoji} {self.player.name}! What would you like to do?")
+        say(f"You have {self.player.inventory.gold} gold coins. 💰")
         
         while True:
-            print("\nShop Options:")
-            print("1. Browse Items")
-            print("2. Sell Items")
-            print("3. Refresh Shop Inventory (costs 20 gold)")
-            print("4. Return to Main Menu")
+            say("\nShop Options:")
+            say("1. Browse Items")
+            say("2. Sell Items")
+            say("3. Sell Junk")
+            say("4. Refresh Shop Inventory (costs 20 gold)")
+            say("5. Return to Main Menu")
             
-            choice = input("\nEnter your choice (1-4): ")
+            choice = (yield "\nEnter your choice (1-5): ")
             
             if choice == "1":  # Browse/buy items
                 shop.display()
@@ -469,157 +782,282 @@ class Game:
                 if not shop.inventory:
                     continue
                     
-                buy_choice = input(f"Enter item number to buy (1-{len(shop.inventory)}, or 0 to cancel): ")
+                buy_choice = (yield f"Enter item number(s) to buy (1-{len(shop.inventory)}, e.g. 1,3, or 0 to cancel): ")
                 try:
-                    buy_idx = int(buy_choice) - 1
-                    if buy_idx == -1:  # Cancel
+                    buy_idxs = parse_choice_list(buy_choice)
+                    if buy_idxs == [-1]:  # Cancel
                         continue
                         
-                    if 0 <= buy_idx < len(shop.inventory):
-                        shop.buy_item(self.player, buy_idx)
+                    if buy_idxs and all(0 <= idx < len(shop.inventory) for idx in buy_idxs):
+                        if len(buy_idxs) == 1:
+                            shop.buy_item(self.player, buy_idxs[0])
+                        else:
+                            shop.buy_items(self.player, buy_idxs)
                     else:
-                        print("Invalid selection.")
+                        say("Invalid selection.")
                 except ValueError:
-                    print("Please enter a number.")
+                    say("Please enter a number.")
                     
             elif choice == "2":  # Sell items
                 if not self.player.inventory.items:
-                    print("You don't have any items to sell!")
+                    say("You don't have any items to sell!")
                     continue
                     
-                print("\nYour Inventory:")
+                say("\nYour Inventory:")
                 for i, item in enumerate(self.player.inventory.items, 1):
                     sell_value = max(1, item.value // 2)
-                    print(f"{i}. {item.emoji if hasattr(item, 'emoji') else '📦'} {item.name} - Sell value: {sell_value} gold")
+                    say(f"{i}. {item.emoji if hasattr(item, 'emoji') else '📦'} {item.name} - Sell value: {sell_value} gold")
                     
-                sell_choice = input(f"Enter item number to sell (1-{len(self.player.inventory.items)}, or 0 to cancel): ")
+                sell_choice = (yield f"Enter item number(s) to sell (1-{len(self.player.inventory.items)}, e.g. 1,3, or 0 to cancel): ")
                 try:
-                    sell_idx = int(sell_choice) - 1
-                    if sell_idx == -1:  # Cancel
+                    sell_idxs = parse_choice_list(sell_choice)
+                    if sell_idxs == [-1]:  # Cancel
                         continue
                         
-                    if 0 <= sell_idx < len(self.player.inventory.items):
-                        shop.sell_item(self.player, sell_idx)
+                    items = self.player.inventory.items
+                    if sell_idxs and all(0 <= idx < len(items) for idx in sell_idxs):
+                        if len(sell_idxs) == 1:
+                            shop.sell_item(self.player, sell_idxs[0])
+                        else:
+                            shop.sell_items(self.player, [items[idx] for idx in sell_idxs])
                     else:
-                        print("Invalid selection.")
+                        say("Invalid selection.")
                 except ValueError:
-                    print("Please enter a number.")
+                    say("Please enter a number.")
+                    
+            elif choice == "3":  # Sell junk
+                if not self.player.inventory.items:
+                    say("You don't have any items to sell!")
+                    continue
                     
-            elif choice == "3":  # Refresh inventory
+                say("\nSell all items that are:")
+                say("1. Worth less than a gold value")
+                say("2. Common gear")
+                say("3. Gear no better than what you have equipped")
+                say("0. Cancel")
+                
+                junk_choice = (yield "Enter your choice (0-3): ")
+                if junk_choice == "1":
+                    try:
+                        max_value = int((yield "Sell items worth less than how much gold? "))
+                    except ValueError:
+                        say("Please enter a number.")
+                        continue
+                    shop.sell_junk(self.player, max_value=max_value)
+                elif junk_choice == "2":
+                    shop.sell_junk(self.player, common_only=True)
+                elif junk_choice == "3":
+                    shop.sell_junk(self.player, not_better_than_equipped=True)
+                elif junk_choice != "0":
+                    say("Invalid choice.")
+                    
+            elif choice == "4":  # Refresh inventory
                 refresh_cost = 20
                 if self.player.inventory.gold < refresh_cost:
-                    print(f"You don't have enough gold! Need {refresh_cost} gold.")
+                    say(f"You don't have enough gold! Need {refresh_cost} gold.")
                     continue
                     
-                confirm = input(f"Refresh the shop inventory for {refresh_cost} gold? (y/n): ").lower()
+                confirm = (yield f"Refresh the shop inventory for {refresh_cost} gold? (y/n): ").lower()
                 if confirm == 'y':
                     self.player.inventory.gold -= refresh_cost
                     shop.refresh()
-                    print("The merchant brings out new items!")
+                    say("The merchant brings out new items!")
                     
-            elif choice == "4":  # Return to main menu
+            elif choice == "5":  # Return to main menu
                 break
                 
             else:
-                print("Invalid choice. Please try again.")
+                say("Invalid choice. Please try again.")
+        
+    def save_player(self, overwrite, wait=False):
+        """Queue a save of the current character, optionally waiting until it is written"""
+        self.checkpoint(None)
+        yield from self.wait_for_saves()  # A save still on its way may turn out to conflict
+        if self.player.save_conflict is not None:
+            yield from self.resolve_save_conflict()
+            return None
+        ticket = self.queue_save(overwrite)
+        
+        if not wait:
+            say(f"💾 Saving {self.player.name} in the background...")
+            return ticket
+            
+        yield from self.wait_for_saves()
+        if ticket.succeeded():
+            say(f"Character {self.player.name} saved successfully!")
+        elif ticket.conflict is None:
+            say("Failed to save character.")
+        return ticket
+        
+    def resolve_save_conflict(self):
+        """Let the player choose between this game's progress and a save written elsewhere"""
+        from db_utils import save_character, keep_mine, SaveConflictError
+        say(f"\n⚠️ {self.player.name} was saved by another game since you loaded it here.")
+        choice = (yield "Overwrite that save with your progress here? (y/n): ").lower()
+        if choice != 'y':
+            say("The other save was kept. Load it from Character Management to continue from there.")
+            return False
+            
+        try:
+            saved = yield from self.call_database(save_character, self.player, True, keep_mine)
+        except SaveConflictError:
+            saved = None  # Still being written elsewhere
+        if saved:
+            say(f"Character {self.player.name} saved successfully!")
+            return True
+        say("Failed to save character.")
+        return False
+        
+    def confirm_overwrite(self):
+        """Ask before replacing an existing save, returns the overwrite flag or None to cancel"""
+        self.checkpoint(None)
+        from db_utils import character_exists
+        yield from self.wait_for_saves()  # Earlier saves may still be on their way
+        
+        exists = yield from self.call_database(character_exists, self.player.name, self.player.__class__.__name__)
+        if not exists:
+            return False
+            
+        confirm = (yield "A character with this name already exists. Overwrite? (y/n): ").lower()
+        return True if confirm == 'y' else None
+        
+    def autosave(self):
+        """Journal progress for a character that has been saved before"""
+        if self.replaying:
+            return  # Already journaled when this was first played
+        if self.player.save_id is None:
+            return  # Never saved, so there is nothing to journal against
+        if self.player.save_conflict is not None:
+            return  # Wait for the player to pick which save to keep
+        from db_utils import append_journal, JOURNAL_COMPACT_EVERY, SaveConflictError
+        
+        if self.player.journal_base is None:
+            pending = JOURNAL_COMPACT_EVERY  # Last save failed, write it all again
+        else:
+            try:
+                pending = yield from self.call_database(append_journal, self.player)
+            except SaveConflictError as conflict:
+                self.player.save_conflict = conflict
+                say(f"⚠️ {self.player.name} was saved by another game, autosave is paused until you save.")
+                return
+            
+        # Fold a long journal back into a full save
+        if pending is not None and pending >= JOURNAL_COMPACT_EVERY:
+            self.queue_save(overwrite=True)
+        
+    def show_leaderboards(self):
+        """Pick a leaderboard and show its top ten, with the current character's place"""
+        from leaderboards import BOARDS, print_board
+        yield from self.wait_for_saves()  # Rank saves still being written too
+        boards = list(BOARDS)
+        
+        say("\nChoose a leaderboard:")
+        for i, board in enumerate(boards, 1):
+            say(f"{i}. {BOARDS[board][0]}")
+            
+        try:
+            board_choice = (yield f"Enter your choice (1-{len(boards)}, or 0 to cancel): ")
+            if board_choice == "0":
+                return
+                
+            board_idx = int(board_choice) - 1
+            if 0 <= board_idx < len(boards):
+                character_id = self.player.save_id if self.player else None
+                yield from self.call_database(print_board, boards[board_idx], 10, character_id)
+            else:
+                say("Invalid choice.")
+        except ValueError:
+            say("Please enter a number.")
         
     def manage_saved_characters(self):
         """Load, save, or delete saved characters"""
+        self.checkpoint(None)
+        # The database layer is imported on first use so the title screen
+        # does not wait for SQLAlchemy to load
         while True:
-            print("\n" + "="*50)
-            print("💾  CHARACTER MANAGEMENT  💾")
-            print("="*50)
+            say("\n" + "="*50)
+            say("💾  CHARACTER MANAGEMENT  💾")
+            say("="*50)
             
-            print("Choose an option:")
-            print("1. Create New Character")
-            print("2. Load Saved Character")
-            print("3. Save Current Character")
-            print("4. Delete Saved Character")
-            print("5. Return to Title Screen")
+            say("Choose an option:")
+            say("1. Create New Character")
+            say("2. Load Saved Character")
+            say("3. Save Current Character")
+            say("4. Delete Saved Character")
+            say("5. Leaderboards")
+            say("6. Return to Title Screen")
             
-            choice = input("\nEnter your choice (1-5): ")
+            choice = (yield "\nEnter your choice (1-6): ")
+            db_metrics.start_action(CHARACTER_MENU_ACTIONS.get(choice, "Invalid Choice"))
             
             if choice == "1":  # Create new
-                self.create_player()
+                yield from self.create_player()
                 return True
                 
             elif choice == "2":  # Load character
-                saved_characters = get_all_characters()
+                from db_utils import list_characters, load_character
+                yield from self.wait_for_saves()  # List saves still being written too
+                saved_characters = yield from self.call_database(list_characters)
                 
                 if not saved_characters:
-                    print("No saved characters found.")
+                    say("No saved characters found.")
                     continue
                     
-                print("\nChoose a character to load:")
+                say("\nChoose a character to load:")
                 for i, char in enumerate(saved_characters, 1):
                     class_name = char.character_class
-                    print(f"{i}. {char.name} (Level {char.level} {class_name})")
+                    say(f"{i}. {char.name} (Level {char.level} {class_name})")
                     
                 try:
-                    load_choice = input(f"Enter your choice (1-{len(saved_characters)}, or 0 to cancel): ")
+                    load_choice = (yield f"Enter your choice (1-{len(saved_characters)}, or 0 to cancel): ")
                     if load_choice == "0":
                         continue
                         
                     load_idx = int(load_choice) - 1
                     if 0 <= load_idx < len(saved_characters):
                         character_id = saved_characters[load_idx].id
-                        loaded_character = load_character(character_id)
+                        loaded_character = yield from self.call_database(load_character, character_id)
                         
                         if loaded_character:
                             self.player = loaded_character
-                            print(f"\nWelcome back, {self.player.name}!")
-                            print(self.player.status())
+                            say(f"\nWelcome back, {self.player.name}!")
+                            say(self.player.status())
                             return True
                         else:
-                            print("Failed to load character.")
+                            say("Failed to load character.")
                     else:
-                        print("Invalid choice.")
+                        say("Invalid choice.")
                 except ValueError:
-                    print("Please enter a number.")
+                    say("Please enter a number.")
                     
             elif choice == "3":  # Save character
                 if not self.player:
-                    print("No active character to save.")
+                    say("No active character to save.")
                     continue
                     
                 # Ask for confirmation if overwriting
-                saved_characters = get_all_characters()
-                character_exists = False
-                
-                for char in saved_characters:
-                    if char.name == self.player.name and char.character_class == self.player.__class__.__name__:
-                        character_exists = True
-                        break
-                        
-                if character_exists:
-                    confirm = input("A character with this name already exists. Overwrite? (y/n): ").lower()
-                    if confirm != 'y':
-                        continue
-                        
-                    overwrite = True
-                else:
-                    overwrite = False
+                overwrite = yield from self.confirm_overwrite()
+                if overwrite is None:
+                    continue
                     
-                saved = save_character(self.player, overwrite)
-                if saved:
-                    print(f"Character {self.player.name} saved successfully!")
-                else:
-                    print("Failed to save character.")
+                yield from self.save_player(overwrite)
                     
             elif choice == "4":  # Delete character
-                saved_characters = get_all_characters()
+                from db_utils import list_characters, delete_character
+                yield from self.wait_for_saves()  # List saves still being written too
+                saved_characters = yield from self.call_database(list_characters)
                 
                 if not saved_characters:
-                    print("No saved characters found.")
+                    say("No saved characters found.")
                     continue
                     
-                print("\nChoose a character to delete:")
+                say("\nChoose a character to delete:")
                 for i, char in enumerate(saved_characters, 1):
                     class_name = char.character_class
-                    print(f"{i}. {char.name} (Level {char.level} {class_name})")
+                    say(f"{i}. {char.name} (Level {char.level} {class_name})")
                     
                 try:
-                    delete_choice = input(f"Enter your choice (1-{len(saved_characters)}, or 0 to cancel): ")
+                    delete_choice = (yield f"Enter your choice (1-{len(saved_characters)}, or 0 to cancel): ")
                     if delete_choice == "0":
                         continue
                         
@@ -629,111 +1067,122 @@ class Game:
                         character_name = saved_characters[delete_idx].name
                         
                         # Confirm deletion
-                        confirm = input(f"Are you sure you want to delete {character_name}? (y/n): ").lower()
+                        confirm = (yield f"Are you sure you want to delete {character_name}? (y/n): ").lower()
                         if confirm != 'y':
                             continue
                             
-                        deleted = delete_character(character_id)
+                        deleted = yield from self.call_database(delete_character, character_id)
                         if deleted:
-                            print(f"Character {character_name} deleted successfully.")
+                            say(f"Character {character_name} deleted successfully.")
                         else:
-                            print("Failed to delete character.")
+                            say("Failed to delete character.")
                     else:
-                        print("Invalid choice.")
+                        say("Invalid choice.")
                 except ValueError:
-                    print("Please enter a number.")
+                    say("Please enter a number.")
                     
-            elif choice == "5":  # Return to title
+            elif choice == "5":  # Leaderboards
+                yield from self.show_leaderboards()
+                
+            elif choice == "6":  # Return to title
                 return False
                 
     def run(self):
-        """Main game loop with enhanced menu"""
+        """Main game loop with enhanced menu, a generator driven by step()"""
         self.display_intro()
         
-        # Character selection screen
-        has_character = self.manage_saved_characters()
-        if not has_character:
-            self.create_player()
+        # Character selection screen, skipped when resuming with a loaded character
+        if self.player is None:
+            has_character = yield from self.manage_saved_characters()
+            if not has_character:
+                yield from self.create_player()
         
+        if self.resume_hunt is not None:
+            area, self.resume_hunt = self.resume_hunt, None
+            yield from self.hunt_monsters(area)
+            
         running = True
         while running:
+            self.checkpoint('main_menu')
+            
             # Main menu
-            print("\n" + "="*50)
-            print("🎮  MAIN MENU  🎮")
-            print("="*50)
-            
-            print(f"Character: {self.player.emoji} {self.player.name} (Level {self.player.level})")
-            print(f"HP: {self.player.hp}/{self.player.max_hp} | Mana: {self.player.mana}/{self.player.max_mana}")
-            
-            print("\nChoose an action:")
-            print("1. Hunt Monsters 🏕️")
-            print("2. Face a Villain 👺")
-            print("3. Challenge Boss ⚠️")
-            print("4. Manage Inventory 🎒")
-            print("5. Visit Shop 🛒")
-            print("6. Character Status 👤")
-            print("7. Rest and Recover 🏠")
-            print("8. Save Character 💾")
-            print("9. Change Character 👥")
-            print("10. Exit Game 🚪")
-            
-            choice = input("\nEnter your choice (1-10): ")
+            say("\n" + "="*50)
+            say("🎮  MAIN MENU  🎮")
+            say("="*50)
+            
+            say(f"Character: {self.player.emoji} {self.player.name} (Level {self.player.level})")
+            say(f"HP: {self.player.hp}/{self.player.max_hp} | Mana: {self.player.mana}/{self.player.max_mana}")
+            
+            say("\nChoose an action:")
+            say("1. Hunt Monsters 🏕️")
+            say("2. Face a Villain 👺")
+            say("3. Challenge Boss ⚠️")
+            say("4. Manage Inventory 🎒")
+            say("5. Visit Shop 🛒")
+            say("6. Character Status 👤")
+            say("7. Rest and Recover 🏠")
+            say("8. Save Character 💾")
+            say("9. Change Character 👥")
+            say("10. Exit Game 🚪")
+            
+            choice = (yield "\nEnter your choice (1-10): ")
+            db_metrics.start_action(MAIN_MENU_ACTIONS.get(choice, "Invalid Choice"))
             
             if choice == "1":  # Hunt
-                self.hunt_monsters()
+                yield from self.hunt_monsters()
                 
             elif choice == "2":  # Face villain
                 self.create_villain()
-                victory = self.start_combat()
+                victory = yield from self.start_combat()
                 
                 if victory:
-                    print("\n🎉 Congratulations on your victory! 🎉")
+                    say("\n🎉 Congratulations on your victory! 🎉")
                     # Rewards for defeating a villain
                     xp_reward = 50 * self.villain.level
                     self.player.gain_xp(xp_reward)
                     
                     gold_reward = random.randint(20, 40) * self.villain.level
                     self.player.inventory.gold += gold_reward
-                    print(f"💰 You received {gold_reward} gold!")
+                    say(f"💰 You received {gold_reward} gold!")
                     
                     # Chance for item
                     if random.random() < 0.7:  # 70% chance
                         item = generate_random_item(self.player.level, False)
                         if self.player.inventory.add_item(item):
-                            print(f"🎁 You found {item.emoji} {item.name}!")
+                            say(f"🎁 You found {item.emoji} {item.name}!")
                         else:
-                            print("🎒 Your inventory is full! You couldn't pick up the item.")
+                            say("🎒 Your inventory is full! You couldn't pick up the item.")
                             
                     # Small chance to gain luck from defeating a villain
                     if random.random() < 0.3:  # 30% chance
                         luck_gain = random.randint(1, 2)
                         self.player.luck += luck_gain
-                        print(f"⭐ Your fortune increases slightly! (+{luck_gain} Luck)")
+                        say(f"⭐ Your fortune increases slightly! (+{luck_gain} Luck)")
                 else:
-                    print("\n😢 You were defeated! You've been revived but lost some gold.")
+                    say("\n😢 You were defeated! You've been revived but lost some gold.")
                     # Lose some gold when defeated
                     gold_loss = min(int(self.player.inventory.gold * 0.2), 50)  # 20% or max 50
                     self.player.inventory.gold = max(0, self.player.inventory.gold - gold_loss)
                     if gold_loss > 0:
-                        print(f"💸 You lost {gold_loss} gold!")
+                        say(f"💸 You lost {gold_loss} gold!")
                     
                     # Restore some HP and mana
                     self.player.hp = max(1, int(self.player.max_hp * 0.5))  # 50% HP
                     self.player.mana = max(1, int(self.player.max_mana * 0.5))  # 50% mana
                 
-                input("\nPress Enter to continue...")
+                yield "\nPress Enter to continue..."
                 
             elif choice == "3":  # Boss challenge
-                self.face_boss()
+                yield from self.face_boss()
                 
             elif choice == "4":  # Inventory
-                self.manage_inventory()
+                yield from self.manage_inventory()
                 
             elif choice == "5":  # Visit Shop
-                self.visit_shop()
+                yield from self.visit_shop()
                 
             elif choice == "6":  # Character status
-                self.show_character_status()
+                yield from self.show_character_status()
                 
             elif choice == "7":  # Rest
                 # Restore HP and mana
@@ -746,98 +1195,71 @@ class Game:
                 hp_restored = self.player.hp - old_hp
                 mana_restored = self.player.mana - old_mana
                 
-                print("\n" + "="*50)
-                print("🏠  RESTING  🏠")
-                print("="*50)
-                print(f"You take some time to rest and recover...")
-                time.sleep(1)
-                print(f"HP restored: +{hp_restored} ❤️")
-                print(f"Mana restored: +{mana_restored} 🔮")
-                print("You feel refreshed and ready for adventure!")
+                say("\n" + "="*50)
+                say("🏠  RESTING  🏠")
+                say("="*50)
+                say(f"You take some time to rest and recover...")
+                self.pause()
+                say(f"HP restored: +{hp_restored} ❤️")
+                say(f"Mana restored: +{mana_restored} 🔮")
+                say("You feel refreshed and ready for adventure!")
                 
-                input("\nPress Enter to continue...")
+                yield "\nPress Enter to continue..."
                 
             elif choice == "8":  # Save character
                 # Use the save character function from the manage_saved_characters method
                 if not self.player:
-                    print("No active character to save.")
+                    say("No active character to save.")
                     continue
                     
                 # Ask for confirmation if overwriting
-                saved_characters = get_all_characters()
-                character_exists = False
-                
-                for char in saved_characters:
-                    if char.name == self.player.name and char.character_class == self.player.__class__.__name__:
-                        character_exists = True
-                        break
-                        
-                if character_exists:
-                    confirm = input("A character with this name already exists. Overwrite? (y/n): ").lower()
-                    if confirm != 'y':
-                        continue
-                        
-                    overwrite = True
-                else:
-                    overwrite = False
+                overwrite = yield from self.confirm_overwrite()
+                if overwrite is None:
+                    continue
                     
-                saved = save_character(self.player, overwrite)
-                if saved:
-                    print(f"Character {self.player.name} saved successfully!")
-                else:
-                    print("Failed to save character.")
+                yield from self.save_player(overwrite)
                 
-                input("\nPress Enter to continue...")
+                yield "\nPress Enter to continue..."
                 
             elif choice == "9":  # Change character
                 # Confirm with the player if they want to switch characters
-                confirm = input("Are you sure you want to switch characters? Unsaved progress will be lost. (y/n): ").lower()
+                confirm = (yield "Are you sure you want to switch characters? Unsaved progress will be lost. (y/n): ").lower()
                 if confirm != 'y':
                     continue
                     
                 # Use the existing character management screen
-                has_character = self.manage_saved_characters()
+                has_character = yield from self.manage_saved_characters()
                 if not has_character:
-                    self.create_player()
+                    yield from self.create_player()
                 
             elif choice == "10":  # Exit
                 # Ask to save before exiting
-                save_prompt = input("Would you like to save your character before exiting? (y/n): ").lower()
+                save_prompt = (yield "Would you like to save your character before exiting? (y/n): ").lower()
                 if save_prompt == 'y':
-                    # Use the same save logic as option 7
-                    saved_characters = get_all_characters()
-                    character_exists = False
-                    
-                    for char in saved_characters:
-                        if char.name == self.player.name and char.character_class == self.player.__class__.__name__:
-                            character_exists = True
-                            break
-                            
-                    if character_exists:
-                        confirm = input("A character with this name already exists. Overwrite? (y/n): ").lower()
-                        if confirm != 'y':
-                            continue
-                            
-                        overwrite = True
-                    else:
-                        overwrite = False
+                    # Use the same save logic as option 8
+                    overwrite = yield from self.confirm_overwrite()
+                    if overwrite is None:
+                        continue
                         
-                    saved = save_character(self.player, overwrite)
-                    if saved:
-                        print(f"Character {self.player.name} saved successfully!")
-                    else:
-                        print("Failed to save character.")
+                    # Wait for the write so nothing is lost on exit
+                    yield from self.save_player(overwrite, wait=True)
+                    
+                if self.player.save_id is not None and self.player.save_conflict is None:
+                    # Leave a full save behind instead of a journal to replay
+                    from db_utils import compact_journal
+                    yield from self.wait_for_saves()
+                    yield from self.call_database(compact_journal, self.player.save_id)
                 
-                print("\nThank you for playing Enhanced RPG Adventure! 👋")
+                say("\nThank you for playing Enhanced RPG Adventure! 👋")
                 running = False
                 
             else:
-                print("Invalid choice. Please try again.")
+                say("Invalid choice. Please try again.")
                 
 def main():
     """Entry point for the enhanced RPG game"""
     game = Game()
-    game.run()
+    game.play()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
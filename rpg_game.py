@@ -1,20 +1,22 @@
 #!/usr/bin/env python3
 import os
+import argparse
 from new_game import Game
-from db_models import init_db
 
-def main():
+def main(argv=None):
     """Entry point for the RPG game"""
-    # Initialize database
-    try:
-        init_db()
-        print("Database initialized successfully.")
-    except Exception as e:
-        print(f"Warning: Error initializing database: {e}")
-        print("Game will run, but character saving/loading will be disabled.")
+    parser = argparse.ArgumentParser(description="Enhanced RPG Adventure")
+    parser.add_argument('--machine', action='store_true',
+                        help="Print one JSON frame per line instead of text, for front ends (see Game.frame)")
+    args = parser.parse_args(argv)
     
-    game = Game()
-    game.run()
+    # The database is opened and checked on first save or load,
+    # so the title screen does not wait for it
+    if args.machine:
+        Game(delay=0).play_machine()
+    else:
+        game = Game()
+        game.play()
 
 if __name__ == "__main__":
     main()
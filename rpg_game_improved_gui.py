@@ -40,6 +40,23 @@ class GameState:
         self.shop_items = []
         self.inventory_items = []
         self.available_characters = []
+        self.choices = None  # Answers the current prompt accepts, None for any text
+
+# GameState for each state named in the game's --machine frames
+FRAME_STATES = {
+    "title": GameState.TITLE_SCREEN,
+    "character_management": GameState.CHARACTER_MANAGEMENT,
+    "character_creation": GameState.CHARACTER_MANAGEMENT,
+    "leaderboards": GameState.CHARACTER_MANAGEMENT,
+    "main_menu": GameState.MAIN_MENU,
+    "status": GameState.MAIN_MENU,
+    "game_over": GameState.MAIN_MENU,
+    "hunting": GameState.HUNTING,
+    "combat": GameState.COMBAT,
+    "boss": GameState.BOSS_FIGHT,
+    "inventory": GameState.INVENTORY,
+    "shop": GameState.SHOP,
+}
 
 class RPGGameGUI:
     def __init__(self, root):
@@ -484,7 +501,7 @@ class RPGGameGUI:
             # Use sys.executable to ensure we use the same Python interpreter
             # Start the game in a new process with UTF-8 encoding
             self.game_process = subprocess.Popen(
-                [sys.executable, "rpg_game.py"],
+                [sys.executable, "rpg_game.py", "--machine"],
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -534,8 +551,15 @@ class RPGGameGUI:
                 # Try to clean the line of any problematic characters
                 clean_line = line.encode('utf-8', errors='replace').decode('utf-8')
                 
-                # Process game output for UI updates
-                self.process_game_output(clean_line, tag)
+                # Each line of the game's output is one JSON frame, shown by the UI thread
+                if tag == "normal":
+                    try:
+                        frame = json.loads(clean_line)
+                    except ValueError:
+                        frame = None  # Not a frame, show it as it is
+                    if isinstance(frame, dict):
+                        self.msg_queue.put(("frame", frame))
+                        continue
                 
                 # Add to message queue for display
                 self.msg_queue.put((tag, clean_line))
@@ -545,172 +569,24 @@ class RPGGameGUI:
         
         pipe.close()
     
-    def process_game_output(self, text, tag):
-        """Process game output to update UI state"""
-        # Detect game state changes
-        if "WELCOME TO THE ENHANCED RPG ADVENTURE" in text:
-            self.game_state.current_state = GameState.TITLE_SCREEN
-            self.update_game_area_title("Welcome to RPG Adventure")
-        
-        elif "CHARACTER MANAGEMENT" in text:
-            self.game_state.current_state = GameState.CHARACTER_MANAGEMENT
-            self.update_game_area_title("Character Management")
-        
-        elif "MAIN MENU" in text:
-            self.game_state.current_state = GameState.MAIN_MENU
-            self.update_game_area_title("Main Menu")
-        
-        elif "COMBAT INITIATED" in text or "BOSS FIGHT" in text:
-            if "BOSS FIGHT" in text:
-                self.game_state.current_state = GameState.BOSS_FIGHT
-                self.update_game_area_title("Boss Fight")
-            else:
-                self.game_state.current_state = GameState.COMBAT
-                self.update_game_area_title("Combat")
-            
-            # Show enemy frame during combat
-            self.enemy_frame.pack(fill=tk.X, pady=10, after=self.stats_frame)
-        
-        elif "HUNTING GROUNDS" in text:
-            self.game_state.current_state = GameState.HUNTING
-            self.update_game_area_title("Hunting Grounds")
-        
-        elif "INVENTORY MANAGEMENT" in text:
-            self.game_state.current_state = GameState.INVENTORY
-            self.update_game_area_title("Inventory Management")
-        
-        elif "WELCOME TO THE SHOP" in text:
-            self.game_state.current_state = GameState.SHOP
-            self.update_game_area_title("Shop")
-        
-        # Extract character info
-        if "Level:" in text and "HP:" in text and "Mana:" in text:
-            self.parse_character_status(text)
-        
-        # Extract enemy info during combat
-        if "Enemy:" in text and "HP:" in text:
-            self.parse_enemy_status(text)
-        
-        # Handle combat end
-        if "Combat has ended" in text or "You defeated" in text:
-            # Hide enemy frame after combat
-            self.enemy_frame.pack_forget()
-        
-        # Check for rewards or items
-        if "You found" in text or "You received" in text or "You gained" in text:
-            # Highlight rewards
-            tag = "reward"
-    
-    def parse_character_status(self, text):
-        """Parse character status information from game output"""
-        try:
-            # Basic approach - would need to be adapted to match actual game output format
-            if "Level:" in text and "HP:" in text:
-                # Extract level
-                level_idx = text.find("Level:")
-                if level_idx >= 0:
-                    level_end = text.find("\n", level_idx)
-                    if level_end < 0:
-                        level_end = text.find(" ", level_idx + 7)
-                    level = text[level_idx+7:level_end].strip()
-                    self.game_state.player_stats["level"] = int(level)
-                
-                # Extract HP
-                hp_idx = text.find("HP:")
-                if hp_idx >= 0:
-                    hp_end = text.find("\n", hp_idx)
-                    if hp_end < 0:
-                        hp_end = text.find(" ", hp_idx + 4)
-                    hp_text = text[hp_idx+4:hp_end].strip()
-                    if "/" in hp_text:
-                        current_hp, max_hp = hp_text.split("/")
-                        self.game_state.player_stats["hp"] = int(current_hp)
-                        self.game_state.player_stats["max_hp"] = int(max_hp)
-                    
-                # Extract Mana
-                mana_idx = text.find("Mana:")
-                if mana_idx >= 0:
-                    mana_end = text.find("\n", mana_idx)
-                    if mana_end < 0:
-                        mana_end = text.find(" ", mana_idx + 6)
-                    mana_text = text[mana_idx+6:mana_end].strip()
-                    if "/" in mana_text:
-                        current_mana, max_mana = mana_text.split("/")
-                        self.game_state.player_stats["mana"] = int(current_mana)
-                        self.game_state.player_stats["max_mana"] = int(max_mana)
-                
-                # Extract XP
-                xp_idx = text.find("XP:")
-                if xp_idx >= 0:
-                    xp_end = text.find("\n", xp_idx)
-                    if xp_end < 0:
-                        xp_end = text.find(" ", xp_idx + 4)
-                    xp_text = text[xp_idx+4:xp_end].strip()
-                    if "/" in xp_text:
-                        current_xp, max_xp = xp_text.split("/")
-                        self.game_state.player_stats["xp"] = int(current_xp)
-                        self.game_state.player_stats["xp_to_level"] = int(max_xp)
-                
-                # Extract Attack
-                attack_idx = text.find("Attack:")
-                if attack_idx >= 0:
-                    attack_end = text.find("\n", attack_idx)
-                    if attack_end < 0:
-                        attack_end = text.find(" ", attack_idx + 8)
-                    attack = text[attack_idx+8:attack_end].strip()
-                    self.game_state.player_stats["attack"] = int(attack)
-                
-                # Extract Defense
-                defense_idx = text.find("Defense:")
-                if defense_idx >= 0:
-                    defense_end = text.find("\n", defense_idx)
-                    if defense_end < 0:
-                        defense_end = text.find(" ", defense_idx + 9)
-                    defense = text[defense_idx+9:defense_end].strip()
-                    self.game_state.player_stats["defense"] = int(defense)
-                
-                # Extract Gold
-                gold_idx = text.find("Gold:")
-                if gold_idx >= 0:
-                    gold_end = text.find("\n", gold_idx)
-                    if gold_end < 0:
-                        gold_end = text.find(" ", gold_idx + 6)
-                    gold = text[gold_idx+6:gold_end].strip()
-                    self.game_state.player_stats["gold"] = int(gold)
-                
-                # Update player info and stats on UI
-                self.update_player_stats()
-        except Exception as e:
-            print(f"Error parsing character status: {str(e)}")
-    
-    def parse_enemy_status(self, text):
-        """Parse enemy status information from game output"""
-        try:
-            # Extract enemy name
-            enemy_idx = text.find("Enemy:")
-            if enemy_idx >= 0:
-                enemy_end = text.find("\n", enemy_idx)
-                if enemy_end < 0:
-                    enemy_end = text.find(" ", enemy_idx + 7)
-                enemy_name = text[enemy_idx+7:enemy_end].strip()
-                self.game_state.enemy_stats["name"] = enemy_name
-            
-            # Extract enemy HP
-            hp_idx = text.find("HP:", enemy_idx)
-            if hp_idx >= 0:
-                hp_end = text.find("\n", hp_idx)
-                if hp_end < 0:
-                    hp_end = text.find(" ", hp_idx + 4)
-                hp_text = text[hp_idx+4:hp_end].strip()
-                if "/" in hp_text:
-                    current_hp, max_hp = hp_text.split("/")
-                    self.game_state.enemy_stats["hp"] = int(current_hp)
-                    self.game_state.enemy_stats["max_hp"] = int(max_hp)
-            
-            # Update enemy info on UI
-            self.update_enemy_stats()
-        except Exception as e:
-            print(f"Error parsing enemy status: {str(e)}")
+    def process_game_frame(self, frame):
+        """Update the UI from one frame of the game's --machine output"""
+        state = FRAME_STATES.get(frame.get('state'), self.game_state.current_state)
+        enemy = frame.get('enemy') or {}
+        if state == GameState.COMBAT and enemy.get('boss'):
+            state = GameState.BOSS_FIGHT
+        self.game_state.current_state = state
+        self.game_state.player_stats = frame.get('player') or {}
+        self.game_state.enemy_stats = enemy
+        self.game_state.choices = frame.get('choices')
+        
+        # Show the game's text line by line so each line gets its own highlighting
+        for line in frame.get('log', '').splitlines(True):
+            self.append_text(line)
+        if frame.get('prompt'):
+            self.append_text(frame['prompt'])
+        
+        self.refresh_status()
     
     def update_player_stats(self):
         """Update the player stats display with current values"""
@@ -820,7 +696,10 @@ class RPGGameGUI:
         try:
             while True:
                 tag, text = self.msg_queue.get_nowait()
-                self.append_text(text, tag)
+                if tag == "frame":
+                    self.process_game_frame(text)
+                else:
+                    self.append_text(text, tag)
                 self.msg_queue.task_done()
         except queue.Empty:
             pass
@@ -867,6 +746,13 @@ class RPGGameGUI:
     
     def update_status_area(self):
         """Update the status area periodically"""
+        self.refresh_status()
+        
+        # Check again after 1000ms
+        self.root.after(1000, self.update_status_area)
+    
+    def refresh_status(self):
+        """Show the current game state in the title, stats and enemy panels"""
         # Update game area title based on game state
         current_state = self.game_state.current_state
         
@@ -898,9 +784,6 @@ class RPGGameGUI:
         else:
             if self.enemy_frame.winfo_ismapped() == 1:
                 self.enemy_frame.pack_forget()
-        
-        # Check again after 1000ms
-        self.root.after(1000, self.update_status_area)
     
     def update_game_area_title(self, title):
         """Update the game area title"""
@@ -913,7 +796,7 @@ class RPGGameGUI:
     def on_submit(self):
         """Process user input"""
         text = self.input_entry.get().strip()
-        if text:
+        if text or self.game_state.choices == [""]:  # Empty input answers "Press Enter" prompts
             # Add user input to the display
             self.append_text(f"> {text}\n", "input")
             
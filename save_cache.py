@@ -0,0 +1,72 @@
+"""Bounded cache of decoded saves, so loading the same character again skips the heavy reads"""
+import threading
+from collections import OrderedDict
+
+
+class LoadCache:
+    """
+    Least-recently-used cache of load records keyed by character id
+    
+    Each entry remembers the version token it was read at. A lookup with
+    a different token counts as a miss and drops the stale entry, so the
+    cache never hands back a save that changed underneath it.
+    """
+    
+    def __init__(self, capacity=128):
+        self.capacity = capacity  # 0 turns the cache off
+        self._entries = OrderedDict()  # key -> (token, record)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key, token):
+        """Cached record for key if it was read at token, None otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]  # Saved again since it was cached
+            self.misses += 1
+            return None
+    
+    def put(self, key, token, record):
+        """Remember a record, evicting the least recently used one when full"""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (token, record)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, key):
+        """Drop the record for key, if cached"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+    
+    def clear(self):
+        """Drop every record and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+    
+    def stats(self) -> dict:
+        """Hit and miss counters plus current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'capacity': self.capacity,
+            }
@@ -0,0 +1,333 @@
+"""
+Compact binary encoding for a character's bag and equipment
+
+Layout, after the b'RS' magic and a version byte (little-endian):
+
+    value table     index width 'B', 'H' or 'I', then strings (count, byte
+                    length, UTF-8 joined by NUL), ints (count, int64s)
+                    and stat maps (count, entry counts, key indexes,
+                    int64 amounts)
+    items           item count, bag count and group count, then each
+                    group's type id, field count and item count
+    fields          every group's items' fields in turn, one index each
+    order           where each item, bag first, sits among the groups,
+                    then an index per equipment slot name
+
+Every field is an index into the value table, so repeated names,
+descriptions and numbers are stored once, and all the fields decode with
+one struct call and table lookup rather than a loop over items. New
+fields go on the end of a field list: older blobs simply have fewer of
+them. Version 1 blobs, with varints and one
+record per item, still decode.
+
+Items use the same dicts as db_utils._serialize_item.
+
+    python save_codec.py convert binary    # move existing saves to save_blob
+    python save_codec.py convert rows      # and back to saved_items rows
+"""
+import sys
+import struct
+import argparse
+from functools import lru_cache
+from itertools import islice, repeat, starmap
+from operator import itemgetter, mul
+
+MAGIC = b'RS'
+VERSION = 2
+
+# Field kinds
+_STR = 's'
+_INT = 'i'
+_MAP = 'm'  # str -> int
+
+# Type id -> (serialized type name, fields). Ids and field order never change.
+_ITEM_FORMATS = {
+    1: ('weapon', (('name', _STR), ('description', _STR), ('value', _INT),
+                   ('quality', _STR), ('attack_boost', _INT))),
+    2: ('armor', (('name', _STR), ('description', _STR), ('value', _INT),
+                  ('quality', _STR), ('defense_boost', _INT))),
+    3: ('accessory', (('name', _STR), ('description', _STR), ('value', _INT),
+                      ('quality', _STR), ('stat_boosts', _MAP))),
+    # Potion names, descriptions and values all follow from the size
+    4: ('health_potion', (('size', _STR), ('uses', _INT))),
+    5: ('mana_potion', (('size', _STR), ('uses', _INT))),
+    6: ('strength_elixir', (('uses', _INT),)),
+}
+_TYPE_IDS = {type_name: type_id for type_id, (type_name, _) in _ITEM_FORMATS.items()}
+
+
+class CodecError(ValueError):
+    """Raised for items the codec cannot encode and for damaged blobs"""
+
+
+def _read_varint(data, pos):
+    """Read an unsigned LEB128 varint, returns (value, next position)"""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _item_format(item_data):
+    """(type id, field count) an item is packed with, trailing fields it does not have left out"""
+    type_id = _TYPE_IDS.get(item_data.get('type'))
+    if type_id is None:
+        raise CodecError(f"No binary format for item type {item_data.get('type')!r}")
+    fields = _ITEM_FORMATS[type_id][1]
+    count = len(fields)
+    while count and fields[count - 1][0] not in item_data:
+        count -= 1
+    return type_id, count
+
+def encode_items(bag, equipment):
+    """
+    Pack a bag and equipment into a blob
+    
+    Args:
+        bag: List of serialized item dicts
+        equipment: Dict of slot -> serialized item dict
+    
+    Returns:
+        bytes
+    
+    Raises:
+        CodecError if an item has no binary format or does not fit it
+    """
+    items = list(bag) + list(equipment.values())
+    strings, ints, maps = {}, {}, {}
+    
+    def reference(kind, value):
+        """(part of the value table, position in it) for a field value"""
+        if kind == _STR:
+            value = '' if value is None else str(value)
+            if '\0' in value:
+                raise CodecError("Strings cannot contain NUL")
+            return 0, strings.setdefault(value, len(strings))
+        if kind == _INT:
+            if not isinstance(value, int):
+                raise CodecError(f"Not an integer: {value!r}")
+            return 1, ints.setdefault(value, len(ints))
+        entries = tuple(value.items())
+        for key, amount in entries:
+            reference(_STR, key)
+            reference(_INT, amount)
+        return 2, maps.setdefault(entries, len(maps))
+    
+    # Items of the same type and field count go in one group
+    groups = {}
+    order = []
+    for item_data in items:
+        key = _item_format(item_data)
+        if key not in groups:
+            groups[key] = []
+        order.append(list(groups).index(key))
+        fields = _ITEM_FORMATS[key[0]][1][:key[1]]
+        groups[key].append([reference(kind, item_data.get(name)) for name, kind in fields])
+    slots = [reference(_STR, slot) for slot in equipment]
+    
+    # Strings, then ints, then maps make up the table
+    offsets = (0, len(strings), len(strings) + len(ints))
+    largest = max(offsets[2] + len(maps), len(items))
+    width = 'B' if largest <= 0xff else 'H' if largest <= 0xffff else 'I'
+    
+    # Where each item ends up once the groups are laid end to end
+    starts, position = {}, 0
+    for key, rows in groups.items():
+        starts[key] = position
+        position += len(rows)
+    placed = dict.fromkeys(groups, 0)
+    placement = []
+    for number in order:
+        key = list(groups)[number]
+        placement.append(starts[key] + placed[key])
+        placed[key] += 1
+    
+    def indexes(references):
+        return [offsets[part] + position for part, position in references]
+    
+    try:
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        table = '\0'.join(strings).encode('utf-8')  # Dicts keep insertion order, which is index order
+        out += struct.pack('<cII', width.encode(), len(strings), len(table)) + table
+        out += struct.pack(f'<I{len(ints)}q', len(ints), *ints)
+        keys = [strings[str(key)] for entries in maps for key, _ in entries]
+        amounts = [amount for entries in maps for _, amount in entries]
+        out += struct.pack(f'<I{len(maps)}B{len(keys)}{width}{len(amounts)}q', len(maps),
+                           *(len(entries) for entries in maps), *keys, *amounts)
+        out += struct.pack('<III', len(items), len(bag), len(groups))
+        for (type_id, count), rows in groups.items():
+            out += struct.pack('<BBI', type_id, count, len(rows))
+        fields = indexes(reference for rows in groups.values() for row in rows for reference in row)
+        out += struct.pack(f'<{len(fields)}{width}', *fields)
+        out += struct.pack(f'<{len(placement)}{width}{len(slots)}{width}', *placement, *indexes(slots))
+    except struct.error as e:
+        raise CodecError(f"Item does not fit the binary format: {e}")
+    return bytes(out)
+
+def _decode_v1(data):
+    """Unpack a version 1 blob: varints and one record per item"""
+    pos = 3
+    
+    # Closures over pos rather than a reader object, this is the hot loop of a load
+    def varint():
+        nonlocal pos
+        value, pos = _read_varint(data, pos)
+        return value
+    
+    def zigzag():
+        value = varint()
+        return -((value + 1) >> 1) if value & 1 else value >> 1
+    
+    def item():
+        type_id = varint()
+        if type_id not in _ITEM_FORMATS:
+            raise CodecError(f"Unknown item type id {type_id}")
+        type_name, fields = _ITEM_FORMATS[type_id]
+        item_data = {'type': type_name}
+        for name, kind in fields[:varint()]:
+            if kind is _STR:
+                item_data[name] = strings[varint()]
+            elif kind is _INT:
+                item_data[name] = zigzag()
+            else:
+                item_data[name] = {strings[varint()]: zigzag() for _ in range(varint())}
+        return item_data
+    
+    strings = []
+    for _ in range(varint()):
+        length = varint()
+        strings.append(data[pos:pos + length].decode('utf-8'))
+        pos += length
+    
+    bag = [item() for _ in range(varint())]
+    equipment = {}
+    for _ in range(varint()):
+        slot = strings[varint()]
+        equipment[slot] = item()
+    return bag, equipment
+
+@lru_cache(maxsize=None)
+def _item_builder(type_id, count):
+    """
+    Function making an item dict from its first count field values, in field order
+    
+    Generated once per format, like namedtuple's methods: a dict display
+    is several times faster than dict(zip(keys, values)) per item, which
+    is most of the time decoding takes. Stat maps are stored as tuples of
+    pairs and each item gets its own dict of them.
+    """
+    if type_id not in _ITEM_FORMATS:
+        raise CodecError(f"Unknown item type id {type_id}")
+    type_name, fields = _ITEM_FORMATS[type_id]
+    if count > len(fields):
+        raise CodecError(f"Item type id {type_id} has no field {count}")
+    arguments = [f"value{number}" for number in range(count)]
+    entries = [f"'type': {type_name!r}"] + [
+        f"{name!r}: " + (f"dict({argument})" if kind is _MAP else argument)
+        for (name, kind), argument in zip(fields, arguments)
+    ]
+    return eval(f"lambda {', '.join(arguments)}: {{{', '.join(entries)}}}")
+
+def _check_room(data, pos, size):
+    """Raise CodecError unless size more bytes follow pos, before trusting a count read from the blob"""
+    if pos + size > len(data):
+        raise CodecError("Blob is truncated or damaged")
+
+def _decode_v2(data):
+    """Unpack a version 2 blob: a few struct calls and table lookups for all the items"""
+    width, string_count, length = struct.unpack_from('<cII', data, 3)
+    width = width.decode('ascii')
+    index_size = struct.calcsize(width)
+    pos = 12 + length
+    strings = data[12:pos].decode('utf-8').split('\0') if string_count else []
+    if len(strings) != string_count:
+        raise CodecError("Blob is truncated or damaged")
+    
+    (int_count,) = struct.unpack_from('<I', data, pos)
+    _check_room(data, pos + 4, 8 * int_count)
+    ints = struct.unpack_from(f'<{int_count}q', data, pos + 4)
+    pos += 4 + 8 * int_count
+    
+    (map_count,) = struct.unpack_from('<I', data, pos)
+    _check_room(data, pos + 4, map_count)
+    lengths = struct.unpack_from(f'<{map_count}B', data, pos + 4)
+    pos += 4 + map_count
+    pairs = sum(lengths)
+    entries = struct.unpack_from(f'<{pairs}{width}{pairs}q', data, pos)
+    pos += pairs * (index_size + 8)
+    keys = map(strings.__getitem__, entries[:pairs])
+    amounts = iter(entries[pairs:])
+    maps = [tuple(zip(islice(keys, n), islice(amounts, n))) for n in lengths]
+    table = strings + list(ints) + maps
+    
+    total, bag_size, group_count = struct.unpack_from('<III', data, pos)
+    _check_room(data, pos + 12, 6 * group_count + total * index_size)
+    if bag_size > total:
+        raise CodecError("Blob is truncated or damaged")
+    headers = struct.unpack_from('<' + 'BBI' * group_count, data, pos + 12)
+    pos += 12 + 6 * group_count
+    counts, sizes = headers[1::3], headers[2::3]
+    if sum(sizes) != total:
+        raise CodecError("Blob is truncated or damaged")
+    field_count = sum(map(mul, counts, sizes))
+    _check_room(data, pos, field_count * index_size)
+    indexes = struct.unpack_from(f'<{field_count}{width}', data, pos)
+    pos += field_count * index_size
+    # itemgetter looks every field up in one call, but returns a lone value for a single index
+    values = iter(itemgetter(*indexes)(table)) if field_count > 1 else map(table.__getitem__, indexes)
+    
+    flat = []
+    for type_id, count, size in zip(headers[0::3], counts, sizes):
+        builder = _item_builder(type_id, count)
+        # zip over the same iterator count times deals the values out item by item
+        rows = zip(*[islice(values, size * count)] * count) if count else repeat((), size)
+        flat += starmap(builder, rows)
+    
+    positions = struct.unpack_from(f'<{total * 2 - bag_size}{width}', data, pos)
+    items = list(map(flat.__getitem__, positions[:total]))
+    slots = map(table.__getitem__, positions[total:])
+    return items[:bag_size], dict(zip(slots, items[bag_size:]))
+
+def decode_items(blob):
+    """
+    Unpack a blob from encode_items
+    
+    Returns:
+        Tuple of (bag list, equipment dict) of serialized item dicts
+    
+    Raises:
+        CodecError if the blob is damaged or from a newer version
+    """
+    data = bytes(blob)
+    if data[:2] != MAGIC:
+        raise CodecError("Not an encoded save")
+    if len(data) < 3 or data[2] > VERSION:
+        raise CodecError(f"Unsupported save codec version {data[2] if len(data) > 2 else None}")
+    try:
+        return _decode_v2(data) if data[2] == 2 else _decode_v1(data)
+    except CodecError:
+        raise
+    except (IndexError, struct.error, UnicodeDecodeError, ValueError, TypeError):
+        raise CodecError("Blob is truncated or damaged")
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Convert saved items between storage formats")
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert_parser = commands.add_parser('convert', help="Rewrite the items of every active save")
+    convert_parser.add_argument('codec', choices=['binary', 'rows'],
+                                help="binary: save_blob column, rows: saved_items table")
+    convert_parser.add_argument('--batch-size', type=int, default=500, help="Saves converted per transaction")
+    
+    args = parser.parse_args(argv)
+    from db_utils import convert_saves
+    converted = convert_saves(args.codec, args.batch_size)
+    print(f"Converted {converted} characters to {args.codec}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Background writer that keeps character saves off the game thread"""
+import sys
+import atexit
+import threading
+from db_utils import snapshot_character, save_snapshots, SaveConflictError
+
+
+class SaveTicket:
+    """Handle for one queued save, resolved once the save is committed"""
+    
+    def __init__(self):
+        self._done = threading.Event()
+        self.result = None  # SavedCharacter on success, None on failure
+        self.conflict = None  # SaveConflictError if the save changed elsewhere
+    
+    def _resolve(self, result, conflict=None):
+        self.result = result
+        self.conflict = conflict
+        self._done.set()
+    
+    def done(self) -> bool:
+        """Check if the save has been written (or has failed)"""
+        return self._done.is_set()
+    
+    def wait(self, timeout=None) -> bool:
+        """Wait for the save to be written, returns False on timeout"""
+        return self._done.wait(timeout)
+    
+    def succeeded(self) -> bool:
+        """Check if the save was written successfully"""
+        return self._done.is_set() and self.result is not None
+
+
+class SaveQueue:
+    """
+    Write-behind queue for character saves
+    
+    submit() snapshots the character on the calling thread and returns at
+    once. A writer thread commits the snapshots in batches. Repeated saves
+    of the same character before it is written collapse into the latest
+    snapshot, and all of their tickets resolve together.
+    """
+    
+    def __init__(self, batch_size=50):
+        self.batch_size = batch_size
+        self._pending = {}  # _queue_key() -> [snapshot, overwrite, tickets, character]
+        self._in_flight = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, character, overwrite=True) -> SaveTicket:
+        """Queue a save of the character's current state"""
+        snapshot = snapshot_character(character)
+        key = _queue_key(snapshot)
+        ticket = SaveTicket()
+        
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Save queue is closed")
+            entry = self._pending.get(key)
+            if entry:
+                # Coalesce with the save still waiting for this character,
+                # keeping every field either snapshot changed
+                older_dirty = entry[0]['dirty']
+                if older_dirty is None or snapshot['dirty'] is None:
+                    snapshot['dirty'] = None
+                else:
+                    snapshot['dirty'] = sorted(set(older_dirty) | set(snapshot['dirty']))
+                entry[0] = snapshot
+                entry[1] = entry[1] or overwrite
+                entry[2].append(ticket)
+                entry[3] = character
+            else:
+                self._pending[key] = [snapshot, overwrite, [ticket], character]
+            character.saves_in_flight = getattr(character, 'saves_in_flight', 0) + 1
+            self._cond.notify_all()
+            
+        # Changes from here on belong to the next save
+        if hasattr(character, 'mark_clean'):
+            character.journal_base = snapshot
+            character.mark_clean()
+        return ticket
+    
+    def pending(self) -> int:
+        """Number of characters waiting to be written"""
+        with self._cond:
+            return len(self._pending) + self._in_flight
+    
+    def flush(self, timeout=None) -> bool:
+        """Wait until every save queued so far is committed, returns False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+    
+    def close(self, timeout=None) -> bool:
+        """Flush outstanding saves and stop the writer thread"""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        return flushed
+    
+    def _take_batch(self):
+        """Remove up to batch_size entries from the queue (lock held)"""
+        batch = []
+        for key in list(self._pending)[:self.batch_size]:
+            batch.append(self._pending.pop(key))
+        self._in_flight = len(batch)
+        return batch
+    
+    def _run(self):
+        """Writer thread main loop"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if self._closed and not self._pending:
+                    return
+                batch = self._take_batch()
+            
+            results = self._write(batch)
+            
+            with self._cond:
+                for (snapshot, _, tickets, character), result in zip(batch, results):
+                    conflict = None
+                    if isinstance(result, SaveConflictError):
+                        conflict, result = result, None
+                        character.save_conflict = conflict
+                        print(f"⚠️ {snapshot['name']} was saved by another game since it was loaded, "
+                              f"so this save was not written. Save again to choose which to keep.", file=sys.stderr)
+                    if result is not None:
+                        character.save_id = result.id
+                        character.save_version = result.version
+                    elif hasattr(character, 'mark_all_dirty'):
+                        character.mark_all_dirty()  # Nothing was written, so retry it all next time
+                        character.journal_base = None
+                    character.saves_in_flight = max(0, getattr(character, 'saves_in_flight', 0) - len(tickets))
+                    for ticket in tickets:
+                        ticket._resolve(result, conflict)
+                self._in_flight = 0
+                self._cond.notify_all()
+    
+    def _write(self, batch):
+        """Commit a batch, falling back to one save at a time if it fails"""
+        # Snapshots queued behind an earlier save of the same character expect
+        # the version that save wrote, which the character holds by now
+        for snapshot, _, _, character in batch:
+            if snapshot['version'] is not None:
+                snapshot['version'] = getattr(character, 'save_version', snapshot['version'])
+        entries = [(snapshot, overwrite) for snapshot, overwrite, _, _ in batch]
+        try:
+            return save_snapshots(entries)
+        except Exception:
+            pass
+        
+        # One bad snapshot should not lose the rest of the batch
+        results = []
+        for entry in entries:
+            try:
+                results.extend(save_snapshots([entry]))
+            except SaveConflictError as conflict:
+                results.append(conflict)
+            except Exception as e:
+                print(f"Error saving character {entry[0]['name']}: {e}", file=sys.stderr)
+                results.append(None)
+        return results
+
+
+def _queue_key(snapshot):
+    """Which pending save a snapshot collapses into: the same save row, or the same name if never saved"""
+    if snapshot['save_id'] is not None:
+        return ('save', snapshot['save_id'])
+    return ('new', snapshot['name'], snapshot['character_class'])
+
+_save_queue = None
+_save_queue_lock = threading.Lock()
+
+def get_save_queue() -> SaveQueue:
+    """Shared save queue, started on first use and flushed at exit"""
+    global _save_queue
+    with _save_queue_lock:
+        if _save_queue is None:
+            _save_queue = SaveQueue()
+            atexit.register(_save_queue.close, 10)
+        return _save_queue
+
+def flush_saves(timeout=None) -> bool:
+    """Wait for queued saves, if the shared queue was ever started"""
+    queue = _save_queue
+    return queue.flush(timeout) if queue else True
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Bulk export and import of saved characters
+
+Exports stream active saves, with their items and unreplayed journal
+entries, to JSON lines (gzip compressed when the file ends in .gz).
+Memory use stays flat however many saves there are. Imports read the
+same format back and insert it in chunks with executemany, ranking the
+new saves on the leaderboards as they go.
+
+    python save_transfer.py export saves.jsonl.gz
+    python save_transfer.py import saves.jsonl.gz --replace
+"""
+import sys
+import gzip
+import json
+import base64
+import argparse
+from datetime import datetime
+from sqlalchemy import DateTime, LargeBinary, select, insert, update, delete, tuple_
+from db_models import get_engine, ensure_schema, SavedCharacter, SavedItem, SaveJournalEntry, LeaderboardEntry
+from leaderboards import rank_characters
+
+FORMAT_VERSION = 1
+
+_characters = SavedCharacter.__table__
+_items = SavedItem.__table__
+_journal = SaveJournalEntry.__table__
+_leaderboard = LeaderboardEntry.__table__
+
+# Columns that are rebuilt on import rather than copied
+_CHARACTER_SKIP = ('id', 'journal_seq')
+_CHILD_SKIP = ('id', 'character_id')
+
+def _open(path, mode):
+    """Open a JSON lines file, '-' for stdin/stdout, gzip for .gz paths"""
+    if path == '-':
+        return sys.stdout if 'w' in mode else sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def _row_to_data(row, table, skip):
+    """Plain JSON data for a table row"""
+    data = {}
+    for column in table.columns:
+        if column.name in skip:
+            continue
+        value = row._mapping[column]
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, bytes):
+            value = base64.b64encode(value).decode('ascii')
+        data[column.name] = value
+    return data
+
+def _data_to_values(data, table, skip):
+    """Insert values for a table from exported data, ignoring unknown keys"""
+    values = {}
+    for column in table.columns:
+        if column.name in skip or column.name not in data:
+            continue
+        value = data[column.name]
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif value is not None and isinstance(column.type, LargeBinary):
+            value = base64.b64decode(value)
+        values[column.name] = value
+    return values
+
+def _children(conn, table, character_ids):
+    """Rows of a child table for a batch of characters, grouped by character id"""
+    query = select(table).where(table.c.character_id.in_(character_ids))
+    grouped = {}
+    for row in conn.execute(query.order_by(table.c.character_id, table.c.id)):
+        grouped.setdefault(row.character_id, []).append(_row_to_data(row, table, _CHILD_SKIP))
+    return grouped
+
+def dump_characters(conn, rows):
+    """
+    Export records for a batch of saved_characters rows
+    
+    Args:
+        conn: Open connection
+        rows: saved_characters rows, fetched with every column
+    
+    Returns:
+        List of JSON-ready dicts, one per row, with their items and unreplayed journal
+    """
+    ids = [row.id for row in rows]
+    items = _children(conn, _items, ids)
+    journal = _children(conn, _journal, ids)
+    
+    records = []
+    for row in rows:
+        data = _row_to_data(row, _characters, ('id',))
+        data['items'] = items.get(row.id, [])
+        data['journal'] = [entry for entry in journal.get(row.id, [])
+                           if entry['seq'] > (row.journal_seq or 0)]
+        records.append(data)
+    return records
+
+def export_saves(path, batch_size=1000):
+    """
+    Stream every active save to a JSON lines file
+    
+    Args:
+        path: Output file, '.gz' for gzip, '-' for stdout
+        batch_size: Characters fetched per round trip
+    
+    Returns:
+        Number of characters exported
+    """
+    ensure_schema()
+    count = 0
+    out = _open(path, 'w')
+    try:
+        out.write(json.dumps({'format': 'rpg-saves', 'version': FORMAT_VERSION}) + "\n")
+        with get_engine().connect() as conn:
+            # yield_per uses a server-side cursor where the driver has one
+            result = conn.execution_options(yield_per=batch_size).execute(
+                select(_characters).where(_characters.c.is_active == True).order_by(_characters.c.id)
+            )
+            for rows in result.partitions():
+                for data in dump_characters(conn, rows):
+                    out.write(json.dumps(data) + "\n")
+                count += len(rows)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return count
+
+def import_records(conn, chunk, replace=False):
+    """
+    Insert exported character records in an open transaction
+    
+    Args:
+        conn: Connection inside a transaction
+        chunk: List of records from dump_characters
+        replace: Soft delete active saves with the same name and class instead of skipping the record
+    
+    Records repeating a name and class within the chunk count as existing
+    saves too: the first is kept, or the last with replace.
+    
+    Returns:
+        Tuple of (imported, skipped) character counts
+    """
+    keys = [(data['name'], data['character_class']) for data in chunk]
+    unique = {}
+    for key, data in zip(keys, chunk):
+        if replace or key not in unique:
+            unique[key] = data
+    chunk = list(unique.values())
+    existing = set(conn.execute(
+        select(_characters.c.name, _characters.c.character_class).where(
+            _characters.c.is_active == True,
+            tuple_(_characters.c.name, _characters.c.character_class).in_(keys)
+        )
+    ).all())
+    
+    if existing and replace:
+        # Soft delete the saves being replaced, like delete_character does
+        replaced = (
+            (_characters.c.is_active == True) &
+            tuple_(_characters.c.name, _characters.c.character_class).in_(list(existing))
+        )
+        conn.execute(delete(_leaderboard).where(
+            _leaderboard.c.character_id.in_(select(_characters.c.id).where(replaced))
+        ))
+        conn.execute(update(_characters).where(replaced).values(is_active=False))
+    elif existing:
+        chunk = [data for key, data in unique.items() if key not in existing]
+    if not chunk:
+        return 0, len(keys)
+    
+    # One executemany for the characters, getting their new ids back in order
+    character_rows = []
+    for data in chunk:
+        values = _data_to_values(data, _characters, _CHARACTER_SKIP)
+        values['is_active'] = True
+        values['journal_seq'] = 0
+        character_rows.append(values)
+    new_ids = conn.execute(
+        insert(_characters).returning(_characters.c.id, sort_by_parameter_order=True),
+        character_rows
+    ).scalars().all()
+    
+    item_rows = []
+    journal_rows = []
+    for character_id, data in zip(new_ids, chunk):
+        for item in data.get('items', []):
+            item_rows.append(dict(_data_to_values(item, _items, _CHILD_SKIP), character_id=character_id))
+        for entry in data.get('journal', []):
+            journal_rows.append(dict(_data_to_values(entry, _journal, _CHILD_SKIP), character_id=character_id))
+    if item_rows:
+        conn.execute(insert(_items), item_rows)
+    if journal_rows:
+        conn.execute(insert(_journal), journal_rows)
+    rank_characters(conn, new_ids)
+    return len(chunk), len(keys) - len(chunk)
+
+def import_saves(path, chunk_size=1000, replace=False):
+    """
+    Insert the saves from a JSON lines export
+    
+    Each chunk is committed on its own, so an interrupted import keeps
+    the chunks already written.
+    
+    Args:
+        path: Input file, '.gz' for gzip, '-' for stdin
+        chunk_size: Characters inserted per transaction
+        replace: Replace saves with the same name and class instead of skipping them
+    
+    Returns:
+        Tuple of (imported, skipped) character counts
+    """
+    ensure_schema()
+    engine = get_engine()
+    imported = skipped = 0
+    
+    source = _open(path, 'r')
+    try:
+        header = json.loads(source.readline() or '{}')
+        if header.get('format') != 'rpg-saves':
+            raise ValueError(f"{path} is not a save export")
+        if header.get('version', 0) > FORMAT_VERSION:
+            raise ValueError(f"{path} was written by a newer version (format {header['version']})")
+        
+        chunk = []
+        for line in source:
+            if not line.strip():
+                continue
+            chunk.append(json.loads(line))
+            if len(chunk) >= chunk_size:
+                with engine.begin() as conn:
+                    done, skip = import_records(conn, chunk, replace)
+                imported, skipped = imported + done, skipped + skip
+                chunk = []
+        if chunk:
+            with engine.begin() as conn:
+                done, skip = import_records(conn, chunk, replace)
+            imported, skipped = imported + done, skipped + skip
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return imported, skipped
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Export or import saved characters as JSON lines")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    export_parser = commands.add_parser('export', help="Write all active saves to a file")
+    export_parser.add_argument('path', help="Output file (.gz to compress, - for stdout)")
+    export_parser.add_argument('--batch-size', type=int, default=1000, help="Characters fetched per round trip")
+    
+    import_parser = commands.add_parser('import', help="Load saves from an export file")
+    import_parser.add_argument('path', help="Input file (.gz if compressed, - for stdin)")
+    import_parser.add_argument('--chunk-size', type=int, default=1000, help="Characters committed per transaction")
+    import_parser.add_argument('--replace', action='store_true',
+                               help="Replace saves with the same name and class instead of skipping them")
+    
+    args = parser.parse_args(argv)
+    if args.command == 'export':
+        count = export_saves(args.path, args.batch_size)
+        print(f"Exported {count} characters", file=sys.stderr)
+    else:
+        imported, skipped = import_saves(args.path, args.chunk_size, args.replace)
+        print(f"Imported {imported} characters, skipped {skipped} existing", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
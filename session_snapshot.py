@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Snapshot a game in progress to bytes and restore it, in this process or another
+
+A suspended menu can't be pickled, so a game started with
+Game(snapshots=True) marks checkpoints instead: the main menu and each
+round of hunting. A checkpoint keeps the character as it was there and
+reseeds the game's own random numbers. A snapshot is the last checkpoint
+plus the input given since, and restoring replays that input from the
+checkpoint, which brings the game back to the same prompt with the same
+character and the same upcoming dice rolls.
+
+Saving, loading and character management read and write the save
+database, so they are not replayed: a snapshot taken in one of them
+restores to the main menu (or the title screen before a character exists)
+with the character as it is now.
+
+    python session_snapshot.py verify --sessions 50 --steps 400
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import tempfile
+
+SNAPSHOT_MAGIC = b'RPGS'
+SNAPSHOT_VERSION = 1
+
+# Status effects and bookkeeping a save leaves out but a live game needs
+_EXTRA_FIELDS = ('is_blocking', 'is_dodging', 'attack_boost', 'attack_boost_duration', 'journal_base')
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot can't be taken, read or restored faithfully"""
+
+
+def character_state(character):
+    """Everything needed to rebuild a character mid-game, as plain data"""
+    from db_utils import snapshot_character
+    state = snapshot_character(character)
+    for field in _EXTRA_FIELDS:
+        state[field] = getattr(character, field, None)
+    if hasattr(character, 'target_poisoned'):
+        state['target_poisoned'] = character.target_poisoned
+    state['max_size'] = character.inventory.max_size
+    conflict = getattr(character, 'save_conflict', None)
+    state['save_conflict'] = None if conflict is None else [
+        conflict.character_id, conflict.expected_version, conflict.actual_version]
+    changed = character.__dict__.get('_dirty')
+    state['changed'] = None if changed is None else sorted(changed)
+    changed = character.inventory.__dict__.get('_dirty')
+    state['inventory_changed'] = None if changed is None else sorted(changed)
+    return state
+
+def _apply_saves(character, state):
+    """Put a character_state's save bookkeeping back on a live character"""
+    from db_utils import SaveConflictError
+    character.tier_times = list(state['tier_times'])  # Reached on the original clock, not the replay's
+    character.save_id = state['save_id']
+    character.save_version = state['version']
+    character.journal_seq = state['journal_seq']
+    character.journal_base = state['journal_base']
+    character.save_conflict = None if state['save_conflict'] is None else SaveConflictError(*state['save_conflict'])
+    character.__dict__['_dirty'] = None if state['changed'] is None else set(state['changed'])
+    character.inventory.__dict__['_dirty'] = (None if state['inventory_changed'] is None
+                                              else set(state['inventory_changed']))
+
+def build_character(state):
+    """Create a live character from character_state()"""
+    from db_utils import _build_character
+    character = _build_character(dict(state, id=state['save_id'], journal=[]))
+    for field in _EXTRA_FIELDS:
+        setattr(character, field, state[field])
+    if 'target_poisoned' in state:
+        character.target_poisoned = state['target_poisoned']
+    character.inventory.max_size = state['max_size']
+    _apply_saves(character, state)
+    return character
+
+def _fingerprint(game):
+    """Checksum of where a game is and everything on screen, to tell a faithful restore"""
+    combat = game.combat
+    enemy = None
+    if combat is not None:
+        enemy = character_state(combat.villain)
+        del enemy['started_at']  # The clock when the replay spawned it
+    check = {
+        'state': game.menu_state(),
+        'prompt': game.prompt,
+        'player': character_state(game.player) if game.player is not None else None,
+        'enemy': enemy,
+        'turn': [combat.turn, combat.turn_count] if combat is not None else None,
+    }
+    return zlib.crc32(json.dumps(check, sort_keys=True).encode())
+
+def snapshot_session(game):
+    """
+    Capture a game waiting for input as bytes
+    
+    Args:
+        game: A new_game.Game created with snapshots=True
+    
+    Returns:
+        bytes for restore_session
+    """
+    if game.prompt is None and game._steps is not None:
+        raise SnapshotError("The game is over")
+    checkpoint = game.checkpoint_state
+    if checkpoint is not None and game.replay_inputs is not None:
+        record = dict(checkpoint, inputs=game.replay_inputs, check=_fingerprint(game))
+    else:
+        # Nothing to replay from, start over at the nearest menu with the character as it is
+        record = {
+            'position': 'main_menu' if game.player is not None else 'title',
+            'args': [],
+            'seed': None,
+            'player': character_state(game.player) if game.player is not None else None,
+            'inputs': [],
+            'check': None,
+        }
+    record['saves'] = character_state(game.player) if game.player is not None else None
+    payload = json.dumps(record, separators=(',', ':'), ensure_ascii=False).encode()
+    return SNAPSHOT_MAGIC + bytes([SNAPSHOT_VERSION]) + zlib.compress(payload)
+
+def _read_snapshot(data):
+    """Decode snapshot_session() bytes back into its record"""
+    if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise SnapshotError("Not a game snapshot")
+    version = data[len(SNAPSHOT_MAGIC)]
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Snapshot version {version} is not supported")
+    try:
+        return json.loads(zlib.decompress(data[len(SNAPSHOT_MAGIC) + 1:]))
+    except (zlib.error, ValueError) as e:
+        raise SnapshotError(f"Damaged snapshot: {e}") from e
+
+def restore_session(data, delay=0.0, capture=True):
+    """
+    Rebuild a game from snapshot_session() bytes
+    
+    The game comes back waiting for input at game.prompt. The output
+    replayed on the way there is dropped, show game.frame([]) or the
+    prompt to pick up where the player was.
+    
+    Args:
+        data: bytes from snapshot_session
+        delay: Game delay for the restored game
+        capture: Game capture for the restored game
+    
+    Returns:
+        A new_game.Game with snapshots on
+    """
+    from new_game import Game
+    record = _read_snapshot(data)
+    game = Game(delay=0, capture=True, snapshots=True)
+    if record['player'] is not None:
+        game.player = build_character(record['player'])
+    game.next_seed = record['seed']
+    if record['position'] == 'hunting':
+        game.resume_hunt = tuple(record['args'])
+    
+    game.replaying = True
+    try:
+        game.step()
+        for command in record['inputs']:
+            if game.prompt is None:
+                raise SnapshotError("The game ended while replaying the snapshot")
+            game.step(command)
+    finally:
+        game.replaying = False
+    
+    game.delay = delay
+    game.capture = capture
+    if game.combat is not None:
+        game.combat.delay = delay
+    if record['saves'] is not None and game.player is not None:
+        _apply_saves(game.player, record['saves'])
+    if record['check'] is not None and _fingerprint(game) != record['check']:
+        raise SnapshotError("The restored game does not match the snapshot")
+    return game
+
+def _bot_command(rng, game):
+    """A random answer a player could give at the game's current prompt"""
+    from new_game import parse_prompt_choices
+    choices = parse_prompt_choices(game.prompt)
+    if not choices:
+        return rng.choice(["", "1", "y", "n", rng.choice("abcdefgh") * 4])
+    if game.menu_state() == "main_menu" and rng.random() < 0.5:
+        return "1"  # Keep the bots hunting so they reach combat often
+    return rng.choice(choices)
+
+def verify(sessions=20, steps=300, seed=None):
+    """
+    Play random sessions, snapshotting and restoring after every step
+    
+    Returns:
+        dict of counts, sizes and timings; 'mismatches' should be 0
+    """
+    from new_game import Game
+    rng = random.Random(seed)
+    sizes, snapshot_times, restore_times = [], [], []
+    mismatches = restarts = 0
+    
+    for _ in range(sessions):
+        game = Game(delay=0, snapshots=True)
+        game.step()
+        for _ in range(steps):
+            if game.prompt is None:
+                break
+            game.step(_bot_command(rng, game))
+            if game.prompt is None:
+                break
+            
+            start = time.perf_counter()
+            data = snapshot_session(game)
+            snapshot_times.append(time.perf_counter() - start)
+            sizes.append(len(data))
+            
+            start = time.perf_counter()
+            try:
+                restored = restore_session(data)
+            except SnapshotError as e:
+                print(f"Restore failed at {game.menu_state()}: {e}")
+                mismatches += 1
+                continue
+            restore_times.append(time.perf_counter() - start)
+            
+            if _read_snapshot(data)['check'] is None:
+                restarts += 1
+            elif restored.rng_state != game.rng_state:
+                print(f"Random numbers differ after restoring at {game.menu_state()}")
+                mismatches += 1
+    
+    def percentile(values, fraction):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+    
+    return {
+        'snapshots': len(sizes),
+        'restarts': restarts,
+        'mismatches': mismatches,
+        'bytes_p50': percentile(sizes, 0.5),
+        'bytes_max': max(sizes, default=0),
+        'snapshot_ms': [percentile(snapshot_times, 0.5) * 1000, percentile(snapshot_times, 0.99) * 1000],
+        'restore_ms': [percentile(restore_times, 0.5) * 1000, percentile(restore_times, 0.99) * 1000],
+    }
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Snapshot and restore games in progress")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    verify_parser = commands.add_parser('verify', help="Check snapshots restore faithfully by playing random sessions")
+    verify_parser.add_argument('--sessions', type=int, default=20, help="Sessions to play (default 20)")
+    verify_parser.add_argument('--steps', type=int, default=300, help="Most inputs per session (default 300)")
+    verify_parser.add_argument('--seed', type=int, help="Seed for the random players")
+    verify_parser.add_argument('--url', help="Database to save to (default a temporary SQLite file)")
+    
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ['DATABASE_URL'] = args.url or "sqlite:///" + os.path.join(scratch, "verify.db")
+        result = verify(args.sessions, args.steps, args.seed)
+        from save_queue import flush_saves
+        flush_saves()
+    
+    print(f"{result['snapshots']} snapshots restored, {result['restarts']} back at a menu, "
+          f"{result['mismatches']} mismatches")
+    print(f"Size: {result['bytes_p50']} bytes median, {result['bytes_max']} largest")
+    print(f"Snapshot: {result['snapshot_ms'][0]:.2f} ms median, {result['snapshot_ms'][1]:.2f} ms p99")
+    print(f"Restore: {result['restore_ms'][0]:.2f} ms median, {result['restore_ms'][1]:.2f} ms p99")
+    return 1 if result['mismatches'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())